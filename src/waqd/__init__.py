@@ -19,6 +19,7 @@ GITHUB_REPO_NAME = "goszpeti/WeatherAirQualityDevice"
 DEBUG_LEVEL = 0
 HEADLESS_MODE = False
 MIGRATE_SENSOR_LOGS = False
+WEB_WORKERS = 1  # more than one moves the components to a core process shared by the workers
 LOCAL_TIMEZONE = datetime.datetime.now(datetime.timezone.utc).astimezone().tzinfo
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 480
@@ -29,14 +29,27 @@ def parse_cmd_args():
     parser.add_argument("-H", "--headless", action="store_true")
     parser.add_argument("-D", "--debug_level", type=int, default=waqd.DEBUG_LEVEL)
     parser.add_argument("-M", "--migrate_sensor_logs", action="store_true")
+    parser.add_argument("-W", "--web_workers", type=int, default=waqd.WEB_WORKERS)
+    parser.add_argument("-T", "--dump_diagnostics", type=int, metavar="PID",
+                        help="write threads, CPU times and stacks of a running WAQD to its log")
 
     args = parser.parse_args()
+    if args.dump_diagnostics:
+        from waqd.base.diagnostics import request_dump
+
+        try:
+            request_dump(args.dump_diagnostics)
+        except ValueError as error:
+            parser.error(str(error))
+        print(f"Diagnostics are written to the log of process {args.dump_diagnostics}")
+        sys.exit(0)
     waqd.DEBUG_LEVEL = args.debug_level
     debug_env_var = os.getenv("WAQD_DEBUG")
     if debug_env_var:
         waqd.DEBUG_LEVEL = int(debug_env_var)
     if args.headless:
         waqd.HEADLESS_MODE = True
+    waqd.WEB_WORKERS = max(1, args.web_workers)
     if args.migrate_sensor_logs:
         waqd.MIGRATE_SENSOR_LOGS = True
 
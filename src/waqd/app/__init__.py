@@ -3,8 +3,10 @@ Entry module of WAQD
 Sets up cmd arguments, settings and starts the gui
 """
 
+import os
 import sys
 import time
+from pathlib import Path
 from typing import TYPE_CHECKING
 from threading import Thread
 
@@ -61,10 +63,27 @@ def basic_setup():
     from waqd.base.component_ctrl import ComponentController
 
     comp_ctrl = ComponentController(settings)
+    from waqd.base.diagnostics import install_dump_signal
+
+    install_dump_signal(lambda: comp_ctrl.components if comp_ctrl else None)
     # if waqd.DEBUG_LEVEL > 1:  # disable startup sound
     #     comp_ctrl.components.tts.say_internal("startup", [WAQD_VERSION])
 
 
+def worker_setup():
+    """
+    Setup of a web worker process. The components run only in the core process,
+    their state is accessed via the state service. Settings are only read here.
+    """
+    global settings
+    from waqd.settings import Settings
+    from waqd.web.state_service import CONFIG_DIR_ENV
+
+    waqd.user_config_dir = Path(os.environ.get(CONFIG_DIR_ENV, waqd.user_config_dir))
+    settings = Settings(ini_folder=waqd.user_config_dir, auto_save=False)
+    setup_unit_reg()
+
+
 def main():
     basic_setup()
     global comp_ctrl, settings
@@ -84,7 +103,7 @@ def main():
         if runtime_system.is_target_system and not waqd.HEADLESS_MODE:
             chrome_browser = Thread(target=start_web_ui_chromium_kiosk_mode, daemon=True)
             chrome_browser.start()
-        start_web_server(reload=waqd.DEBUG_LEVEL > 3)
+        start_web_server(reload=waqd.DEBUG_LEVEL > 3, workers=waqd.WEB_WORKERS)
 
         if waqd.HEADLESS_MODE:
             comp_ctrl._stop_event.wait()
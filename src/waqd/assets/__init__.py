@@ -3,4 +3,10 @@
 This module contains helper functions for resource handling, and in the subfolders the actual assets.
 """
 
-from waqd.assets.assets import get_asset_file
+from waqd.assets.assets import AssetCatalog, get_asset_file, get_asset_url
+
+__all__ = [
+    "AssetCatalog",
+    "get_asset_file",
+    "get_asset_url",
+]
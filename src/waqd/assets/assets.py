@@ -1,10 +1,16 @@
 import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Dict, Set, Tuple, Union
 
 import waqd
 from waqd.base.file_logger import Logger
 
 TOC_FILE_NAME = "filetoc.json"
+NULL_PATH = Path("NULL")
 
 
 def get_asset_file_relative(rsc_file_path: Path) -> str:
@@ -17,46 +23,166 @@ def get_asset_file_relative(rsc_file_path: Path) -> str:
     return rsc_file_path.relative_to(waqd.assets_path).as_posix()
 
 
-def get_asset_file(rsc_dir: str, rsc_id: str) -> Path:
+def get_asset_file(rsc_dir: Union[str, Path], rsc_id: str) -> Path:
     """
     Get a an indexed resource file from the specified path.
     The function expects a filetoc.json, with a mapping from id to filename in "filelist".
     An additional "filetype" an be specified for a default extension. (without the dot)
     No error is raised, the error is only logged.
     """
+    return AssetCatalog().get_file(rsc_dir, rsc_id)
 
-    if rsc_id == "dummy-pic":  # specal case for a dummy picture
-        rsc_dir = "gui_base"
-    # read filetoc.json
-    rsc_path = waqd.assets_path / rsc_dir
-    ftoc_path = rsc_path / TOC_FILE_NAME
-    logger = Logger()
-
-    if not ftoc_path.exists():
-        logger.debug("Cannot find catalog file %s, fallback to real filename.", ftoc_path)
-        file_name = rsc_id
-    else:
-        content = {}
-        with open(ftoc_path, encoding="utf-8") as filetoc:
-            content = json.load(filetoc)
-
-        # get filetype and filelist
-        filetype = content.get("filetype", "")
-        filelist = content.get("filelist", {})
-
-        file_name = filelist.get(rsc_id, "")
-        if not file_name:
-            logger.debug(
-                f"Cannot find resource id {rsc_id} in catalog, fallback to real filename."
-            )
+
+def get_asset_url(rsc_dir: Union[str, Path], rsc_id: str) -> str:
+    """ Path of a resource file relative to the assets, as served by the static route. """
+    return AssetCatalog().get_url(rsc_dir, rsc_id)
+
+
+@dataclass
+class _AssetDirectory:
+    """ Content of one asset directory with its resolved resource ids. """
+    toc_mtime: float  # -1 without a catalog file
+    dir_mtime: float
+    filetype: str = ""
+    filelist: Dict[str, str] = field(default_factory=dict)
+    file_names: Set[str] = field(default_factory=set)
+    resolved: Dict[str, Tuple[Path, str]] = field(default_factory=dict)  # path and url
+    checked: float = 0.0  # monotonic time of the last mtime check
+
+
+class AssetCatalog:
+    """
+    Singleton index of the asset directories.
+    Each filetoc.json is read and each directory is listed once; all ids of the catalog
+    are resolved to the file path and the relative static URL in advance, so lookups while
+    rendering are dictionary accesses only.
+    A directory is reloaded, when the modification time of it or of its catalog changes.
+    This is checked at most every MTIME_CHECK_S.
+    """
+
+    MTIME_CHECK_S = 2.0
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.init()
+        return cls._instance
+
+    def init(self):
+        self._directories: Dict[Path, _AssetDirectory] = {}
+        self._lock = threading.Lock()
+
+    def get_file(self, rsc_dir: Union[str, Path], rsc_id: str) -> Path:
+        return self._lookup(rsc_dir, rsc_id)[0]
+
+    def get_url(self, rsc_dir: Union[str, Path], rsc_id: str) -> str:
+        """ Empty, if the file does not exist. """
+        return self._lookup(rsc_dir, rsc_id)[1]
+
+    def get_weather_icon_url(self, icon: str) -> str:
+        return self.get_url("weather_icons", icon)
+
+    def get_weather_background_url(self, main: str, is_day: bool) -> str:
+        return self.get_url("weather_bgrs", self.get_weather_background_id(main, is_day))
+
+    @staticmethod
+    def get_weather_background_id(main: str, is_day: bool) -> str:
+        """ Background of a weather condition, like "Clouds" """
+        return ("bg_day_" if is_day else "bg_night_") + main.lower()
+
+    def _lookup(self, rsc_dir: Union[str, Path], rsc_id: str) -> Tuple[Path, str]:
+        if rsc_id == "dummy-pic":  # specal case for a dummy picture
+            rsc_dir = "gui_base"
+        rsc_path = waqd.assets_path / rsc_dir
+        with self._lock:
+            directory = self._get_directory(rsc_path)
+            resolved = directory.resolved.get(rsc_id)
+            if resolved is None:
+                resolved = self._resolve(rsc_path, directory, rsc_id, log=True)
+                directory.resolved[rsc_id] = resolved  # also misses, to log them only once
+        return resolved
+
+    def _get_directory(self, rsc_path: Path) -> _AssetDirectory:
+        """ Needs the lock. """
+        directory = self._directories.get(rsc_path)
+        now = time.monotonic()
+        if directory and now - directory.checked < self.MTIME_CHECK_S:
+            return directory
+        mtimes = self._get_mtimes(rsc_path)
+        if not directory or mtimes != (directory.toc_mtime, directory.dir_mtime):
+            directory = self._load(rsc_path, *mtimes)
+            self._directories[rsc_path] = directory
+        directory.checked = now
+        return directory
+
+    @staticmethod
+    def _get_mtimes(rsc_path: Path) -> Tuple[float, float]:
+        try:
+            dir_mtime = rsc_path.stat().st_mtime
+        except OSError:
+            return (-1, -1)
+        try:
+            return ((rsc_path / TOC_FILE_NAME).stat().st_mtime, dir_mtime)
+        except OSError:
+            return (-1, dir_mtime)
+
+    def _load(self, rsc_path: Path, toc_mtime: float, dir_mtime: float) -> _AssetDirectory:
+        directory = _AssetDirectory(toc_mtime, dir_mtime)
+        try:
+            directory.file_names = set(os.listdir(rsc_path))
+        except OSError:
+            pass
+        if toc_mtime >= 0:
+            try:
+                with open(rsc_path / TOC_FILE_NAME, encoding="utf-8") as filetoc:
+                    content = json.load(filetoc)
+                directory.filetype = content.get("filetype", "")
+                directory.filelist = content.get("filelist", {})
+            except (OSError, ValueError) as error:
+                Logger().error("Cannot read catalog file %s: %s", rsc_path / TOC_FILE_NAME,
+                               str(error))
+        # files, which are used by their real name, like the weather icons
+        suffix = "." + directory.filetype if directory.filetype else ""
+        rsc_ids = [file_name[:len(file_name) - len(suffix)]
+                   for file_name in directory.file_names if file_name.endswith(suffix)]
+        for rsc_id in [*directory.filelist, *rsc_ids]:
+            resolved = self._resolve(rsc_path, directory, rsc_id, log=False)
+            if resolved[0] != NULL_PATH:  # misses are logged on the first lookup
+                directory.resolved.setdefault(rsc_id, resolved)
+        return directory
+
+    def _resolve(self, rsc_path: Path, directory: _AssetDirectory, rsc_id: str,
+                 log: bool) -> Tuple[Path, str]:
+        logger = Logger()
+        if directory.toc_mtime < 0:
+            if log:
+                logger.debug("Cannot find catalog file %s, fallback to real filename.",
+                             rsc_path / TOC_FILE_NAME)
             file_name = rsc_id
-        # append filetype, if applicable
-        if filetype:
-            file_name = file_name + "." + filetype
+        else:
+            file_name = directory.filelist.get(rsc_id, "")
+            if not file_name:
+                if log:
+                    logger.debug("Cannot find resource id %s in catalog, "
+                                 "fallback to real filename.", rsc_id)
+                file_name = rsc_id
+            # append filetype, if applicable
+            if directory.filetype:
+                file_name = file_name + "." + directory.filetype
 
-    rsc_file_path = rsc_path / file_name
-    if not rsc_file_path.exists():
-        logger.error("Cannot find resource file %s in %s", file_name, str(rsc_dir))
-        return Path("NULL")
+        rsc_file_path = rsc_path / file_name
+        if file_name not in directory.file_names and not (
+                "/" in file_name and rsc_file_path.exists()):  # in a subdirectory
+            if log:
+                logger.error("Cannot find resource file %s in %s", file_name, str(rsc_path))
+            return (NULL_PATH, "")
+        return (rsc_file_path, self._get_relative_url(rsc_file_path))
 
-    return rsc_file_path
+    @staticmethod
+    def _get_relative_url(rsc_file_path: Path) -> str:
+        try:
+            return get_asset_file_relative(rsc_file_path)
+        except ValueError:  # outside of the assets
+            return rsc_file_path.as_posix()
@@ -49,6 +49,17 @@ class Component:
         """
         return self._disabled
 
+    def disable(self):
+        """ Mark the component as disabled, e.g. when it keeps failing. """
+        self._disabled = True
+
+    def update_setting(self, name: str, value) -> bool:
+        """
+        Apply a changed setting to the running component.
+        Returns true, if it could be applied without a restart.
+        """
+        return False
+
     def stop(self):
         """ Stop this component. """
         pass
@@ -70,6 +81,12 @@ class CyclicComponent(Component):
         self._update_thread: Optional[threading.Thread] = None
         self._ready = False
         self._error_num = 0
+        # called, when the update thread exits without a stop request
+        self._exit_callback: Optional[Callable[["CyclicComponent"], None]] = None
+        # runtime statistics of the update function
+        self._last_update_duration = 0.0
+        self._max_update_duration = 0.0
+        self._overrun_count = 0
         if settings: # for type hinting
             self._settings: Settings
 
@@ -83,6 +100,31 @@ class CyclicComponent(Component):
             return True
         return False
 
+    @property
+    def last_update_duration(self) -> float:
+        """ Time in seconds the last call of the update function took. """
+        return self._last_update_duration
+
+    @property
+    def max_update_duration(self) -> float:
+        """ Longest time in seconds a call of the update function took. """
+        return self._max_update_duration
+
+    @property
+    def overrun_count(self) -> int:
+        """ Number of updates, which took longer than the update interval. """
+        return self._overrun_count
+
+    def set_exit_callback(self, callback: Optional[Callable[["CyclicComponent"], None]]):
+        """
+        Register a function to be called, when the update thread exits unexpectedly.
+        If the thread has already died, the callback is called immediately.
+        """
+        self._exit_callback = callback
+        if callback and self._update_thread and not self._update_thread.is_alive():
+            if not self._ticker_event.is_set():
+                callback(self)
+
     def stop(self):
         """ Stop this component, by sending a stop request. """
         if self._update_thread:
@@ -107,15 +149,34 @@ class CyclicComponent(Component):
         Executes an initializer function, optionally waits
         and then calls the update function periodically.
         """
-        time.sleep(self.INIT_WAIT_TIME)
-        if init_func:
-            init_func()
-        self._ready = True
-        while not self._ticker_event.wait(self.UPDATE_TIME):
-            if self._ticker_event.is_set():
-                self._ticker_event.clear()
-                return
-            if self._error_num == self.MAX_ERROR:
-                self._disabled = True
-                return
-            update_func()
+        stop_requested = False
+        try:
+            time.sleep(self.INIT_WAIT_TIME)
+            if init_func:
+                init_func()
+            self._ready = True
+            while not self._ticker_event.wait(self.UPDATE_TIME):
+                if self._ticker_event.is_set():
+                    self._ticker_event.clear()
+                    stop_requested = True
+                    return
+                if self._error_num == self.MAX_ERROR:
+                    self._disabled = True
+                    return
+                start_time = time.perf_counter()
+                update_func()
+                self._record_update_duration(time.perf_counter() - start_time)
+        except Exception as error:
+            self._logger.error("%s: Update loop crashed: %s", self.__class__.__name__,
+                               str(error))
+        finally:
+            # signal the supervisor, if nobody asked us to stop
+            stop_requested |= self._ticker_event.is_set()
+            if self._exit_callback and not stop_requested:
+                self._exit_callback(self)
+
+    def _record_update_duration(self, duration: float):
+        self._last_update_duration = duration
+        self._max_update_duration = max(self._max_update_duration, duration)
+        if duration > self.UPDATE_TIME:
+            self._overrun_count += 1
@@ -4,29 +4,32 @@ from typing import Optional
 
 from waqd.base.file_logger import Logger
 from waqd.base.component_reg import ComponentRegistry
-from waqd.base.network import Network
-from waqd.base.component_reg import CyclicComponent
+from waqd.base.network import ConnectivityMonitor, Network
+from waqd.base.supervisor import Supervisor
 from waqd.settings import Settings
 
 
 class ComponentController:
-    """Loader, unloader and watchdog for components."""
+    """Loader, unloader and supervisor for components."""
 
-    UPDATE_TIME = 5
+    NETWORK_CHECK_TIME = 60
 
     def __init__(self, settings: Settings):
+        self._settings = settings
         self._components = ComponentRegistry(settings)
+        self._supervisor = Supervisor(self._components)
 
-        # thread for watchdog
+        # thread for initializing the components and watching the network
         self._watch_thread: Optional[threading.Thread] = (
             None  # re-usable thread, assignment is in init_all
         )
-        self._stop_event = threading.Event()  # own stop event for watchdog
+        self._stop_event = threading.Event()  # own stop event for watch thread
         # thread for waiting for comps unload
         self._unload_thread: Optional[threading.Thread] = (
             None  # re-usable thread, assignment is in unload_all
         )
         self._inited_all = False
+        self._apply_settings_lock = threading.Lock()  # apply one settings change after another
 
     @property
     def all_ready(self) -> bool:
@@ -53,6 +56,11 @@ class ComponentController:
         """Returns held components for higher level functions"""
         return self._components
 
+    @property
+    def supervisor(self) -> Supervisor:
+        """Returns the supervisor, which restarts crashed components"""
+        return self._supervisor
+
     def init_all(self):
         """
         Start every managed module, by starting the watch thread.
@@ -63,6 +71,8 @@ class ComponentController:
         if self._inited_all:
             return
         Logger().info("Start initializing all components")
+        self._supervisor.start()
+        ConnectivityMonitor().start()  # probe early, components wait for the internet
         self._watch_thread = threading.Thread(
             name="Watchdog", target=self._watchdog_loop, daemon=True
         )
@@ -81,63 +91,56 @@ class ComponentController:
         )
         self._unload_thread.start()
 
+    def apply_setting_changes(self):
+        """
+        Reload the components affected by the settings changed since the last call.
+        Runs asynchronously, because stopping a component can take some time.
+        """
+        changed_settings = self._settings.pop_changed_keys()
+        # components not loaded yet are created with the current settings anyway
+        if not changed_settings or not self._inited_all:
+            return
+        Logger().info("Applying changed settings: %s", ", ".join(sorted(changed_settings)))
+        threading.Thread(
+            name="ApplySettings",
+            target=self._apply_setting_changes,
+            args=[changed_settings],
+            daemon=True,
+        ).start()
+
     def stop(self):
         """
         Stop this module, by sending a stop request.
         Actual stop is asynchronous.
         """
+        self._supervisor.stop()
         if self._watch_thread and self._watch_thread.is_alive():
             self._stop_event.set()
 
     def _watchdog_loop(self):
+        """
+        Initializes all components once. Restarting them is up to the supervisor,
+        this thread only checks the network connection from time to time.
+        """
         # this import statement imports all the components initially
         import waqd.components
 
         self._components.watch_all()
         self._inited_all = True
-        ticker = threading.Event()
-        while not ticker.wait(self.UPDATE_TIME):
-            if self._stop_event.is_set():
-                self._stop_event.clear()
-                return
-            self._watch_components()
-
-    def _watch_components(self):
-        """
-        Checks existence of global variable of each module and starts it.
-        """
-        # check and restart wifi
-        # if RuntimeSystem().is_target_system:
-        Network().check_internet_connection()
-        try:
-            for comp_name in self._components.get_names():
-                component = self._components.get(comp_name)
-                if not component:
-                    break
-                if issubclass(type(component), CyclicComponent):
-                    if (
-                        component.is_ready
-                        and not component.is_alive
-                        and not component.is_disabled
-                    ):
-                        # call stop, so it will be initialized in the next cycle
-                        self._components.stop_component(comp_name)
-
-            sensors_to_remove = []
-            for sensor_name in self._components.get_sensors():
-                sensor = self._components.get_sensors()[sensor_name]
-                if not sensor:
-                    break
-                if (
-                    isinstance(sensor, CyclicComponent)
-                    and sensor.is_ready
-                    and not sensor.is_alive
-                ):
-                    sensors_to_remove.append(sensor_name)
-            for sensor_name in sensors_to_remove:
-                self._components.get_sensors().pop(sensor_name)
-        except Exception as e:
-            Logger().debug(f"ERROR: Watchdog crashed: {str(e)}")
+        while not self._stop_event.wait(self.NETWORK_CHECK_TIME):
+            # check and restart wifi
+            try:
+                Network().check_internet_connection()
+            except Exception as e:
+                Logger().debug("ERROR: Network check failed: %s", str(e))
+        self._stop_event.clear()
+
+    def _apply_setting_changes(self, changed_settings):
+        with self._apply_settings_lock:
+            try:
+                self._components.apply_setting_changes(changed_settings)
+            except Exception as e:
+                Logger().error("Applying changed settings failed: %s", str(e))
 
     def _unload_all_components(self, reload_intended, updating):
         """
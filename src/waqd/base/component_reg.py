@@ -2,16 +2,18 @@ import platform
 import threading
 
 # this allows to use forward declarations to avoid circular imports
-from typing import TYPE_CHECKING, Dict, List, Optional, Type, TypeVar, Union
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Type, TypeVar, Union
 import waqd
 from waqd.base.component import Component, CyclicComponent
 from waqd.base.file_logger import Logger
 from waqd.settings import (
+    ADDITIONAL_LOCATIONS,
     AUTO_UPDATER_ENABLED,
     BME_280_ENABLED,
     BMP_280_ENABLED,
     BRIGHTNESS,
     CCS811_ENABLED,
+    DAY_STANDBY_TIMEOUT,
     DHT_22_DISABLED,
     DHT_22_PIN,
     DISPLAY_TYPE,
@@ -23,11 +25,15 @@ from waqd.settings import (
     LOCATION_LATITUDE,
     LOCATION_LONGITUDE,
     MH_Z19_ENABLED,
+    MH_Z19_VALUE_OFFSET,
     MOTION_SENSOR_ENABLED,
     MOTION_SENSOR_PIN,
+    NIGHT_MODE_BEGIN,
     NIGHT_MODE_END,
+    NIGHT_STANDBY_TIMEOUT,
     OW_API_KEY,
     REMOTE_MODE_URL,
+    SENSOR_WORKER_PROCESS,
     SOUND_ENABLED,
     UPDATER_USER_BETA_CHANNEL,
     WAVESHARE_DISP_BRIGHTNESS_PIN,
@@ -54,6 +60,7 @@ if TYPE_CHECKING:
         TvocSensor,
         WeatherProvider
     )
+    from waqd.components.weather.nowcast import PressureNowcast
 
 class ComponentRegistry:
     """
@@ -63,6 +70,41 @@ class ComponentRegistry:
 
     # Constants for Component names to an alternitave method to access components
 
+    # settings, which are passed to components on creation,
+    # mapped to the names of the consuming components or sensor types
+    SETTING_CONSUMERS: Dict[str, List[str]] = {
+        DISPLAY_TYPE: ["Display"],
+        BRIGHTNESS: ["Display", "ESaver"],
+        WAVESHARE_DISP_BRIGHTNESS_PIN: ["Display"],
+        LANG: ["EventHandler", "TextToSpeach"],
+        NIGHT_MODE_BEGIN: ["ESaver"],
+        NIGHT_MODE_END: ["EventHandler", "ESaver"],
+        DAY_STANDBY_TIMEOUT: ["ESaver"],
+        NIGHT_STANDBY_TIMEOUT: ["ESaver"],
+        EVENTS_ENABLED: ["EventHandler"],
+        SOUND_ENABLED: ["SoundVLC"],
+        LOCATION_NAME: ["OpenWeatherMap", "HedgedWeatherProvider"],
+        OW_API_KEY: ["OpenWeatherMap", "OpenMeteo", "HedgedWeatherProvider"],
+        LOCATION_LONGITUDE: ["OpenMeteo", "HedgedWeatherProvider"],
+        LOCATION_LATITUDE: ["OpenMeteo", "HedgedWeatherProvider"],
+        ADDITIONAL_LOCATIONS: ["OpenMeteo", "HedgedWeatherProvider"],
+        AUTO_UPDATER_ENABLED: ["OnlineUpdater"],
+        UPDATER_USER_BETA_CHANNEL: ["OnlineUpdater"],
+        REMOTE_MODE_URL: ["TempSensor", "HumiditySensor", "BarometricSensor", "CO2Sensor"],
+        BME_280_ENABLED: ["TempSensor", "HumiditySensor", "BarometricSensor"],
+        BMP_280_ENABLED: ["TempSensor", "BarometricSensor"],
+        DHT_22_PIN: ["TempSensor", "HumiditySensor"],
+        MH_Z19_ENABLED: ["CO2Sensor"],
+        MH_Z19_VALUE_OFFSET: ["CO2Sensor"],
+        CCS811_ENABLED: ["CO2Sensor", "TvocSensor"],
+        # the ESaver subscribes to the reloaded sensor
+        MOTION_SENSOR_ENABLED: ["SR501", "ESaver"],
+        MOTION_SENSOR_PIN: ["SR501", "ESaver"],
+        SENSOR_WORKER_PROCESS: [
+            "TempSensor", "HumiditySensor", "BarometricSensor", "CO2Sensor", "TvocSensor"
+        ],
+    }
+
     comp_init_lock = threading.Lock()  # lock to only instantiate one component at a time
 
     def __init__(self, settings: Settings):
@@ -74,6 +116,20 @@ class ComponentRegistry:
             str, "SensorComponent"
         ] = {}  # mapping from components to specific sensor types
         self._stop_thread: threading.Thread
+        # passed to every cyclic component to signal an unexpected exit
+        self._exit_callback: Optional[Callable[[CyclicComponent], None]] = None
+
+    @property
+    def unload_in_progress(self) -> bool:
+        """Components are being unloaded and should not be restarted."""
+        return self._unload_in_progress
+
+    def set_exit_callback(self, callback: Optional[Callable[[CyclicComponent], None]]):
+        """Set the function to be called, when a cyclic component exits unexpectedly."""
+        self._exit_callback = callback
+        for component in list(self._components.values()):
+            if isinstance(component, CyclicComponent):
+                component.set_exit_callback(callback)
 
     def set_unload_in_progress(self):
         """Signals the components, that they are unloading and should not instantiate new objects."""
@@ -112,9 +168,69 @@ class ComponentRegistry:
         """Get a specific component instance"""
         return self._components.get(name)
 
+    def get_name(self, instance: Component) -> str:
+        """Get the name of a component instance. Returns empty string, if it is not held."""
+        for name, component in list(self._components.items()):
+            if component is instance:
+                return name
+        return ""
+
     def get_sensors(self):
         return self._sensors
 
+    def restart_component(self, name: str):
+        """Stops a component and re-creates it by accessing all components."""
+        component = self._components.get(name)
+        if not component:
+            return
+        self.stop_component(name)
+        self._remove_sensor_instance(component)
+        self.watch_all()
+
+    def apply_setting_changes(self, changed_settings: Iterable[str]):
+        """
+        Reload only the components, which consume one of the changed settings.
+        A component can apply a setting in place, otherwise it is stopped and created anew.
+        """
+        affected: Dict[str, List[str]] = {}  # component name to changed settings
+        for setting in changed_settings:
+            for consumer in self.SETTING_CONSUMERS.get(setting, []):
+                component = self._sensors.get(consumer) or self._components.get(consumer)
+                name = self.get_name(component) if component else ""
+                if name and setting not in affected.setdefault(name, []):
+                    affected[name].append(setting)
+        reload_needed = False
+        for name, settings in affected.items():
+            component = self._components.get(name)
+            if not component:
+                continue
+            # every setting must be offered to the component, so no short-circuit evaluation
+            applied = [component.update_setting(setting, self._settings.get(setting))
+                       for setting in settings]
+            if all(applied):
+                self._logger.info("ComponentRegistry: Applied %s to %s", ", ".join(settings),
+                                  name)
+                continue
+            if component.reload_forbidden:
+                self._logger.warning(
+                    "ComponentRegistry: %s must be restarted to apply %s", name,
+                    ", ".join(settings))
+                continue
+            self.stop_component(name)
+            self._remove_sensor_instance(component)
+            reload_needed = True
+        if reload_needed:
+            self.watch_all()
+
+    def _remove_sensor_instance(self, instance):
+        """Remove all sensor type mappings to a component instance."""
+        sensors_to_delete = []
+        for sensor in self._sensors:
+            if instance is self._sensors[sensor]:
+                sensors_to_delete.append(sensor)
+        for sensor in sensors_to_delete:
+            self._sensors.pop(sensor)
+
     def stop_component_instance(self, instance):
         """
         Stops a component based on an instance.
@@ -134,12 +250,7 @@ class ComponentRegistry:
                 self._stop_thread.start()
                 break
         # also remove sensor instances
-        sensors_to_delete = []
-        for sensor in self._sensors:
-            if instance is self._sensors[sensor]:
-                sensors_to_delete.append(sensor)
-        for sensor in sensors_to_delete:
-            self._sensors.pop(sensor)
+        self._remove_sensor_instance(instance)
 
     def stop_component(self, name, reload_intended=False):
         """Stops a component. CyclicComponentRegistry can take some time."""
@@ -167,6 +278,7 @@ class ComponentRegistry:
             self.humidity_sensor,
             self.tvoc_sensor,
             self.pressure_sensor,
+            self.nowcast,
             self.co2_sensor,
             self.motion_detection_sensor,
         ]
@@ -237,25 +349,50 @@ class ComponentRegistry:
 
     @property
     def weather_info(self) -> "WeatherProvider":
-        """Access for OnlineWeather singleton"""
+        """
+        Access for OnlineWeather singleton.
+        With an OpenWeatherMap API key, both providers are used, hedging each other.
+        """
         from waqd.components import OpenWeatherMap, OpenMeteo
+        from waqd.components.weather.base_types import parse_location_list
+        from waqd.components.weather.hedged import HedgedWeatherProvider
 
-        if waqd.WEATHER_DATA_PROVIDER == waqd.WeatherDataProviders.OpenWeatherMap.value:
-            return self._create_component_instance(
-                OpenWeatherMap,
-                [
-                    self._settings.get(LOCATION_NAME),
-                    self._settings.get(OW_API_KEY),
-                ],
-            )
+        open_weather_map = (
+            OpenWeatherMap,
+            [
+                self._settings.get(LOCATION_NAME),
+                self._settings.get(OW_API_KEY),
+                self._settings,
+            ],
+        )
+        open_meteo = (
+            OpenMeteo,
+            [
+                self._settings.get_float(LOCATION_LONGITUDE),
+                self._settings.get_float(LOCATION_LATITUDE),
+                parse_location_list(self._settings.get_string(ADDITIONAL_LOCATIONS)),
+            ],
+        )
+        owm_preferred = (
+            waqd.WEATHER_DATA_PROVIDER == waqd.WeatherDataProviders.OpenWeatherMap.value
+        )
+        if self._settings.get(OW_API_KEY):
+            # the hedge schedules the fetches of both
+            open_meteo = (OpenMeteo, open_meteo[1] + [False])
+            providers = [open_weather_map, open_meteo] if owm_preferred else [
+                open_meteo, open_weather_map]
+            return self._create_component_instance(HedgedWeatherProvider, [providers])
+        if owm_preferred:
+            return self._create_component_instance(*open_weather_map)
         else: # fallback
-            return self._create_component_instance(
-                OpenMeteo,
-                [
-                    self._settings.get_float(LOCATION_LONGITUDE),
-                    self._settings.get_float(LOCATION_LATITUDE),
-                ],
-            )
+            return self._create_component_instance(*open_meteo)
+
+    @property
+    def nowcast(self) -> "PressureNowcast":
+        """Access for the short-term forecast from the local pressure tendency"""
+        from waqd.components.weather.nowcast import PressureNowcast
+
+        return self._create_component_instance(PressureNowcast, [self])
 
     @property
     def auto_updater(self) -> "OnlineUpdater":
@@ -274,7 +411,7 @@ class ComponentRegistry:
     @property
     def temp_sensor(self) -> "TempSensor":
         """Access for temperature sensor"""
-        from waqd.components import sensors
+        from waqd.components import sensor_worker, sensors
 
         sensor = self._get_sensor(sensors.TempSensor)
         if not sensor:
@@ -282,6 +419,10 @@ class ComponentRegistry:
                 sensor = self._create_component_instance(
                     sensors.WAQDRemoteStation, [self, self._settings]
                 )
+            elif self._settings.get(SENSOR_WORKER_PROCESS):
+                sensor = self._create_component_instance(
+                    sensor_worker.SensorWorker, [self, self._settings]
+                )
             elif self._settings.get(BME_280_ENABLED):
                 sensor = self._create_component_instance(sensors.BME280, [self, self._settings])
             elif self._settings.get(BMP_280_ENABLED):
@@ -300,7 +441,7 @@ class ComponentRegistry:
     @property
     def humidity_sensor(self) -> "HumiditySensor":
         """Access for humidity sensor"""
-        from waqd.components import sensors
+        from waqd.components import sensor_worker, sensors
 
         sensor = self._get_sensor(sensors.HumiditySensor)
         if not sensor:
@@ -310,6 +451,10 @@ class ComponentRegistry:
                 sensor = self._create_component_instance(
                     sensors.WAQDRemoteStation, [self, self._settings]
                 )
+            elif self._settings.get(SENSOR_WORKER_PROCESS):
+                sensor = self._create_component_instance(
+                    sensor_worker.SensorWorker, [self, self._settings]
+                )
             elif dht22_pin != DHT_22_DISABLED:
                 sensor = self._create_component_instance(
                     sensors.DHT22, [dht22_pin, self, self._settings]
@@ -327,7 +472,7 @@ class ComponentRegistry:
     @property
     def pressure_sensor(self) -> "BarometricSensor":
         """Access for pressure sensor"""
-        from waqd.components import sensors
+        from waqd.components import sensor_worker, sensors
 
         sensor = self._get_sensor(sensors.BarometricSensor)
         if not sensor:
@@ -335,13 +480,17 @@ class ComponentRegistry:
                 sensor = self._create_component_instance(
                     sensors.WAQDRemoteStation, [self, self._settings]
                 )
+            elif self._settings.get(SENSOR_WORKER_PROCESS):
+                sensor = self._create_component_instance(
+                    sensor_worker.SensorWorker, [self, self._settings]
+                )
             elif self._settings.get(BME_280_ENABLED):
                 sensor = self._create_component_instance(sensors.BME280, [self, self._settings])
             elif self._settings.get(BMP_280_ENABLED):
                 sensor = self._create_component_instance(sensors.BMP280, [self, self._settings])
             else:  # create a default instance that is disabled
                 sensor = self._create_component_instance(
-                    sensors.WAQDRemoteSensor, [False, 1, False]
+                    sensors.BarometricSensor, [False, 1, False]
                 )
             self._sensors.update({sensors.BarometricSensor.__name__: sensor})
             sensor.select_for_pres_logging()
@@ -350,7 +499,7 @@ class ComponentRegistry:
     @property
     def co2_sensor(self) -> "CO2Sensor":
         """Access for air_quality_sensor"""
-        from waqd.components import sensors
+        from waqd.components import sensor_worker, sensors
 
         sensor = self._get_sensor(sensors.CO2Sensor)
         if not sensor:
@@ -359,6 +508,10 @@ class ComponentRegistry:
                 sensor = self._create_component_instance(
                     sensors.WAQDRemoteStation, [self, self._settings]
                 )
+            elif self._settings.get(SENSOR_WORKER_PROCESS):
+                sensor = self._create_component_instance(
+                    sensor_worker.SensorWorker, [self, self._settings]
+                )
             elif self._settings.get(MH_Z19_ENABLED):
                 sensor = self._create_component_instance(sensors.MH_Z19, [self._settings])
             elif self._settings.get(CCS811_ENABLED):
@@ -372,11 +525,15 @@ class ComponentRegistry:
     @property
     def tvoc_sensor(self) -> "TvocSensor":
         """Access for air_quality_sensor"""
-        from waqd.components import sensors
+        from waqd.components import sensor_worker, sensors
 
         sensor = self._get_sensor(sensors.TvocSensor)
         if not sensor:
-            if self._settings.get(CCS811_ENABLED):
+            if self._settings.get(SENSOR_WORKER_PROCESS):
+                sensor = self._create_component_instance(
+                    sensor_worker.SensorWorker, [self, self._settings]
+                )
+            elif self._settings.get(CCS811_ENABLED):
                 sensor = self._create_component_instance(sensors.CCS811, [self, self._settings])
             else:  # create a default instance that is disabled
                 sensor = self._create_component_instance(sensors.TvocSensor, [False, 1, False])
@@ -498,6 +655,8 @@ class ComponentRegistry:
                 self._logger.info("ComponentRegistry: Starting " + name)
                 component = class_ref(*args)
                 self._components.update({name: component})
+                if self._exit_callback and isinstance(component, CyclicComponent):
+                    component.set_exit_callback(self._exit_callback)
             else:
                 raise TypeError(
                     "The component "
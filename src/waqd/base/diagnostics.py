@@ -0,0 +1,205 @@
+"""
+Runtime introspection of the threads and cyclic components of this process.
+CPU times are read from procfs, so they are only available on Linux.
+"""
+
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from waqd.base.component import CyclicComponent
+from waqd.base.file_logger import Logger
+
+if TYPE_CHECKING:
+    from waqd.base.component_reg import ComponentRegistry
+
+TASK_PATH = Path("/proc/self/task")
+
+STACK_SAMPLES = 20
+SAMPLE_INTERVAL_S = 0.01
+STACK_DEPTH = 8  # innermost frames per sampled stack
+
+
+def read_task_cpu_times() -> Dict[int, Dict[str, Any]]:
+    """
+    Returns the user and system CPU time in seconds of every native thread by its thread id.
+    Empty, if procfs is not available.
+    """
+    clock_ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+    tasks: Dict[int, Dict[str, Any]] = {}
+    if not TASK_PATH.is_dir():
+        return tasks
+    for task_dir in TASK_PATH.iterdir():
+        try:
+            stat = (task_dir / "stat").read_text()
+        except OSError:  # thread exited meanwhile
+            continue
+        # the name is in parentheses and can contain spaces, the fields after it are fixed
+        name = stat[stat.find("(") + 1:stat.rfind(")")]
+        fields = stat[stat.rfind(")") + 2:].split()
+        tasks[int(task_dir.name)] = {
+            "os_name": name,
+            "state": fields[0],
+            "user_time_s": int(fields[11]) / clock_ticks,
+            "system_time_s": int(fields[12]) / clock_ticks,
+        }
+    return tasks
+
+
+def get_thread_stats() -> List[Dict[str, Any]]:
+    """ Lists all threads of the process, the ones using the most CPU first. """
+    tasks = read_task_cpu_times()
+    threads = []
+    for thread in threading.enumerate():
+        task = tasks.pop(thread.native_id, {}) if thread.native_id else {}
+        threads.append({
+            "name": thread.name,
+            "ident": thread.ident,
+            "native_id": thread.native_id,
+            "daemon": thread.daemon,
+            "state": task.get("state", ""),
+            "user_time_s": task.get("user_time_s"),
+            "system_time_s": task.get("system_time_s"),
+        })
+    # threads not started by Python, e.g. by native libraries
+    for native_id, task in tasks.items():
+        threads.append({
+            "name": task["os_name"],
+            "ident": None,
+            "native_id": native_id,
+            "daemon": None,
+            "state": task["state"],
+            "user_time_s": task["user_time_s"],
+            "system_time_s": task["system_time_s"],
+        })
+    threads.sort(
+        key=lambda thread: (thread["user_time_s"] or 0) + (thread["system_time_s"] or 0),
+        reverse=True)
+    return threads
+
+
+def get_component_stats(components: "ComponentRegistry") -> List[Dict[str, Any]]:
+    """ Update loop statistics of all running cyclic components. """
+    instances: Dict[int, Any] = {}
+    for name in components.get_names():
+        instances[id(components.get(name))] = (name, components.get(name))
+    for sensor in components.get_sensors().values():
+        instances.setdefault(id(sensor), (sensor.__class__.__name__, sensor))
+    stats = []
+    for name, component in instances.values():
+        if not isinstance(component, CyclicComponent):
+            continue
+        stats.append({
+            "name": name,
+            "alive": component.is_alive,
+            "ready": component.is_ready,
+            "disabled": component.is_disabled,
+            "update_time_s": component.UPDATE_TIME,
+            "last_update_duration_s": component.last_update_duration,
+            "max_update_duration_s": component.max_update_duration,
+            "overrun_count": component.overrun_count,
+        })
+    return stats
+
+
+def sample_stacks(samples=STACK_SAMPLES,
+                  interval=SAMPLE_INTERVAL_S) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Samples the stacks of all threads several times.
+    Returns the distinct stacks per thread name, the most frequent first,
+    so that a busy thread shows where it spends its time.
+    """
+    own_ident = threading.get_ident()
+    counters: Dict[int, Counter] = {}
+    for i in range(samples):
+        for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+            if ident == own_ident:
+                continue
+            stack = tuple(traceback.format_stack(frame, limit=STACK_DEPTH))
+            counters.setdefault(ident, Counter())[stack] += 1
+        if i < samples - 1:
+            time.sleep(interval)
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    result = {}
+    for ident, counter in counters.items():
+        result[names.get(ident, str(ident))] = [
+            {"share": count / samples, "stack": "".join(stack)}
+            for stack, count in counter.most_common()
+        ]
+    return result
+
+
+def collect_diagnostics(components: Optional["ComponentRegistry"],
+                        samples=STACK_SAMPLES) -> Dict[str, Any]:
+    return {
+        "pid": os.getpid(),
+        "time": time.time(),
+        "threads": get_thread_stats(),
+        "components": get_component_stats(components) if components else [],
+        "stacks": sample_stacks(samples) if samples else {},
+    }
+
+
+def format_diagnostics(diagnostics: Dict[str, Any]) -> str:
+    """ Human readable form for the log. """
+    lines = [f"Diagnostics of process {diagnostics['pid']}", "Threads (CPU user/system in s):"]
+    for thread in diagnostics["threads"]:
+        cpu = "n/a"
+        if thread["user_time_s"] is not None:
+            cpu = f"{thread['user_time_s']:.2f}/{thread['system_time_s']:.2f}"
+        lines.append(f"  {thread['name']} [{thread['native_id']}] {thread['state']} {cpu}")
+    lines.append("Components (last/max update in s, overruns):")
+    for comp in diagnostics["components"]:
+        lines.append(
+            f"  {comp['name']} alive={comp['alive']} "
+            f"{comp['last_update_duration_s']:.3f}/{comp['max_update_duration_s']:.3f} "
+            f"{comp['overrun_count']}"
+        )
+    lines.append("Stacks:")
+    for name, stacks in diagnostics["stacks"].items():
+        for stack in stacks:
+            lines.append(f"  {name} ({stack['share']:.0%}):")
+            lines.append(stack["stack"].rstrip())
+    return "\n".join(lines)
+
+
+def install_dump_signal(get_components: Callable[[], Optional["ComponentRegistry"]]):
+    """
+    Write the diagnostics to the log, when the process receives SIGUSR1 (kill -USR1 <pid>).
+    Only possible from the main thread.
+    """
+    if (not hasattr(signal, "SIGUSR1")
+            or threading.current_thread() is not threading.main_thread()):
+        return
+
+    def dump():
+        try:
+            Logger().info(format_diagnostics(collect_diagnostics(get_components())))
+        except Exception as error:
+            Logger().error("Diagnostics: Cannot create dump: %s", str(error))
+
+    def handler(signum, frame):
+        # don't sample the stacks in the interrupted main thread
+        threading.Thread(name="DiagnosticsDump", target=dump, daemon=True).start()
+
+    signal.signal(signal.SIGUSR1, handler)
+
+
+def request_dump(pid: int):
+    """
+    Let a running WAQD process write its diagnostics to its log, like kill -USR1 <pid>.
+    Other processes would be terminated by the signal, so they are refused. Linux only.
+    """
+    try:
+        cmdline = Path(f"/proc/{pid}/cmdline").read_bytes()
+    except OSError as error:
+        raise ValueError(f"No process {pid}") from error
+    if b"waqd" not in cmdline:
+        raise ValueError(f"Process {pid} is not WAQD")
+    os.kill(pid, signal.SIGUSR1)
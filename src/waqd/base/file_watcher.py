@@ -0,0 +1,115 @@
+"""
+Notification about changes of a single file, e.g. to hot-reload a config file.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import platform
+import select
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from waqd.base.file_logger import Logger
+
+# inotify event masks of sys/inotify.h
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+IN_NONBLOCK = os.O_NONBLOCK
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, length of the name
+
+
+class FileWatcher:
+    """
+    Calls on_change from its own thread, when the file is written, replaced or deleted.
+    On Linux inotify watches the parent directory, so that replacing the file with a rename
+    (atomic writes, most editors) is noticed too. Other systems poll the modification time.
+    """
+
+    POLL_INTERVAL_S = 2.0
+
+    def __init__(self, file_path: Path, on_change: Callable[[], Any]):
+        self._file_path = Path(file_path)
+        self._on_change = on_change
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(name="FileWatcher_" + self._file_path.name,
+                                        target=self._watch, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _watch(self):
+        inotify_fd = self._init_inotify()
+        if inotify_fd is None:
+            self._poll()
+            return
+        try:
+            self._read_inotify(inotify_fd)
+        finally:
+            os.close(inotify_fd)
+
+    def _init_inotify(self) -> Optional[int]:
+        if platform.system() != "Linux":
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            inotify_fd = libc.inotify_init1(IN_NONBLOCK)
+            if inotify_fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            watch = libc.inotify_add_watch(inotify_fd, bytes(self._file_path.parent),
+                                           IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE)
+            if watch < 0:
+                os.close(inotify_fd)
+                raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        except (OSError, AttributeError) as error:
+            Logger().warning("FileWatcher: inotify not available, polling %s: %s",
+                             str(self._file_path), str(error))
+            return None
+        return inotify_fd
+
+    def _read_inotify(self, inotify_fd: int):
+        file_name = os.fsencode(self._file_path.name)
+        while not self._stop_event.is_set():
+            # timeout to check for stop
+            readable, _, _ = select.select([inotify_fd], [], [], self.POLL_INTERVAL_S)
+            if not readable:
+                continue
+            try:
+                buffer = os.read(inotify_fd, 4096)
+            except BlockingIOError:
+                continue
+            changed = False
+            offset = 0
+            while offset < len(buffer):
+                _, _, _, name_length = INOTIFY_EVENT_HEADER.unpack_from(buffer, offset)
+                offset += INOTIFY_EVENT_HEADER.size
+                name = buffer[offset:offset + name_length].rstrip(b"\0")
+                offset += name_length
+                changed |= name == file_name
+            if changed:
+                self._notify()
+
+    def _poll(self):
+        last_mtime = self._get_mtime()
+        while not self._stop_event.wait(self.POLL_INTERVAL_S):
+            mtime = self._get_mtime()
+            if mtime != last_mtime:
+                last_mtime = mtime
+                self._notify()
+
+    def _get_mtime(self) -> int:
+        try:
+            return self._file_path.stat().st_mtime_ns
+        except OSError:
+            return -1
+
+    def _notify(self):
+        try:
+            self._on_change()
+        except Exception as error:
+            Logger().error("FileWatcher: Change handler of %s failed: %s",
+                           str(self._file_path), str(error))
@@ -0,0 +1,229 @@
+"""
+Shared client for all outgoing HTTP requests.
+Connections are kept alive in a pool per host and responses are requested compressed.
+Responses with an ETag or Last-Modified header are revalidated with a conditional request.
+Failed requests are retried with a backoff and a host, which keeps failing,
+is not contacted for a while (circuit breaker).
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from waqd.base.supervisor import Backoff
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class HttpError(Exception):
+    """ The request failed, after all retries. """
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(HttpError):
+    """ The host failed too often and is not contacted for a while. """
+
+
+@dataclass
+class HttpResponse:
+    url: str
+    status_code: int
+    content: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    from_cache: bool = False  # revalidated with 304 Not Modified
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class CircuitBreaker:
+    """
+    Opens after FAILURE_THRESHOLD failed requests in a row. While open, no request is sent.
+    After OPEN_TIME_S a single trial request is let through (half open),
+    its result closes the breaker again or keeps it open.
+    """
+
+    FAILURE_THRESHOLD = 5
+    OPEN_TIME_S = 60
+
+    def __init__(self):
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_running or time.monotonic() - self._opened_at < self.OPEN_TIME_S:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.FAILURE_THRESHOLD:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+@dataclass
+class _Validated:
+    """ Last response of a URL, for a conditional request. """
+    etag: str
+    last_modified: str
+    response: HttpResponse
+
+
+class HttpClient:
+    """ Singleton to share the connection pools of all components. """
+
+    TIMEOUT_S: Timeout = (3.05, 10)  # connect, read
+    RETRIES = 2
+    RETRY_DELAY_MIN_S = 0.5
+    RETRY_DELAY_MAX_S = 4
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+    POOL_HOSTS = 8
+    POOL_SIZE = 4  # connections per host
+    MAX_VALIDATED = 32  # number of stored responses for conditional requests
+    DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.init()
+        return cls._instance
+
+    def init(self):
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.POOL_HOSTS, pool_maxsize=self.POOL_SIZE,
+                              max_retries=0)  # retried here, with the circuit breaker
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers["Accept-Encoding"] = "gzip, deflate"
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._validated: "OrderedDict[str, _Validated]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._session.close()
+
+    def get_breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc
+        with self._lock:
+            return self._breakers.setdefault(host, CircuitBreaker())
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None, timeout: Optional[Timeout] = None,
+            conditional=True) -> HttpResponse:
+        """
+        Returns the response with a successful status code, otherwise raises HttpError.
+        With conditional, an unchanged resource is served from the last response.
+        """
+        full_url = requests.Request("GET", url, params=params).prepare().url or url
+        request_headers = dict(headers or {})
+        validated = None
+        if conditional:
+            with self._lock:
+                validated = self._validated.get(full_url)
+            if validated and validated.etag:
+                request_headers["If-None-Match"] = validated.etag
+            if validated and validated.last_modified:
+                request_headers["If-Modified-Since"] = validated.last_modified
+
+        response = self._request(full_url, request_headers, timeout)
+        if response.status_code == 304 and validated:
+            with self._lock:
+                self._validated.move_to_end(full_url)
+            return HttpResponse(full_url, 200, validated.response.content,
+                                validated.response.headers, from_cache=True)
+        if not response.ok:
+            raise HttpError(f"{full_url}: HTTP {response.status_code} {response.text[:200]}",
+                            response.status_code)
+        result = HttpResponse(full_url, response.status_code, response.content,
+                              dict(response.headers))
+        etag = response.headers.get("ETag", "")
+        last_modified = response.headers.get("Last-Modified", "")
+        if conditional and (etag or last_modified):
+            with self._lock:
+                self._validated[full_url] = _Validated(etag, last_modified, result)
+                self._validated.move_to_end(full_url)
+                while len(self._validated) > self.MAX_VALIDATED:
+                    self._validated.popitem(last=False)
+        return result
+
+    def get_json(self, url: str, **kwargs) -> Any:
+        return self.get(url, **kwargs).json()
+
+    def download(self, url: str, target: Path, timeout: Optional[Timeout] = None) -> Path:
+        """ Stream the response into a file, without keeping it in memory. """
+        response = self._request(url, {}, timeout, stream=True)
+        with response:
+            if not response.ok:
+                raise HttpError(f"{url}: HTTP {response.status_code}", response.status_code)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with open(target, "wb") as target_file:
+                for chunk in response.iter_content(self.DOWNLOAD_CHUNK_SIZE):
+                    target_file.write(chunk)
+        return target
+
+    def _request(self, url: str, headers: Dict[str, str], timeout: Optional[Timeout],
+                 stream=False) -> requests.Response:
+        """
+        Retries connection errors, timeouts and temporary server errors.
+        The circuit breaker counts a request as failed only after all retries.
+        """
+        breaker = self.get_breaker(url)
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"{urlsplit(url).netloc} failed repeatedly, not contacted")
+        backoff = Backoff(self.RETRY_DELAY_MIN_S, self.RETRY_DELAY_MAX_S)
+        error = HttpError(url)
+        for attempt in range(self.RETRIES + 1):
+            delay = backoff.next_delay()
+            try:
+                response = self._session.get(url, headers=headers, stream=stream,
+                                             timeout=timeout or self.TIMEOUT_S)
+            except requests.RequestException as request_error:
+                error = HttpError(f"{url}: {str(request_error)}")
+            else:
+                if response.status_code not in self.RETRY_STATUS:
+                    breaker.record_success()  # the host answered
+                    return response
+                error = HttpError(f"{url}: HTTP {response.status_code}", response.status_code)
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = min(float(retry_after), self.RETRY_DELAY_MAX_S)
+                response.close()
+            if attempt < self.RETRIES:
+                time.sleep(delay)
+        breaker.record_failure()
+        raise error
@@ -1,12 +1,421 @@
+import asyncio
 import socket
+import struct
 import subprocess
-from typing import Tuple
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
 from time import sleep
 
 import nmcli
 from waqd.base.file_logger import Logger
+from waqd.base.supervisor import Backoff
 from waqd.base.system import RuntimeSystem
 
+
+class ConnectivityMonitor:
+    """
+    Singleton that probes the internet connection in the background and caches the result.
+    Probes run rarely while online and with an increasing interval while offline.
+    Subscribers are called with the new state on every online/offline transition.
+    """
+
+    PROBE_ADDRESSES = [("1.1.1.1", 53), ("8.8.8.8", 53)]
+    PROBE_TIMEOUT_S = 3
+    ONLINE_INTERVAL_S = 60
+    OFFLINE_INTERVAL_MIN_S = 2
+    OFFLINE_INTERVAL_MAX_S = 30
+    CACHE_TTL_S = 90  # an older state triggers a new probe
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.init()
+        return cls._instance
+
+    def init(self):
+        self._online = False
+        self._last_probe_time = 0.0
+        self._lock = threading.Lock()
+        self._subscribers: List[Callable[[bool], None]] = []
+        self._probed_event = threading.Event()  # set after the first probe
+        self._online_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._backoff = Backoff(self.OFFLINE_INTERVAL_MIN_S, self.OFFLINE_INTERVAL_MAX_S)
+        self._thread: Optional[threading.Thread] = None
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    @property
+    def is_online(self) -> bool:
+        """ Cached state. The first access waits for the initial probe. """
+        self.start()
+        self._probed_event.wait(self.PROBE_TIMEOUT_S * len(self.PROBE_ADDRESSES))
+        if time.monotonic() - self._last_probe_time > self.CACHE_TTL_S:
+            self.refresh()
+        return self._online
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(name="ConnectivityMonitor",
+                                            target=self._monitor_loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join(self.PROBE_TIMEOUT_S * len(self.PROBE_ADDRESSES))
+
+    def refresh(self):
+        """ Probe again right now, e.g. after the network configuration changed. """
+        self._wake_event.set()
+
+    def wait_online(self, timeout: Optional[float] = None) -> bool:
+        """ Blocks until the internet is reachable. Returns false on timeout. """
+        self.start()
+        return self._online_event.wait(timeout)
+
+    async def wait_online_async(self, timeout: Optional[float] = None) -> bool:
+        """ Awaitable version of wait_online, which does not block the event loop. """
+        self.start()
+        if self._online_event.is_set():
+            return True
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self._lock:
+            self._async_waiters.append(waiter)
+        # the state could have changed before the waiter was registered
+        if self._online_event.is_set():
+            future.set_result(True)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                if waiter in self._async_waiters:
+                    self._async_waiters.remove(waiter)
+
+    def subscribe(self, callback: Callable[[bool], None]):
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[bool], None]):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _probe(self) -> bool:
+        for address in self.PROBE_ADDRESSES:
+            try:
+                with socket.create_connection(address, timeout=self.PROBE_TIMEOUT_S):
+                    return True
+            except OSError:
+                continue
+        return False
+
+    def _monitor_loop(self):
+        while not self._stop_event.is_set():
+            online = self._probe()
+            self._last_probe_time = time.monotonic()
+            self._set_state(online)
+            if online:
+                self._backoff.reset()
+                interval = self.ONLINE_INTERVAL_S
+            else:
+                interval = self._backoff.next_delay()
+            self._wake_event.wait(interval)
+            self._wake_event.clear()
+
+    def _set_state(self, online: bool):
+        changed = online != self._online or not self._probed_event.is_set()
+        self._online = online
+        if online:
+            self._online_event.set()
+        else:
+            self._online_event.clear()
+        self._probed_event.set()
+        if not changed:
+            return
+        Logger().info("Network: Internet is %s", "reachable" if online else "not reachable")
+        with self._lock:
+            subscribers = list(self._subscribers)
+            if online:
+                for loop, future in self._async_waiters:
+                    loop.call_soon_threadsafe(self._resolve_future, future)
+                self._async_waiters.clear()
+        for callback in subscribers:
+            try:
+                callback(online)
+            except Exception as error:
+                Logger().error("Network: Connectivity subscriber failed: %s", str(error))
+
+    @staticmethod
+    def _resolve_future(future: asyncio.Future):
+        if not future.done():
+            future.set_result(True)
+
+
+class NetworkStateCache:
+    """
+    Singleton that holds the NetworkManager state in memory, so that reading it does not
+    spawn nmcli every time. Device changes are followed by streaming `nmcli monitor`.
+    If that is not available, the state is read again after a short time.
+    The wifi scan results are not part of the change events, so they have their own lifetime,
+    an actual rescan is only done on request.
+    """
+
+    MONITOR_COMMAND = ["nmcli", "monitor"]
+    DEVICES_TTL_S = 10  # only used without the monitor
+    WIFI_TTL_S = 30
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.init()
+        return cls._instance
+
+    def init(self):
+        self._lock = threading.Lock()
+        self._devices: Optional[list] = None  # None means it must be read
+        self._devices_time = 0.0
+        self._wifi_networks: Optional[list] = None
+        self._wifi_time = 0.0
+        self._monitor_process: Optional[subprocess.Popen] = None
+        self._monitoring = False
+        self._start_monitor()
+
+    @property
+    def is_monitoring(self) -> bool:
+        """ Changes are pushed by NetworkManager. """
+        return self._monitoring
+
+    def get_devices(self) -> list:
+        with self._lock:
+            if self._devices is None or (
+                not self._monitoring
+                and time.monotonic() - self._devices_time > self.DEVICES_TTL_S
+            ):
+                self._devices = nmcli.device.status()
+                self._devices_time = time.monotonic()
+            return self._devices
+
+    def get_wifi_networks(self, rescan=False) -> list:
+        with self._lock:
+            if rescan:
+                nmcli.device.wifi_rescan()
+            if rescan or self._wifi_networks is None or \
+                    time.monotonic() - self._wifi_time > self.WIFI_TTL_S:
+                # the last scan result of NetworkManager, without triggering a new scan
+                self._wifi_networks = nmcli.device.wifi(rescan=False)
+                self._wifi_time = time.monotonic()
+            return self._wifi_networks
+
+    def invalidate(self):
+        """ Read everything again on the next access. """
+        with self._lock:
+            self._devices = None
+            self._wifi_networks = None
+
+    def stop(self):
+        if self._monitor_process:
+            self._monitor_process.terminate()
+
+    def _start_monitor(self):
+        try:
+            self._monitor_process = subprocess.Popen(
+                self.MONITOR_COMMAND,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+        except OSError as error:
+            Logger().debug("Network: Can't monitor NetworkManager: %s", str(error))
+            return
+        self._monitoring = True
+        threading.Thread(name="NetworkMonitor", target=self._monitor_loop, daemon=True).start()
+
+    def _monitor_loop(self):
+        process = self._monitor_process
+        if not process or not process.stdout:
+            return
+        for line in process.stdout:
+            Logger().debug("Network: %s", line.strip())
+            with self._lock:
+                self._devices = None
+                self._wifi_networks = None  # in use flag changes with the connection
+            ConnectivityMonitor().refresh()
+        # fall back to reading the state from time to time
+        self._monitoring = False
+        self.invalidate()
+
+
+class AddressResolver:
+    """
+    Singleton that reads the IP addresses of the network interfaces directly from the kernel
+    (ioctl for IPv4, procfs for IPv6) and caches them per interface.
+    A netlink socket notifies about address and link changes, which invalidates the cache.
+    Without netlink, the addresses are read again after a short time.
+    """
+
+    IF_INET6_PATH = Path("/proc/net/if_inet6")
+    CACHE_TTL_S = 10  # only used without netlink
+    _SIOCGIFADDR = 0x8915
+    _RTMGRP_LINK = 0x1
+    _RTMGRP_IPV4_IFADDR = 0x10
+    _RTMGRP_IPV6_IFADDR = 0x100
+    _IPV6_SCOPE_GLOBAL = 0x0
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.init()
+        return cls._instance
+
+    def init(self):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._generation = 0  # counts the changes
+        self._addresses: Optional[Dict[str, Tuple[List[str], List[str]]]] = None
+        self._read_time = 0.0
+        self._subscribers: List[Callable[[], None]] = []
+        self._netlink: Optional[socket.socket] = None
+        self._start_netlink()
+
+    @property
+    def is_notified(self) -> bool:
+        """ Address changes are pushed by the kernel. """
+        return self._netlink is not None
+
+    def get_addresses(self) -> Dict[str, Tuple[List[str], List[str]]]:
+        """
+        Returns the IPv4 and IPv6 addresses per interface, ordered by interface index.
+        Loopback and link-local addresses are left out.
+        """
+        with self._lock:
+            if self._addresses is None or (
+                not self._netlink and time.monotonic() - self._read_time > self.CACHE_TTL_S
+            ):
+                self._addresses = self._read_addresses()
+                self._read_time = time.monotonic()
+            return self._addresses
+
+    def subscribe(self, callback: Callable[[], None]):
+        """ Callback is called, when an address or link changed. """
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def invalidate(self):
+        with self._lock:
+            self._addresses = None
+
+    def wait_for_change(self, timeout: float) -> bool:
+        """
+        Blocks until an address or link changes. Returns false on timeout.
+        Without netlink, changes can't be detected and it returns after the cache lifetime.
+        """
+        with self._changed:
+            generation = self._generation
+            if not self._netlink:
+                timeout = min(timeout, self.CACHE_TTL_S)
+            self._changed.wait_for(lambda: self._generation != generation, timeout)
+            return self._generation != generation
+
+    def stop(self):
+        if self._netlink:
+            self._netlink.close()
+            self._netlink = None
+
+    def _read_addresses(self) -> Dict[str, Tuple[List[str], List[str]]]:
+        addresses: Dict[str, Tuple[List[str], List[str]]] = {}
+        ipv6_addresses = self._read_ipv6_addresses()
+        for _, name in socket.if_nameindex():
+            if name == "lo":
+                continue
+            ipv4 = self._read_ipv4_address(name)
+            ipv6 = ipv6_addresses.get(name, [])
+            if ipv4 or ipv6:
+                addresses[name] = ([ipv4] if ipv4 else [], ipv6)
+        return addresses
+
+    def _read_ipv4_address(self, interface: str) -> str:
+        import fcntl  # pylint: disable=import-outside-toplevel
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            try:
+                request = struct.pack("256s", interface[:15].encode("utf-8"))
+                result = fcntl.ioctl(sock.fileno(), self._SIOCGIFADDR, request)
+            except OSError:  # no address assigned
+                return ""
+        return socket.inet_ntoa(result[20:24])
+
+    def _read_ipv6_addresses(self) -> Dict[str, List[str]]:
+        addresses: Dict[str, List[str]] = {}
+        try:
+            lines = self.IF_INET6_PATH.read_text().splitlines()
+        except OSError:  # IPv6 is disabled
+            return addresses
+        for line in lines:
+            # address, interface index, prefix length, scope, flags, interface name
+            fields = line.split()
+            if len(fields) < 6 or int(fields[3], 16) != self._IPV6_SCOPE_GLOBAL:
+                continue
+            address = socket.inet_ntop(socket.AF_INET6, bytes.fromhex(fields[0]))
+            addresses.setdefault(fields[5], []).append(address)
+        return addresses
+
+    def _start_netlink(self):
+        if not hasattr(socket, "AF_NETLINK"):
+            return
+        try:
+            netlink = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            netlink.bind(
+                (0, self._RTMGRP_LINK | self._RTMGRP_IPV4_IFADDR | self._RTMGRP_IPV6_IFADDR)
+            )
+        except OSError as error:
+            Logger().debug("Network: No address change notification: %s", str(error))
+            return
+        self._netlink = netlink
+        threading.Thread(name="AddressMonitor", target=self._netlink_loop, args=[netlink],
+                         daemon=True).start()
+
+    def _netlink_loop(self, netlink: socket.socket):
+        while True:
+            try:
+                if not netlink.recv(65536):
+                    break
+            except OSError:  # closed
+                break
+            # the content does not matter, everything is read again on the next access
+            with self._changed:
+                self._addresses = None
+                self._generation += 1
+                self._changed.notify_all()
+                subscribers = list(self._subscribers)
+            for callback in subscribers:
+                try:
+                    callback()
+                except Exception as error:
+                    Logger().error("Network: Address change subscriber failed: %s", str(error))
+        with self._changed:
+            self._netlink = None
+            self._addresses = None
+            self._changed.notify_all()  # waiters fall back to the cache lifetime
+
+
 class Network:
     """
     Singleton that abstracts information about the network.
@@ -16,8 +425,7 @@ class Network:
     _instance = None
     _internet_reconnect_try = 0  # internal counter for wlan restart
     _disable_network = False
-    _wait_for_network_counter = 0
-    _wait_for_internet_counter = 0
+    STARTUP_NETWORK_TIMEOUT_S = 5
     internet_connected_once = False
 
     def __new__(cls):
@@ -28,21 +436,20 @@ class Network:
 
     def init(self):
         self._runtime_system = RuntimeSystem()
-        self._devices = nmcli.device.status()
-        self._wifi_networks = nmcli.device.wifi()
+        self._state = NetworkStateCache()
+        self._addresses = AddressResolver()
+        self._addresses.subscribe(ConnectivityMonitor().refresh)
 
-        self.wait_for_network()
+        self.wait_for_network(self.STARTUP_NETWORK_TIMEOUT_S)
 
     @property
     def internet_connected(self) -> bool:
         if self._disable_network:
             return False
-        try:
-            socket.create_connection(("1.1.1.1", 53))
-            return True
-        except OSError:
-            pass
-        return False
+        connected = ConnectivityMonitor().is_online
+        if connected:
+            self.internet_connected_once = True
+        return connected
 
     @property
     def network_connected(self) -> bool:
@@ -51,24 +458,26 @@ class Network:
             return False
         return True
 
-    def get_ip(self) -> Tuple[str, str]:  # "ipv4", "ipv6"
-        """Gets IP 4 and 6 addresses on target system"""
+    def get_ip(self, interface: Optional[str] = None) -> Tuple[str, str]:  # "ipv4", "ipv6"
+        """
+        Gets IP 4 and 6 addresses on target system.
+        Without an interface (e.g. eth0, wlan0) the first address of any interface is used.
+        """
         ipv4 = ""
         ipv6 = ""
         if self._runtime_system.is_target_system:
             try:
-                ret = subprocess.check_output("hostname -I", shell=True)
-                ret_str = ret.decode("utf-8")
+                addresses = self._addresses.get_addresses()
             except Exception as e:
-                Logger().error("Network: Can't get IP address")
+                Logger().error("Network: Can't get IP address: %s", str(e))
                 return (ipv4, ipv6)
-            # if both 4 and 6 are available, there is a space between them
-            ips = ret_str.split(" ")
-            for ip_adr in ips:
-                if "." in ip_adr:
-                    ipv4 = ip_adr
-                elif ":" in ip_adr:
-                    ipv6 = ip_adr
+            for name, (ipv4_addresses, ipv6_addresses) in addresses.items():
+                if interface and name != interface:
+                    continue
+                if not ipv4 and ipv4_addresses:
+                    ipv4 = ipv4_addresses[0]
+                if not ipv6 and ipv6_addresses:
+                    ipv6 = ipv6_addresses[0]
         else:
             ipv4 = socket.gethostbyname(socket.gethostname())
         if ipv4 in ["localhost", "127.0.0.1"]:  # we want the LAN address
@@ -81,8 +490,6 @@ class Network:
         The restart of the adapter is black voodo magic, which is attempted after the second failure.
         If that doesn't help, the RPi reboots on the next failure.
         """
-        self._devices = nmcli.device.status()
-        self._wifi_networks = nmcli.device.wifi()
         if self.internet_connected_once:  # at least once connected:
             if self._internet_reconnect_try == 2:
                 # TODO use py network manager
@@ -99,58 +506,58 @@ class Network:
                 self._runtime_system.restart()
         if not self.internet_connected:
             self._internet_reconnect_try += 1
-            sleep(5)
         else:
             if self._internet_reconnect_try != 0:
                 self._internet_reconnect_try = 0
                 # TODO emit signal
 
-    def wait_for_network(self) -> bool:
-        max_error = 5
-        while not self.network_connected and self._wait_for_network_counter < max_error:
-            sleep(1)
-            self._wait_for_network_counter += 1
-            if self._wait_for_network_counter == 0:
-                Logger().info("Waiting for network...")
-
-        self._wait_for_network_counter = 0
-        if self._wait_for_network_counter == max_error:
-            return False
+    def wait_for_network(self, timeout: float = 0) -> bool:
+        """
+        Waits for an IP address to be assigned. Without timeout, the current state is returned.
+        Waiting is woken up by the address changes, not by polling.
+        """
+        deadline = time.monotonic() + timeout
+        if not self.network_connected and timeout:
+            Logger().info("Waiting for network...")
+        while not self.network_connected:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._addresses.wait_for_change(remaining)
         return True
 
-    def wait_for_internet(self) -> bool:
-        self.wait_for_network()
-        max_error = 5
-        while not self.internet_connected and self._wait_for_internet_counter < max_error:
-            sleep(1)
-            self._wait_for_internet_counter += 1
-            if self._wait_for_internet_counter == 0:
-                Logger().info("Waiting for network...")
-
-        if self._wait_for_internet_counter == max_error:
+    def wait_for_internet(self, timeout: float = 0) -> bool:
+        """
+        Waits for the internet to be reachable. Without timeout, the cached state
+        of the connectivity monitor is returned, so offline callers fail fast.
+        """
+        if self._disable_network:
             return False
-        self._wait_for_internet_counter = 0
-        return True
+        deadline = time.monotonic() + timeout
+        if not self.wait_for_network(timeout):
+            return False
+        monitor = ConnectivityMonitor()
+        if monitor.is_online or monitor.wait_online(max(0, deadline - time.monotonic())):
+            self.internet_connected_once = True
+            return True
+        return False
     
     def is_connected_via_eth(self) -> bool:
-        self._devices = nmcli.device.status()
-        for device in self._devices:
+        for device in self._state.get_devices():
             if device.device_type == "ethernet" and device.state == "connected":
                 return True
         return False
 
     def is_connected_via_wlan(self) -> bool:
-        self._devices = nmcli.device.status()
-        for device in self._devices:
+        for device in self._state.get_devices():
             if device.device_type == "wifi" and device.state == "connected":
                 return True
         return False
     
-    def list_wifi(self, include_hidden=False):
+    def list_wifi(self, include_hidden=False, rescan=False):
         # filter out duplicates
-        self._wifi_networks = nmcli.device.wifi()
         wifi_networks = {}
-        for device in self._wifi_networks:
+        for device in self._state.get_wifi_networks(rescan):
             if not device.ssid:
                 if not include_hidden:
                     continue
@@ -161,7 +568,7 @@ class Network:
         return wifi_networks
 
     def current_wifi_strength(self) -> int|None:
-        for device in self._wifi_networks:
+        for device in self._state.get_wifi_networks():
             if device.in_use:
                 return device.signal
         return None
@@ -169,18 +576,22 @@ class Network:
     def connect_wifi(self, ssid: str, password: str):
         Logger().info("Network: Connecting to WiFi: %s", ssid)
         nmcli.device.wifi_connect(ssid, password)
+        self._state.invalidate()
 
     def disconnect_wifi(self, ssid: str):
         Logger().info("Network: Disconnecting from WiFi: %s", ssid)
         nmcli.device.disconnect(ssid)
+        self._state.invalidate()
 
     def enable_wifi(self):
         Logger().info("Network: Enabling WiFi")
         nmcli.radio.wifi_on()
+        self._state.invalidate()
 
     def disable_wifi(self):
         Logger().info("Network: Disabling WiFi")
         nmcli.radio.wifi_off()
+        self._state.invalidate()
 
     def wifi_enabled(self):
         return nmcli.radio.wifi()
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Minimal thread-safe publish/subscribe, to notify about events instead of polling for them.
+"""
+
+import threading
+from typing import Any, Callable, List, Tuple
+
+from waqd.base.file_logger import Logger
+
+
+class Signal:
+    """
+    Calls the subscribed callbacks in the thread of the emitter.
+    One-shot subscriptions are removed before their callback is called,
+    so they are called exactly once, even if the signal is emitted concurrently.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._lock = threading.Lock()
+        self._subscribers: List[Tuple[Callable[..., Any], bool]] = []  # callback and one-shot
+
+    def subscribe(self, callback: Callable[..., Any]):
+        with self._lock:
+            if (callback, False) not in self._subscribers:
+                self._subscribers.append((callback, False))
+
+    def subscribe_once(self, callback: Callable[..., Any]):
+        """ Callback is removed with the next emit. """
+        with self._lock:
+            self._subscribers.append((callback, True))
+
+    def unsubscribe(self, callback: Callable[..., Any]) -> bool:
+        """ Returns false, if the callback was not subscribed (anymore). """
+        with self._lock:
+            for subscriber in self._subscribers:
+                if subscriber[0] == callback:
+                    self._subscribers.remove(subscriber)
+                    return True
+        return False
+
+    def emit(self, *args):
+        with self._lock:
+            subscribers = [callback for callback, _ in self._subscribers]
+            self._subscribers = [subscriber for subscriber in self._subscribers
+                                 if not subscriber[1]]
+        for callback in subscribers:
+            try:
+                callback(*args)
+            except Exception as error:
+                Logger().error("%s: Subscriber failed: %s", self._name, str(error))
@@ -0,0 +1,118 @@
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Set
+
+from waqd.base.component import CyclicComponent
+from waqd.base.file_logger import Logger
+
+if TYPE_CHECKING:
+    from waqd.base.component_reg import ComponentRegistry
+
+
+class Backoff:
+    """ Exponential backoff with an upper limit. """
+
+    def __init__(self, base_s: float, max_s: float):
+        self._base_s = base_s
+        self._max_s = max_s
+        self._attempts = 0
+
+    @property
+    def attempts(self) -> int:
+        """ Number of delays handed out since the last reset. """
+        return self._attempts
+
+    def next_delay(self) -> float:
+        """ Returns the delay for the next attempt and counts it. """
+        delay = min(self._base_s * (2 ** self._attempts), self._max_s)
+        self._attempts += 1
+        return delay
+
+    def reset(self):
+        self._attempts = 0
+
+
+class Supervisor:
+    """
+    Event driven restart of crashed components.
+    A CyclicComponent signals the unexpected exit of its update thread directly,
+    which triggers a restart after an exponential backoff.
+    Components, which keep failing are marked as degraded and are not restarted anymore.
+    """
+
+    BACKOFF_BASE_S = 5
+    BACKOFF_MAX_S = 600
+    MAX_RESTARTS = 5  # restarts in a row, before a component is degraded
+    STABLE_TIME_S = 600  # a component running this long counts as recovered
+
+    def __init__(self, components: "ComponentRegistry"):
+        self._components = components
+        self._lock = threading.Lock()
+        self._backoffs: Dict[str, Backoff] = {}
+        self._start_times: Dict[str, float] = {}
+        self._restart_timers: Dict[str, threading.Timer] = {}
+        self._degraded: Set[str] = set()
+        self._stopped = False
+
+    @property
+    def degraded(self) -> Set[str]:
+        """ Names of the components, which are given up on. """
+        return set(self._degraded)
+
+    def start(self):
+        self._stopped = False
+        self._components.set_exit_callback(self.notify_exit)
+
+    def stop(self):
+        """ Cancel all pending restarts. """
+        with self._lock:
+            self._stopped = True
+            for timer in self._restart_timers.values():
+                timer.cancel()
+            self._restart_timers.clear()
+
+    def notify_exit(self, component: CyclicComponent):
+        """ Called from the exiting update thread of a component. """
+        name = self._components.get_name(component)
+        if not name or self._components.unload_in_progress:
+            return
+        if component.is_disabled:
+            Logger().info("Supervisor: %s stopped itself, because it is disabled.", name)
+            return
+        with self._lock:
+            if self._stopped or name in self._restart_timers:
+                return
+            backoff = self._backoffs.setdefault(
+                name, Backoff(self.BACKOFF_BASE_S, self.BACKOFF_MAX_S)
+            )
+            # ran long enough to be considered healthy - start counting again
+            start_time = self._start_times.get(name)
+            if start_time and time.monotonic() - start_time > self.STABLE_TIME_S:
+                backoff.reset()
+            if backoff.attempts >= self.MAX_RESTARTS:
+                Logger().error(
+                    "Supervisor: %s failed %i times in a row - marking it as degraded.",
+                    name, backoff.attempts,
+                )
+                self._degraded.add(name)
+                component.disable()
+                return
+            delay = backoff.next_delay()
+            Logger().warning("Supervisor: %s exited, restarting in %.1f s.", name, delay)
+            timer = threading.Timer(delay, self._restart, args=[name])
+            timer.name = "Restart" + name
+            timer.daemon = True
+            self._restart_timers[name] = timer
+            timer.start()
+
+    def _restart(self, name: str):
+        with self._lock:
+            self._restart_timers.pop(name, None)
+            if self._stopped:
+                return
+            self._start_times[name] = time.monotonic()
+        Logger().info("Supervisor: Restarting %s", name)
+        try:
+            self._components.restart_component(name)
+        except Exception as error:
+            Logger().error("Supervisor: Restarting %s failed: %s", name, str(error))
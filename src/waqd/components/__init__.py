@@ -26,6 +26,7 @@ from waqd.components.sensors import (
     TempSensor,
     TvocSensor,
 )
+from waqd.components.sensor_worker import SensorWorker
 from waqd.components.sound import SoundInterface, SoundQt, SoundVLC
 from waqd.components.speech import TextToSpeach
 from waqd.components.updater import OnlineUpdater
@@ -54,6 +55,7 @@ __all__ = [
     "SensorComponent",
     "TempSensor",
     "TvocSensor",
+    "SensorWorker",
     "SoundInterface",
     "SoundQt",
     "SoundVLC",
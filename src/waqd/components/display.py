@@ -3,7 +3,7 @@ import os
 import threading
 
 from waqd.base.component import Component
-from waqd.settings import DISP_TYPE_RPI, DISP_TYPE_WAVESHARE_5_LCD
+from waqd.settings import BRIGHTNESS, DISP_TYPE_RPI, DISP_TYPE_WAVESHARE_5_LCD
 
 
 class Display(Component):
@@ -34,6 +34,12 @@ class Display(Component):
         """ Returns the current display brightness in percent, e.g. 75"""
         return self._brightness
 
+    def update_setting(self, name: str, value) -> bool:
+        if name == BRIGHTNESS:
+            self.set_brightness(int(value))
+            return True
+        return False
+
     def set_brightness(self, brightness: int):
         """ Sets the current display brightness in percent, e.g. 75"""
         if self._brightness == brightness:
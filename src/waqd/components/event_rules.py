@@ -0,0 +1,140 @@
+"""
+Rules to trigger events from sensor values, e.g. to remind to open the window at high CO2.
+The conditions are compiled once into predicates and the rules are indexed by measure,
+so a new sensor value only evaluates the rules, which use this measure.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from waqd.base.file_logger import Logger
+
+DEFAULT_LOCATION = "interior"
+DEFAULT_HOLD_S = 60
+DEFAULT_COOLDOWN_S = 30 * 60
+
+
+class Condition:
+    """
+    Threshold of one measure with hysteresis.
+    It is met, when the value crosses the threshold and released only,
+    when the value crosses back beyond the hysteresis band.
+    """
+
+    def __init__(self, location: str, measure: str, threshold: float, above: bool,
+                 hysteresis: float = 0):
+        self.location = location
+        self.measure = measure  # like "CO2_ppm", as logged by the sensors
+        self.is_met = False
+        if above:
+            release = threshold - hysteresis
+            self._enters: Callable[[float], bool] = lambda value: value > threshold
+            self._leaves: Callable[[float], bool] = lambda value: value < release
+        else:
+            release = threshold + hysteresis
+            self._enters = lambda value: value < threshold
+            self._leaves = lambda value: value > release
+
+    def update(self, value: float) -> bool:
+        """ Returns true, if the state has changed. """
+        if self.is_met:
+            if self._leaves(value):
+                self.is_met = False
+                return True
+        elif self._enters(value):
+            self.is_met = True
+            return True
+        return False
+
+
+class Rule:
+    """
+    Fires, when all conditions are met for at least hold_s.
+    It fires once per activation and again only after cooldown_s.
+    """
+
+    def __init__(self, event: Any, conditions: List[Condition], hold_s: float = DEFAULT_HOLD_S,
+                 cooldown_s: float = DEFAULT_COOLDOWN_S):
+        self.event = event
+        self.conditions = conditions
+        self._hold_s = hold_s
+        self._cooldown_s = cooldown_s
+        self._met_count = 0
+        self._met_since: Optional[float] = None
+        self._fired = False  # in the current activation
+        self._last_fired = float("-inf")
+
+    def update(self, condition: Condition, value: float, now: float) -> bool:
+        """ Returns true, if the rule fires. """
+        if condition.update(value):
+            self._met_count += 1 if condition.is_met else -1
+        if self._met_count < len(self.conditions):
+            self._met_since = None
+            self._fired = False
+            return False
+        if self._met_since is None:
+            self._met_since = now
+        if (self._fired or now - self._met_since < self._hold_s
+                or now - self._last_fired < self._cooldown_s):
+            return False
+        self._fired = True
+        self._last_fired = now
+        return True
+
+
+def compile_rule(event: Any) -> Optional[Rule]:
+    """ Create the rule of an event from its conditions. Invalid conditions are only logged. """
+    conditions = []
+    for condition_data in event.conditions:
+        thresholds = [key for key in ("above", "below") if key in condition_data]
+        if len(thresholds) != 1 or not condition_data.get("measure"):
+            Logger().error("EventHandler: Invalid condition in %s: %s", event.name,
+                           str(condition_data))
+            return None
+        conditions.append(Condition(condition_data.get("location", DEFAULT_LOCATION),
+                                    condition_data["measure"],
+                                    float(condition_data[thresholds[0]]),
+                                    above=thresholds[0] == "above",
+                                    hysteresis=float(condition_data.get("hysteresis", 0))))
+    if not conditions:
+        return None
+    return Rule(event, conditions, event.hold_s, event.cooldown_s)
+
+
+class RuleEngine:
+    """
+    Evaluates the rules incrementally with each accepted sensor value.
+    on_fire is called with the event of the rule and must not block,
+    because it runs in the thread of the sensor.
+    """
+
+    def __init__(self, on_fire: Callable[[Any], Any]):
+        self._on_fire = on_fire
+        self._lock = threading.Lock()
+        # (location, measure) -> conditions, which use it, with their rule
+        self._index: Dict[Tuple[str, str], List[Tuple[Rule, Condition]]] = {}
+
+    def clear(self):
+        with self._lock:
+            self._index = {}
+
+    def add_rule(self, rule: Rule):
+        with self._lock:
+            for condition in rule.conditions:
+                self._index.setdefault((condition.location, condition.measure), []).append(
+                    (rule, condition))
+
+    def add_sample(self, location: str, measure: str, value: Optional[float],
+                   now: Optional[float] = None):
+        entries = self._index.get((location, measure))
+        if not entries or value is None:
+            return
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            fired = [rule.event for rule, condition in entries
+                     if rule.update(condition, value, now)]
+        for event in fired:
+            Logger().info("EventHandler: %s triggered by %s %s", event.name, measure, value)
+            self._on_fire(event)
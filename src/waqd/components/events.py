@@ -3,10 +3,12 @@
 
 import datetime
 import json
+import os
 import threading
 import time
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional, Dict, TYPE_CHECKING
+from typing import Any, List, Optional, Dict, TYPE_CHECKING, Union
 
 from dateutil.parser import parse as parse_date
 from dateutil.relativedelta import relativedelta
@@ -16,11 +18,18 @@ from waqd.assets import get_asset_file
 from waqd.base.component import Component
 from waqd.base.component_reg import ComponentRegistry
 from waqd.base.file_logger import Logger
+from waqd.base.file_watcher import FileWatcher
+from waqd.components.event_rules import (DEFAULT_COOLDOWN_S, DEFAULT_HOLD_S, RuleEngine,
+                                         compile_rule)
 
 if TYPE_CHECKING:
     from PyQt5.QtCore import pyqtBoundSignal
+    from apscheduler.job import Job
     from apscheduler.schedulers.background import BackgroundScheduler
 
+PERSIST_JOB_ID = "persist_events"
+RELOAD_JOB_ID = "reload_events"
+
 
 class Event():
     """
@@ -33,6 +42,9 @@ class Event():
         self._date = ""
         self._triggers = []
         self._actions = {}
+        self._conditions = []
+        self._hold_s = DEFAULT_HOLD_S
+        self._cooldown_s = DEFAULT_COOLDOWN_S
         self._last_triggered = None
 
     @property
@@ -85,6 +97,37 @@ class Event():
     def actions(self, new_value:  Dict[str, str]):
         self._actions.update(new_value)
 
+    @property
+    def conditions(self) -> List[Dict]:
+        """
+        Sensor thresholds, which must all be met to execute the event, like
+        {"measure": "CO2_ppm", "above": 1200, "hysteresis": 100}.
+        An event with conditions is not scheduled by its recurrence.
+        """
+        return self._conditions
+
+    @conditions.setter
+    def conditions(self, new_value: List[Dict]):
+        self._conditions = new_value
+
+    @property
+    def hold_s(self) -> float:
+        """ Time the conditions must be met, before the event is executed. """
+        return self._hold_s
+
+    @hold_s.setter
+    def hold_s(self, new_value: float):
+        self._hold_s = new_value
+
+    @property
+    def cooldown_s(self) -> float:
+        """ Minimum time between two executions by the conditions. """
+        return self._cooldown_s
+
+    @cooldown_s.setter
+    def cooldown_s(self, new_value: float):
+        self._cooldown_s = new_value
+
     @property
     def last_triggered(self):
         """
@@ -98,53 +141,87 @@ class Event():
         self._last_triggered = new_value
 
 
-def parse_event_file(events_file_path: Path) -> List[Event]:
-    """ Parse the json config file, validate and convert to object structure """
-    events: List[Event] = []
+@lru_cache(maxsize=1)
+def get_events_schema() -> Dict[str, Any]:
+    """ The events schema is read only once. """
+    with open(get_asset_file("base", "events_schema"), encoding="utf-8") as schema_file:
+        return json.load(schema_file)
+
+
+@lru_cache(maxsize=1)
+def get_events_validator():
+    """ Validator of the events schema, which is checked and compiled only once. """
+    import jsonschema
+    json_schema = get_events_schema()
+    validator_class = jsonschema.validators.validator_for(json_schema)
+    validator_class.check_schema(json_schema)
+    return validator_class(json_schema)
+
+
+def read_events_config(events_file_path: Path) -> Optional[Dict[str, Any]]:
+    """ Read and validate the json config file. Returns None, if it is invalid. """
     Logger().info(f"EventHandler: Loading file '{events_file_path}'...")
 
     if not events_file_path.is_file():
         Logger().warning(f"EventHandler: Config file '{events_file_path}' does not exist.")
-        return []
+        return {}
     with open(events_file_path, encoding="utf-8") as config_file:
         try:
             events_config = json.load(config_file)
-            with open(get_asset_file("base", "events_schema")) as schema_file:
-                import jsonschema
-                json_schema = json.load(schema_file)
-                jsonschema.validate(instance=events_config, schema=json_schema)
+            get_events_validator().validate(events_config)
         except BaseException as error:
             Logger().error(f"EventHandler: Config file:\n{str(error)}")
-            return []
+            return None
+    return events_config
+
+
+def parse_event_file(events_file_path: Path) -> List[Event]:
+    """ Parse the json config file, validate and convert to object structure """
+    return parse_events_config(read_events_config(events_file_path) or {})
 
+
+def parse_events_config(events_config: Dict[str, Any]) -> List[Event]:
+    events: List[Event] = []
     for event_data in events_config.get("events", []):
         event = Event(event_data.get("name", ""))
         event.triggers = event_data.get("triggers", "")
         event.actions = event_data.get("actions", "")
         event.recurrence = event_data.get("recurrence", "")
         event.date = event_data.get("date", "")
+        event.conditions = event_data.get("conditions", [])
+        event.hold_s = event_data.get("hold_s", DEFAULT_HOLD_S)
+        event.cooldown_s = event_data.get("cooldown_s", DEFAULT_COOLDOWN_S)
         event.last_triggered = event_data.get("last_triggered", "")
         events.append(event)
     return events
 
 
-def write_events_file(events_file_path: Path, events: List[Event]):
-    """ Write out the json dict from model """
+def write_events_file(events_file_path: Union[str, Path], events: List[Event]):
+    """
+    Write out the json dict from model.
+    The file is replaced atomically, so it is never read partially written.
+    """
     events_data = []
     for event in events:
         event_data = {"name": event.name, "recurrence": event.recurrence,
                       "date": event.date, "triggers": event.triggers,
                       "actions": event.actions, "last_triggered": event.last_triggered}
+        if event.conditions:
+            event_data.update({"conditions": event.conditions, "hold_s": event.hold_s,
+                               "cooldown_s": event.cooldown_s})
         events_data.append(event_data)
 
     # get last version
-    with open(get_asset_file("base", "events_schema")) as schema_file:
-        json_schema = json.load(schema_file)
-    version = json_schema.get("properties").get("version").get("enum")[-1]
+    version = get_events_schema().get("properties").get("version").get("enum")[-1]
     events_config = {"version": version, "events": events_data}
+    events_file_path = Path(events_file_path)
+    temp_file_path = events_file_path.with_name(events_file_path.name + ".tmp")
     try:
-        with open(events_file_path, "w") as config_file:
+        with open(temp_file_path, "w", encoding="utf-8") as config_file:
             json.dump(events_config, config_file, indent=4)
+            config_file.flush()
+            os.fsync(config_file.fileno())
+        os.replace(temp_file_path, events_file_path)
     except Exception:
         Logger().error("EventHandler: Cannot open events.json file")
 
@@ -177,8 +254,13 @@ def get_time_of_day() -> str:
 class EventHandler(Component):
     """
     Scheduler for configured events.
+    The events are kept in memory; changes of last_triggered are written debounced.
+    Edits of the events file are reloaded into the running scheduler.
     """
 
+    PERSIST_DELAY_S = 10  # executions in this time are written at once
+    RELOAD_DELAY_S = 1  # editors can write a file in several steps
+
     def __init__(self,  components: ComponentRegistry, lang: str, night_mode_end: int, enabled=True):
         super().__init__(components, enabled=enabled)
 
@@ -190,27 +272,112 @@ class EventHandler(Component):
         self.gui_background_update_sig: Optional["pyqtBoundSignal"] = None
         self._config_events_file = waqd.user_config_dir / "events.json"
         self._events = parse_event_file(self._config_events_file)
+        self._events_lock = threading.RLock()
+        self._event_jobs: List["Job"] = []  # registered from the events file
+        self._written_mtime = -1  # to ignore the notification of an own write
+        self._file_watcher: Optional[FileWatcher] = None
+        self._rule_engine = RuleEngine(self._start_execute_event)
+        self._has_rules = False
 
         self._init_thread = threading.Thread(
             name="StartScheduler", target=self._init_scheduler, daemon=True)
         self._init_thread.start()
 
     def stop(self):
-        if self._scheduler:
-            self._scheduler.shutdown(wait=False)
+        if not self._scheduler:
+            return
+        if self._file_watcher:
+            self._file_watcher.stop()
+        from waqd.components.sensors import SensorImpl
+        SensorImpl.value_signal.unsubscribe(self._rule_engine.add_sample)
+        with self._events_lock:
+            persist_job = self._scheduler.get_job(PERSIST_JOB_ID)
+            if persist_job:  # write now
+                persist_job.remove()
+                self._write_events()
+        self._scheduler.shutdown(wait=False)
 
     def _init_scheduler(self):
         from apscheduler.schedulers.background import BackgroundScheduler
         self._scheduler = BackgroundScheduler()
         self._scheduler.configure(job_defaults={"misfire_grace_time": 3, "max_instances": 1})
-        for event in self._events:
-            self._register_event(event)
+        with self._events_lock:
+            self._register_events(direct_exec=True)
         self._scheduler.start()
+        self._file_watcher = FileWatcher(self._config_events_file, self._on_events_file_changed)
         self._ready = True
 
-    def _register_event(self, event: Event):
+    def _register_events(self, direct_exec: bool):
+        """ Needs the events lock. """
+        self._rule_engine.clear()
+        self._has_rules = False
+        self._event_jobs = []
+        for event in self._events:
+            self._register_event(event, direct_exec)
+        from waqd.components.sensors import SensorImpl
+        if self._has_rules:  # evaluated with every sensor value
+            SensorImpl.value_signal.subscribe(self._rule_engine.add_sample)
+        else:
+            SensorImpl.value_signal.unsubscribe(self._rule_engine.add_sample)
+
+    def _on_events_file_changed(self):
+        """ Called by the file watcher. Reloads after RELOAD_DELAY_S without new changes. """
+        assert self._scheduler, "Internal components not available."
+        with self._events_lock:
+            try:
+                mtime = self._config_events_file.stat().st_mtime_ns
+            except OSError:
+                mtime = -1
+            if mtime == self._written_mtime:
+                return
+        self._scheduler.add_job(
+            self._reload_events, id=RELOAD_JOB_ID, replace_existing=True, trigger="date",
+            run_date=datetime.datetime.now() + datetime.timedelta(seconds=self.RELOAD_DELAY_S))
+
+    def _reload_events(self):
+        events_config = read_events_config(self._config_events_file)
+        if events_config is None:
+            self._logger.warning("EventHandler: Keeping the current events.")
+            return
+        with self._events_lock:
+            for job in self._event_jobs:
+                try:
+                    job.remove()
+                except Exception:  # already executed
+                    pass
+            self._events = parse_events_config(events_config)
+            # the executions of today already happened or are still pending
+            self._register_events(direct_exec=False)
+        self._logger.info("EventHandler: Reloaded %i events", len(self._events))
+
+    def _persist_events(self):
+        """ Write the events debounced, the current list is written with the last change. """
+        assert self._scheduler, "Internal components not available."
+        with self._events_lock:
+            if self._scheduler.get_job(PERSIST_JOB_ID):  # still pending
+                return
+            delay = datetime.timedelta(seconds=self.PERSIST_DELAY_S)
+            self._scheduler.add_job(
+                self._write_events, id=PERSIST_JOB_ID, trigger="date",
+                run_date=datetime.datetime.now() + delay)
+
+    def _write_events(self):
+        with self._events_lock:
+            write_events_file(self._config_events_file, self._events)
+            try:
+                self._written_mtime = self._config_events_file.stat().st_mtime_ns
+            except OSError:
+                pass
+
+    def _register_event(self, event: Event, direct_exec=True):
         self._logger.debug("EventHandler: Registering " + event.name)
         assert self._scheduler, "Internal components not available."
+        if event.conditions:
+            rule = compile_rule(event)
+            if rule:
+                self._rule_engine.add_rule(rule)
+                self._has_rules = True
+            return
         current_date_time = datetime.datetime.now()
         # Determine, if it would have run today, so it can be scheduled for immediate execution
         # immediate exec does not log last exec!
@@ -223,9 +390,9 @@ class EventHandler(Component):
                 day_of_week_to_run = "mon–fri"
                 if current_date_time.isoweekday() < 6:
                     would_run_today = True
-            self._scheduler.add_job(self._start_execute_event, name=event.name, args=[event],
-                                    trigger="cron", day_of_week=day_of_week_to_run,
-                                    hour=self._night_mode_end)
+            self._event_jobs.append(self._scheduler.add_job(
+                self._start_execute_event, name=event.name, args=[event],
+                trigger="cron", day_of_week=day_of_week_to_run, hour=self._night_mode_end))
         elif event.recurrence == "date":
             date_obj = None
             try:
@@ -237,11 +404,12 @@ class EventHandler(Component):
             time_delta = current_date_time - date_obj
             if time_delta.days == 0:
                 would_run_today = True
-            self._scheduler.add_job(self._start_execute_event, name=event.name, args=[event],
-                                    trigger="cron", month=date_obj.month, day=date_obj.day,
-                                    hour=date_obj.hour, minute=date_obj.minute)
+            self._event_jobs.append(self._scheduler.add_job(
+                self._start_execute_event, name=event.name, args=[event],
+                trigger="cron", month=date_obj.month, day=date_obj.day,
+                hour=date_obj.hour, minute=date_obj.minute))
         # check immediatly executable jobs
-        if event.triggers or "background" in event.actions:
+        if direct_exec and (event.triggers or "background" in event.actions):
             if not would_run_today:
                 return
             time_delta = datetime.timedelta()
@@ -283,15 +451,45 @@ class EventHandler(Component):
                                     trigger="cron", start_date=current_date_time,
                                     year=new_date.year, month=new_date.month, day=new_date.day)
 
-        if "text_2_speach" in event.actions:
-            if "motion" in event.triggers:  # wait for motion sensor to trigger
-                # timeout is the next day
-                new_date = current_date_time + relativedelta(days=+1)
-                while (not(not self._comps.energy_saver.night_mode_active and self._comps.energy_saver.is_awake)
-                       and current_date_time < new_date):
-                    time.sleep(2)
-                    current_date_time = datetime.datetime.now()
+        if "text_2_speach" in event.actions and "motion" in event.triggers:
+            energy_saver = self._comps.energy_saver
+            if energy_saver.night_mode_active or not energy_saver.is_awake:
+                self._wait_for_motion(event)  # executes the remaining actions
+                return
+        self._execute_actions(event)
 
+    def _wait_for_motion(self, event: Event):
+        """
+        Executes the actions of the event with the next wake-up by the motion sensor.
+        Timeout is the next day, then the actions are executed regardless.
+        """
+        assert self._scheduler and self._comps, "Internal components not available."
+        wake_up_signal = self._comps.energy_saver.wake_up_signal
+        timeout_job = None
+
+        def on_wake_up():
+            if timeout_job:
+                try:
+                    timeout_job.remove()
+                except Exception:  # already executed
+                    pass
+            self._scheduler.add_job(self._execute_actions, name=event.name + "_motion",
+                                    args=[event])
+
+        def on_timeout():
+            if wake_up_signal.unsubscribe(on_wake_up):  # otherwise it was already woken up
+                self._logger.debug("EventHandler: No motion for %s until timeout", event.name)
+                self._execute_actions(event)
+
+        self._logger.debug("EventHandler: Waiting for motion to execute %s", event.name)
+        timeout_job = self._scheduler.add_job(
+            on_timeout, name=event.name + "_motion_timeout", trigger="date",
+            run_date=datetime.datetime.now() + relativedelta(days=+1))
+        wake_up_signal.subscribe_once(on_wake_up)
+
+    def _execute_actions(self, event: Event):
+        assert self._comps, "Internal components not available."
+        if "text_2_speach" in event.actions:
             text = event.actions.get("text_2_speach", "")
             if text:  # replace known patterns
                 text = text.replace("${day_time_greeting}", self._comps.tts.get_tts_string(
@@ -304,4 +502,4 @@ class EventHandler(Component):
             self._comps.sound.play(Path(sound))
 
         event.last_triggered = str(datetime.datetime.now())
-        write_events_file(self._config_events_file, self._events)
+        self._persist_events()
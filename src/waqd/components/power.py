@@ -1,14 +1,17 @@
 import datetime
+import threading
 import time
-from threading import Timer
+from typing import Tuple
 
 from pynput import mouse
 import waqd.app as app
 from waqd.base.component_reg import ComponentRegistry, CyclicComponent
+from waqd.base.signal import Signal
 from waqd.settings import (
     BRIGHTNESS,
     DAY_STANDBY_TIMEOUT,
     MOTION_SENSOR_ENABLED,
+    MOTION_SENSOR_PIN,
     NIGHT_MODE_BEGIN,
     NIGHT_MODE_END,
     NIGHT_STANDBY_TIMEOUT,
@@ -21,15 +24,48 @@ NIGHT_STANDBY_BRIGHTNESS = 10
 NIGHTMODE_WAKEUP_DELTA_BRIGHTNESS = 20
 
 
+def parse_day_time(value: str) -> datetime.time:
+    """ Time of a setting in iso format. Older settings contain only the hour. """
+    if value.strip().isdigit():
+        return datetime.time(hour=int(value))
+    return datetime.time.fromisoformat(value)
+
+
+def get_night_mode(now: datetime.datetime, night_begin: datetime.time,
+                   night_end: datetime.time) -> Tuple[bool, datetime.datetime]:
+    """
+    Returns, if it is night at the given time and when the next switch between
+    night and day is. The night can span midnight. Without a night the switch is in a day.
+    """
+    today = now.date()
+    begin = datetime.datetime.combine(today, night_begin)
+    end = datetime.datetime.combine(today, night_end)
+    if begin == end:
+        return False, now + datetime.timedelta(days=1)
+    if begin > end:  # over midnight
+        is_night = now >= begin or now < end
+    else:
+        is_night = begin <= now < end
+    one_day = datetime.timedelta(days=1)
+    next_switch = min(switch for switch in (begin, end, begin + one_day, end + one_day)
+                      if switch > now)
+    return is_night, next_switch
+
+
 class ESaver(CyclicComponent):
     """
     Energy saver class  to manage the display day/night switch feature and
     wake-up/standby from motion sensor.
+    The states are day, day standby (with motion sensor), night and awake at day or night.
+    The thread sleeps until the next transition - begin or end of the night or the end of
+    the standby timeout - or until a wake-up by the motion sensor or a touch.
+    Publishes wake_up_signal, when the display is woken up during the day.
     """
 
-    # TODO event based wake up and increase updatetime to 60 s
     INIT_WAIT_TIME = 5
-    UPDATE_TIME = 2
+    # longest time between two evaluations, to follow changes of the system clock
+    UPDATE_TIME = 15 * 60
+    STOP_TIMEOUT = 2
 
     def __init__(self, components: ComponentRegistry, settings):
         super().__init__(components, settings)
@@ -37,11 +73,17 @@ class ESaver(CyclicComponent):
         self._comps: ComponentRegistry
 
         self._night_mode_active = False
-        self._is_awake = False
-        self._sleep_timer = None
-        self._start_update_loop(update_func=self._set_day_night_mode)
-        self._ready = True
+        self._awake_until = datetime.datetime.min
+        self._lock = threading.Lock()
+        self._state_event = threading.Event()  # set for a new evaluation of the state
         self._previous_state = ""
+        self._load_settings()
+        self.wake_up_signal = Signal("ESaver")
+        self._motion_sensor = None  # subscribed to in the update loop
+        self._update_thread = threading.Thread(name=self.__class__.__name__,
+                                               target=self._state_loop, daemon=True)
+        self._update_thread.start()
+        self._ready = True
         self._mouse_listener = mouse.Listener(
             on_move=ESaver._on_mouse_move,
         )
@@ -51,7 +93,7 @@ class ESaver(CyclicComponent):
     def is_awake(self):
         """Display is in awake mode (higher brightness)"""
         motion_detected = self._comps.motion_detection_sensor.motion_detected
-        return self._is_awake or motion_detected
+        return datetime.datetime.now() < self._awake_until or motion_detected
 
     @property
     def night_mode_active(self):
@@ -59,93 +101,134 @@ class ESaver(CyclicComponent):
         return self._night_mode_active
 
     def wake_up(self, seconds: float):
-        if self._is_awake:
-            return
-        self._logger.info("Wake up from external device")
-        self._is_awake = True
-        self._sleep_timer = Timer(seconds, self.sleep)
-        self._sleep_timer.start()
+        """ Wake up from external device. Stays awake for at least the standby timeout. """
+        if self._wake(seconds):
+            self._logger.info("Wake up from external device")
 
     def sleep(self):
-        self._is_awake = False
+        with self._lock:
+            self._awake_until = datetime.datetime.min
+        self._state_event.set()
+
+    def update_setting(self, name: str, value) -> bool:
+        if name not in (BRIGHTNESS, DAY_STANDBY_TIMEOUT, MOTION_SENSOR_ENABLED,
+                        MOTION_SENSOR_PIN, NIGHT_MODE_BEGIN, NIGHT_MODE_END,
+                        NIGHT_STANDBY_TIMEOUT):
+            return False
+        with self._lock:
+            self._load_settings()
+            self._previous_state = ""  # apply the brightness again
+        self._state_event.set()
+        return True
+
+    def stop(self):
+        self._ticker_event.set()
+        self._state_event.set()
+        super().stop()
+        if self._motion_sensor:
+            self._motion_sensor.motion_signal.unsubscribe(self._on_motion)
+
+    def _load_settings(self):
+        """ Parse the settings once, instead of with every evaluation. """
+        self._night_begin = parse_day_time(self._settings.get_string(NIGHT_MODE_BEGIN))
+        self._night_end = parse_day_time(self._settings.get_string(NIGHT_MODE_END))
+        self._brightness = self._settings.get_int(BRIGHTNESS)
+        self._day_standby_timeout = self._settings.get_int(DAY_STANDBY_TIMEOUT)
+        self._night_standby_timeout = self._settings.get_int(NIGHT_STANDBY_TIMEOUT)
+        self._motion_sensor_enabled = self._settings.get_bool(MOTION_SENSOR_ENABLED)
+
+    def _subscribe_motion_sensor(self):
+        """
+        Follows a reload of the sensor, e.g. after a change of its settings.
+        Must not be called in the constructor, which runs with the lock of the registry.
+        """
+        sensor = self._comps.motion_detection_sensor
+        if sensor is self._motion_sensor:
+            return
+        if self._motion_sensor:
+            self._motion_sensor.motion_signal.unsubscribe(self._on_motion)
+        sensor.motion_signal.subscribe(self._on_motion)
+        self._motion_sensor = sensor
+
+    def _on_motion(self):
+        self._wake(0)
+
+    def _wake(self, seconds: float) -> bool:
+        """ Extends the awake time. Returns true, if the display was not awake. """
+        now = datetime.datetime.now()
+        with self._lock:
+            timeout = (self._night_standby_timeout if self._night_mode_active
+                       else self._day_standby_timeout)
+            was_awake = now < self._awake_until
+            self._awake_until = max(self._awake_until,
+                                    now + datetime.timedelta(seconds=max(seconds, timeout)))
+        if not was_awake:  # otherwise the new end is evaluated, when the old one is reached
+            self._state_event.set()
+        self._publish_wake_up()
+        return not was_awake
+
+    def _publish_wake_up(self):
+        if not self._night_mode_active:
+            self.wake_up_signal.emit()
 
     @staticmethod
     def _on_mouse_move(x: int, y: int, injected=None):
         # Very ugly workround, because we can't register instance methods
         app.comp_ctrl.components.energy_saver.wake_up(5)
 
-    def _set_day_night_mode(self):
-        """Runs periodically. Does the actual switch between the modes and sets brightness"""
-        # get value from motion sensor - if available
-        if self._settings.get_bool(MOTION_SENSOR_ENABLED):
-            NIGHT_MODE_BRIGHTNESS = 0
-        else:
-            NIGHT_MODE_BRIGHTNESS = NIGHT_STANDBY_BRIGHTNESS
-
-        # determine sleep and wake time
-        current_date_time = datetime.datetime.now()
-        temp_time = datetime.datetime(
-            current_date_time.year, current_date_time.month, current_date_time.day, 0, 0
-        )
-
-        sleep_begin_setting = datetime.time.fromisoformat(
-            self._settings.get_string(NIGHT_MODE_BEGIN)
-        )
-        sleep_time = temp_time + datetime.timedelta(
-            hours=sleep_begin_setting.hour, minutes=sleep_begin_setting.minute
-        )
-
-        wake_time_setting = datetime.time.fromisoformat(
-            self._settings.get_string(NIGHT_MODE_END)
-        )
-        wake_time = temp_time + datetime.timedelta(
-            hours=wake_time_setting.hour, minutes=wake_time_setting.minute
-        )
-
-        last_minute_today = temp_time + datetime.timedelta(hours=23, minutes=59, seconds=59)
-
-        is_before_midnight = current_date_time < last_minute_today
-        if (
-            sleep_time.hour > wake_time.hour
-            and current_date_time > sleep_time
-            and is_before_midnight
-        ):
-            wake_time = wake_time + datetime.timedelta(days=1)
-        elif (
-            sleep_time.hour < wake_time.hour
-            and current_date_time > wake_time
-            and is_before_midnight
-        ):
-            sleep_time = sleep_time + datetime.timedelta(days=1)
-
-        # last exit point, to not vibrate screenon stop event
-        if self._ticker_event.is_set():
-            return
-
-        # switch through the different modes
-        if self.is_awake:  # wake from motion sensor
-            if self.night_mode_active:
-                self._logger.debug("ESaver: Wake-up at night")
-                self._comps.display.set_brightness(
-                    self._settings.get_int(BRIGHTNESS) - NIGHTMODE_WAKEUP_DELTA_BRIGHTNESS
-                )
-                time.sleep(self._settings.get_int(NIGHT_STANDBY_TIMEOUT))
+    def _state_loop(self):
+        """ Evaluates the state and sleeps until the next transition or wake-up. """
+        stop_requested = False
+        try:
+            if self._ticker_event.wait(self.INIT_WAIT_TIME):
+                return
+            while not self._ticker_event.is_set():
+                self._state_event.clear()
+                start_time = time.perf_counter()
+                self._subscribe_motion_sensor()
+                wait_time = self._update_state()
+                self._record_update_duration(time.perf_counter() - start_time)
+                self._state_event.wait(wait_time)
+        except Exception as error:
+            self._logger.error("%s: Update loop crashed: %s", self.__class__.__name__,
+                               str(error))
+        finally:
+            # signal the supervisor, if nobody asked us to stop
+            stop_requested |= self._ticker_event.is_set()
+            if self._exit_callback and not stop_requested:
+                self._exit_callback(self)
+
+    def _update_state(self) -> float:
+        """
+        Does the actual switch between the modes and sets brightness, if the state changed.
+        Returns the time in seconds until the next transition.
+        """
+        now = datetime.datetime.now()
+        with self._lock:
+            is_night, next_transition = get_night_mode(now, self._night_begin, self._night_end)
+            self._night_mode_active = is_night
+            awake_until = self._awake_until
+            if now < awake_until:
+                next_transition = min(next_transition, awake_until)
+                if is_night:
+                    new_state = "Wake-up at night"
+                    brightness = self._brightness - NIGHTMODE_WAKEUP_DELTA_BRIGHTNESS
+                else:
+                    new_state = "Wake up at day"
+                    brightness = self._brightness
+            elif is_night:
+                new_state = "Night mode"
+                brightness = (NIGHT_MODE_BRIGHTNESS if self._motion_sensor_enabled
+                              else NIGHT_STANDBY_BRIGHTNESS)
+            elif self._motion_sensor_enabled:
+                new_state = "Day standby mode"
+                brightness = STANDBY_BRIGHTNESS
             else:
-                self._logger.debug("ESaver: Wake up at day")
-                self._comps.display.set_brightness(self._settings.get_int(BRIGHTNESS))
-                time.sleep(self._settings.get_int(DAY_STANDBY_TIMEOUT))
-        else:
-            if self.night_mode_active and (wake_time <= current_date_time < sleep_time):
                 new_state = "Normal day mode"
-                self._comps.display.set_brightness(self._settings.get_int(BRIGHTNESS))
-                self._night_mode_active = False
-            elif not self.night_mode_active and self._settings.get(MOTION_SENSOR_ENABLED):
-                new_state = "Day standby mode"
-                self._comps.display.set_brightness(STANDBY_BRIGHTNESS)
-            if current_date_time <= wake_time or current_date_time >= sleep_time:
-                new_state = "Night mode"
-                self._night_mode_active = True
-                self._comps.display.set_brightness(NIGHT_MODE_BRIGHTNESS)
-            if self._previous_state != new_state:
-                self._logger.debug("ESaver: %s", new_state)
-                self._previous_state = new_state
+                brightness = self._brightness
+            state_changed = self._previous_state != new_state
+            self._previous_state = new_state
+        if state_changed:
+            self._logger.debug("ESaver: %s", new_state)
+            self._comps.display.set_brightness(brightness)
+        return min(max((next_transition - now).total_seconds(), 0), self.UPDATE_TIME)
@@ -0,0 +1,241 @@
+"""
+Runs the sensor drivers in a separate process, so that blocking driver calls
+(pulseio, I2C resets, sleep based timings) don't contend for the GIL with the web server.
+The worker publishes its readings into a shared memory block, which is read without locking.
+"""
+
+import math
+import multiprocessing
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, Optional
+
+from waqd.base.component import CyclicComponent
+from waqd.base.component_reg import ComponentRegistry
+from waqd.base.supervisor import Backoff
+from waqd.components.sensors import (
+    SENSOR_INTERIOR_TYPE,
+    BarometricSensor,
+    CO2Sensor,
+    HumiditySensor,
+    TempSensor,
+    TvocSensor,
+)
+from waqd.settings import LOG_SENSOR_DATA, SENSOR_WORKER_PROCESS, Settings
+
+# the sensor interfaces, which are served by the SensorWorker
+SENSOR_CLASSES = (TempSensor, HumiditySensor, BarometricSensor, CO2Sensor, TvocSensor)
+
+
+class SensorSnapshot:
+    """
+    Latest sensor readings in a shared memory block with a single writer.
+    Consistency is ensured with a sequence counter (seqlock):
+    It is odd while the writer is busy and the reader retries, if it changed during a read.
+    Missing values are stored as NaN.
+    """
+
+    FIELDS = ("temp_degC", "hum_percent", "pressure_hPa", "co2_ppm", "tvoc_ppb",
+              "stabilized", "time")
+    _VALUES_FORMAT = "<" + "d" * len(FIELDS)
+    _FORMAT = "<Q" + _VALUES_FORMAT[1:]
+    _VALUES_OFFSET = struct.calcsize("<Q")
+    MAX_READ_RETRIES = 100
+
+    def __init__(self, name: Optional[str] = None):
+        """ Creates a new block, or attaches to an existing one, if a name is given. """
+        if name:
+            # spawned processes share the resource tracker of the creator,
+            # which unlinks the block
+            self._shm = shared_memory.SharedMemory(name=name)
+        else:
+            self._shm = shared_memory.SharedMemory(create=True,
+                                                   size=struct.calcsize(self._FORMAT))
+            struct.pack_into(self._FORMAT, self._shm.buf, 0, 0,
+                             *([math.nan] * len(self.FIELDS)))
+        self._seq = struct.unpack_from("<Q", self._shm.buf, 0)[0]
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def write(self, values: Dict[str, Optional[float]]):
+        """ Publish a new set of values. Must only be called from one process. """
+        data = [math.nan if values.get(field) is None else float(values[field])  # type: ignore
+                for field in self.FIELDS]
+        self._seq += 1  # odd: write in progress
+        struct.pack_into("<Q", self._shm.buf, 0, self._seq)
+        struct.pack_into(self._VALUES_FORMAT, self._shm.buf, self._VALUES_OFFSET, *data)
+        self._seq += 1
+        struct.pack_into("<Q", self._shm.buf, 0, self._seq)
+
+    def read(self) -> Optional[Dict[str, Optional[float]]]:
+        """ Returns the last consistent set of values or None, if nothing was written yet. """
+        for _ in range(self.MAX_READ_RETRIES):
+            seq_before, *data = struct.unpack_from(self._FORMAT, self._shm.buf, 0)
+            if seq_before % 2:
+                time.sleep(0)  # writer is busy - yield
+                continue
+            if struct.unpack_from("<Q", self._shm.buf, 0)[0] != seq_before:
+                continue
+            if seq_before == 0:
+                return None
+            return {field: None if math.isnan(value) else value
+                    for field, value in zip(self.FIELDS, data)}
+        return None
+
+    def close(self):
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+
+def run_sensor_worker(snapshot_name: str, ini_folder: Path, update_time: float):
+    """
+    Entry point of the worker process.
+    Creates the sensors configured in the settings and publishes their values.
+    """
+    import waqd.app as app
+    app.setup_unit_reg()  # the new interpreter has no app set up
+    settings = Settings(ini_folder, auto_save=False)
+    # values are logged by the main process, which must also be the only one to start a worker
+    settings.set(LOG_SENSOR_DATA, False)
+    settings.set(SENSOR_WORKER_PROCESS, False)
+    comps = ComponentRegistry(settings)
+    snapshot = SensorSnapshot(snapshot_name)
+    parent_pid = os.getppid()
+    try:
+        while os.getppid() == parent_pid:  # exit with the main process
+            sensors = [comps.temp_sensor, comps.humidity_sensor, comps.pressure_sensor,
+                       comps.co2_sensor, comps.tvoc_sensor]
+            temp = comps.temp_sensor.get_temperature()
+            hum = comps.humidity_sensor.get_humidity()
+            pressure = comps.pressure_sensor.get_pressure()
+            co2 = comps.co2_sensor.get_co2()
+            tvoc = comps.tvoc_sensor.get_tvoc()
+            snapshot.write({
+                "temp_degC": temp.m_as("degC") if temp is not None else None,
+                "hum_percent": hum.m_as("percent") if hum is not None else None,
+                "pressure_hPa": pressure.m_as("hPa") if pressure is not None else None,
+                "co2_ppm": co2.m_as("ppm") if co2 is not None else None,
+                "tvoc_ppb": tvoc.m_as("ppb") if tvoc is not None else None,
+                "stabilized": all(sensor.readings_stabilized for sensor in sensors
+                                  if not sensor.is_disabled),
+                "time": time.time(),
+            })
+            time.sleep(update_time)
+    finally:
+        for name in comps.get_names():
+            comps.stop_component(name)
+        snapshot.close()
+
+
+class SensorWorker(TempSensor, HumiditySensor, BarometricSensor, CO2Sensor, TvocSensor,
+                   CyclicComponent):
+    """
+    Proxy for all sensors running in the worker process.
+    Reads the shared snapshot cyclically and restarts the worker, if it crashed or hangs.
+    """
+
+    MEASURE_POINTS = 1  # moving average is done by the sensors in the worker
+    INIT_WAIT_TIME = 0
+    UPDATE_TIME = 2
+    WORKER_UPDATE_TIME = 2
+    STOP_TIMEOUT = 5  # for the worker to exit after terminate, before it is killed
+    STALE_TIME_S = 60  # no new values for this time means the worker hangs
+    BACKOFF_BASE_S = 5
+    BACKOFF_MAX_S = 300
+
+    def __init__(self, components: ComponentRegistry, settings: Settings):
+        log_values = bool(settings.get(LOG_SENSOR_DATA))
+        for sensor_class in SENSOR_CLASSES:
+            sensor_class.__init__(
+                self,
+                log_values,
+                self.MEASURE_POINTS,
+                log_location_type=SENSOR_INTERIOR_TYPE,
+                invalidation_time_s=self.STALE_TIME_S,
+            )
+        CyclicComponent.__init__(self, components, settings)
+        self._settings: Settings
+        # spawn, so that no threads and locks of this process are inherited
+        self._mp_context = multiprocessing.get_context("spawn")
+        self._process: Optional[multiprocessing.process.BaseProcess] = None
+        self._process_start_time = 0.0
+        self._next_start_time = 0.0
+        self._backoff = Backoff(self.BACKOFF_BASE_S, self.BACKOFF_MAX_S)
+        self._snapshot = SensorSnapshot()
+        self._start_update_loop(self._start_worker, self._read_snapshot)
+
+    def _start_worker(self):
+        self._logger.info("SensorWorker: Starting worker process")
+        self._process = self._mp_context.Process(
+            name="SensorWorker",
+            target=run_sensor_worker,
+            args=[self._snapshot.name, self._settings.ini_folder, self.WORKER_UPDATE_TIME],
+            daemon=True,
+        )
+        self._process.start()
+        self._process_start_time = time.time()
+
+    def _stop_worker(self):
+        if not self._process:
+            return
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(self.STOP_TIMEOUT)
+            if self._process.is_alive():
+                self._process.kill()
+                self._process.join()
+        self._process = None
+
+    def _worker_is_healthy(self, values: Optional[Dict[str, Optional[float]]]) -> bool:
+        if not self._process or not self._process.is_alive():
+            self._logger.error("SensorWorker: Worker process exited")
+            return False
+        last_update = values.get("time") if values else None
+        if time.time() - (last_update or self._process_start_time) > self.STALE_TIME_S:
+            self._logger.error("SensorWorker: Worker process does not respond")
+            return False
+        return True
+
+    def _read_snapshot(self):
+        if not self._process:  # waiting for restart
+            if time.time() >= self._next_start_time:
+                self._start_worker()
+            return
+        values = self._snapshot.read()
+        if not self._worker_is_healthy(values):
+            self._stop_worker()
+            delay = self._backoff.next_delay()
+            self._logger.warning("SensorWorker: Restarting worker process in %i s", delay)
+            self._next_start_time = time.time() + delay
+            return
+        # running long enough to count as recovered
+        if time.time() - self._process_start_time > self.STALE_TIME_S:
+            self._backoff.reset()
+        if not values:
+            return
+        setters = {
+            "temp_degC": self._set_temperature,
+            "hum_percent": self._set_humidity,
+            "pressure_hPa": self._set_pressure,
+            "co2_ppm": self._set_co2,
+            "tvoc_ppb": self._set_tvoc,
+        }
+        for field, setter in setters.items():
+            if values[field] is not None:
+                setter(values[field])
+        self._readings_stabilized = bool(values["stabilized"])
+
+    def stop(self):
+        CyclicComponent.stop(self)
+        self._stop_worker()
+        for sensor_class in SENSOR_CLASSES:
+            sensor_class.stop(self)
+        self._snapshot.close()
+        self._snapshot.unlink()
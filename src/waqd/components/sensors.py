@@ -14,18 +14,19 @@ from subprocess import check_output
 from typing import TYPE_CHECKING, Optional
 
 import board
-import requests
 import RPi.GPIO
 from gpiozero import MotionSensor
 from pint.facets.plain import PlainQuantity as Quantity
 
 from waqd import LOCAL_TIMEZONE
-from waqd.app import unit_reg
+import waqd.app as app
 from waqd.base.component import Component, CyclicComponent
 from waqd.base.component_reg import ComponentRegistry
 from waqd.base.db_logger import InfluxSensorLogger
 from waqd.base.file_logger import Logger, SensorFileLogger
+from waqd.base.http_client import HttpClient, HttpError
 from waqd.base.network import Network
+from waqd.base.signal import Signal
 from waqd.settings import (LAST_TEMP_C_OUTSIDE, LOCATION_ALTITUDE_M,
                            LOG_SENSOR_DATA, MH_Z19_VALUE_OFFSET,
                            REMOTE_API_KEY, REMOTE_MODE_URL, Settings)
@@ -71,9 +72,12 @@ class SensorImpl:
     """Class for any sensor type to store measurements with a moving average.
     Logs to file/db, if "log_to_file" is activated.
     To be used with pimpl pattern and not as a base class!
+    Every accepted value is published with value_signal, with the location type,
+    the measure type and the moving average.
     """
 
     LOGGING_INTERVAL = datetime.timedelta(minutes=1)
+    value_signal = Signal("SensorImpl")  # shared by all sensors
     MAX_TIMES_DELTA_VIOLATED = 1
 
     def __init__(
@@ -216,6 +220,8 @@ class SensorImpl:
 
         if len(self._values) > self._values_capacity:
             self._values.pop(0)
+        self.value_signal.emit(self._log_location_type, self._log_measure_type,
+                               self.get_value())
         # log only at full measurement window - slower logging
         if self._logging_enabled and self.log_values:
             if datetime.datetime.now() - self._last_logging_time <= self.LOGGING_INTERVAL:
@@ -269,7 +275,7 @@ class TempSensor(SensorComponent):
         """Return temperature in degree Celsius"""
         value = self.get_value_with_status(self._temp_impl)
         if value is not None:
-            return unit_reg.Quantity(value, "degC")
+            return app.unit_reg.Quantity(value, "degC")
         return None
 
     def _set_temperature(self, value: Optional[float]) -> bool:
@@ -317,7 +323,7 @@ class BarometricSensor(SensorComponent):
         """Return the pressure in hPa"""
         value = self.get_value_with_status(self._pres_impl)
         if value is not None:
-            return unit_reg.Quantity(value, "hPa")
+            return app.unit_reg.Quantity(value, "hPa")
         return None
 
     def _set_pressure(self, value: Optional[float]):
@@ -371,7 +377,7 @@ class HumiditySensor(SensorComponent):
         """Return the humidity in %"""
         value = self.get_value_with_status(self._hum_impl)
         if value is not None:
-            return unit_reg.Quantity(value, "percent")
+            return app.unit_reg.Quantity(value, "percent")
         return None
 
     def _set_humidity(self, value: Optional[float]):
@@ -420,7 +426,7 @@ class TvocSensor(SensorComponent):
         """Returns TVOC in ppb"""
         value = self.get_value_with_status(self._tvoc_impl)
         if value is not None:
-            return unit_reg.Quantity(value, "ppb")
+            return app.unit_reg.Quantity(value, "ppb")
         return None
 
     def _set_tvoc(self, value: Optional[float]):
@@ -469,7 +475,7 @@ class CO2Sensor(SensorComponent):
         """Returns equivalent CO2 in ppm"""
         value = self.get_value_with_status(self._co2_impl)
         if value is not None:
-            return unit_reg.Quantity(value, "ppm")
+            return app.unit_reg.Quantity(value, "ppm")
         return None
 
     def _set_co2(self, value: Optional[float]):
@@ -517,7 +523,7 @@ class DustSensor(SensorComponent):
         """Returns dust in ug/m^3"""
         value = self.get_value_with_status(self._dust_impl)
         if value is not None:
-            return unit_reg.Quantity(value, "ug / m ** 3")
+            return app.unit_reg.Quantity(value, "ug / m ** 3")
         return None
 
     def _set_dust(self, value: Optional[float]):
@@ -565,7 +571,7 @@ class LightSensor(SensorComponent):
         """Returns light in lux"""
         value = self.get_value_with_status(self._light_impl)
         if value is not None:
-            return unit_reg.Quantity(value, "lux")
+            return app.unit_reg.Quantity(value, "lux")
         return None
 
     def _set_light(self, value: Optional[float]):
@@ -919,7 +925,7 @@ class CCS811(CO2Sensor, TvocSensor, CyclicComponent):  # pylint: disable=invalid
         # wait for values to stabilize
         if temperature is None or humidity is None:
             return
-        while not 15 < temperature.m_as(unit_reg.degC) < 50:
+        while not 15 < temperature.m_as(app.unit_reg.degC) < 50:
             time.sleep(2)
 
         self._sensor_driver.set_environmental_data(int(humidity), float(temperature))
@@ -1067,6 +1073,7 @@ class SR501(SensorComponent):  # pylint: disable=invalid-name
         super().__init__()
         self._pin = pin
         self._motion_detected = 0
+        self.motion_signal = Signal("MotionDetector")  # emitted with every detection
 
         self._sensor_driver: MotionSensor
         if pin == 0:
@@ -1098,6 +1105,7 @@ class SR501(SensorComponent):  # pylint: disable=invalid-name
         """
         self._motion_detected += 1
         self._logger.debug("MotionDetector: motion detected %i", self._motion_detected)
+        self.motion_signal.emit()
         time.sleep(self.BOUNCE_TIME)
         self._motion_detected -= 1
 
@@ -1196,22 +1204,20 @@ class WAQDRemoteStation(
         )
 
     def _read_sensor(self):
-        Network().wait_for_network()
+        if not Network().wait_for_network():
+            return  # keep the last values until the station can be reached
         url = self._url + "/api/sensor/v1/interior"
         try:
-            response = requests.get(
+            response = HttpClient().get(
                 url,
                 headers={
                     "Authorization": "Bearer " + self._settings.get_string(REMOTE_API_KEY)
                 },
-                timeout=5,
+                conditional=False,  # live values
             )
-        except Exception as e:
-            Logger().warning(f"Cannot reach {url}" + str(e))
+        except HttpError as e:
+            Logger().warning(f"Cannot reach {url}: " + str(e))
             return
-        if not response.ok:
-            Logger().warning(f"Cannot reach {url}: {response.text}")
-            return ()
         content: SensorApi_v1 = SensorApi_v1(**response.json())
         val = content.temp
         if val and val not in ["None", "N/A"]:
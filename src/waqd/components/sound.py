@@ -7,6 +7,7 @@ import time
 
 from waqd.base.component_reg import Component, ComponentRegistry
 from waqd.base.file_logger import Logger
+from waqd.settings import SOUND_ENABLED
 
 
 class SoundInterface(ABC, Component):
@@ -19,6 +20,12 @@ class SoundInterface(ABC, Component):
         """ Play an audio file (non-blocking) """
         raise NotImplementedError
 
+    def update_setting(self, name: str, value) -> bool:
+        if name == SOUND_ENABLED:
+            self._disabled = not value
+            return True
+        return False
+
 
 class SoundVLC(SoundInterface):
     """
@@ -8,7 +8,7 @@ import waqd
 from waqd.base.component_reg import Component, ComponentRegistry
 from waqd.base.network import Network
 from waqd.base.translation import Translation, LANGS_MAP
-from waqd.settings import LANG_ENGLISH
+from waqd.settings import LANG, LANG_ENGLISH
 
 
 class TextToSpeach(Component):
@@ -18,6 +18,8 @@ class TextToSpeach(Component):
     A little delay is normal, since TTS is computed in the cloud and the file sent back.
     """
 
+    INTERNET_TIMEOUT_S = 5
+
     def __init__(self, components: ComponentRegistry, lang="en"):
         super().__init__(components)
         self._lang = lang
@@ -27,6 +29,12 @@ class TextToSpeach(Component):
         os.makedirs(self._save_dir, exist_ok=True)
         self._ready = True
 
+    def update_setting(self, name: str, value) -> bool:
+        if name == LANG:
+            self._lang = value
+            return True
+        return False
+
     def get_tts_string(self, key: str, lang="en") -> str:
         return Translation().get_localized_string("tts_dict", key, lang)
 
@@ -74,7 +82,8 @@ class TextToSpeach(Component):
             audio_file = self._save_dir / f"{filename}_{lang}.mp3"
             # only download, if file does not exist
             if filename or not audio_file.is_file():
-                Network().wait_for_internet()
+                if not Network().wait_for_internet(self.INTERNET_TIMEOUT_S):
+                    raise ConnectionError("No internet connection")
                 gtts = gTTS(text, lang=lang)
                 gtts.save(audio_file)
             if self._comps: # Play sound
@@ -155,12 +155,15 @@ class OnlineUpdater(CyclicComponent):
         """
         # TODO do a popup later with deferring option?
         import tarfile
-        import urllib.request
+        from tempfile import gettempdir
+
+        from waqd.base.http_client import HttpClient
 
         # download as tar because direct support
         self._logger.info("Updater: Downloading new release")
-        [update_file, _] = urllib.request.urlretrieve(
-            self._repository.get_archive_link("tarball", tag_name)
+        update_file = HttpClient().download(
+            self._repository.get_archive_link("tarball", tag_name),
+            Path(gettempdir()) / f"waqd_{tag_name}.tar.gz",
         )
         with tarfile.open(str(update_file)) as tar:
             os.makedirs(self._new_version_path, exist_ok=True)
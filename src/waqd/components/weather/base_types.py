@@ -8,11 +8,35 @@ from dataclasses import dataclass, field
 from datetime import datetime, time
 from enum import Enum
 from pathlib import Path
+from typing import Dict, Tuple
 
 from pydantic import BaseModel
 
-from waqd.assets import get_asset_file
+from waqd.assets import AssetCatalog, get_asset_file
 from waqd.base.component import Component
+from waqd.base.file_logger import Logger
+
+HOME_LOCATION = "home"  # the configured main location
+
+
+def parse_location_list(value: str) -> Dict[str, Tuple[float, float]]:
+    """
+    Parse locations in the form "name:latitude:longitude;name:latitude:longitude".
+    Returns latitude and longitude by name. Invalid entries are skipped.
+    """
+    locations: Dict[str, Tuple[float, float]] = {}
+    for entry in value.split(";"):
+        if not entry.strip():
+            continue
+        try:
+            name, latitude, longitude = entry.rsplit(":", 2)
+            name = name.strip()
+            if not name or name == HOME_LOCATION:
+                raise ValueError("invalid name")
+            locations[name] = (float(latitude), float(longitude))
+        except ValueError as error:
+            Logger().warning("Weather: Skipping location %s: %s", entry, str(error))
+    return locations
 
 
 def is_daytime(sunrise, sunset, date_time=None):
@@ -73,13 +97,13 @@ class Weather():
 
     def get_background_image(self):
         # set weather description specific background image
-        online_weather_category = self.main.lower()
-        if self.is_daytime():
-            bg_name = "bg_day_" + online_weather_category
-        else:
-            bg_name = "bg_night_" + online_weather_category
+        bg_name = AssetCatalog.get_weather_background_id(self.main, self.is_daytime())
         return get_asset_file("weather_bgrs", bg_name)
 
+    def get_background_url(self) -> str:
+        """ Relative static URL of get_background_image """
+        return AssetCatalog().get_weather_background_url(self.main, self.is_daytime())
+
     def get_icon(self) -> Path:
         """
         Helper function to get icon from condition.
@@ -92,6 +116,10 @@ class Weather():
             file_path = get_asset_file("gui_base", "dummy.png")
         return file_path
 
+    def get_icon_url(self) -> str:
+        """ Relative static URL of get_icon """
+        return AssetCatalog().get_weather_icon_url(self.icon)
+
 
 @dataclass
 class DailyWeather(Weather):
@@ -145,10 +173,29 @@ class WeatherQuality(Enum):
 
 
 class WeatherProvider(ABC, Component):
+    @property
+    def location_names(self) -> list[str]:
+        """ All locations, which can be requested. """
+        return [HOME_LOCATION]
+
+    def fetch(self, timeout: float | None = None) -> bool:
+        """
+        Fetch the data now and block until it is available. Returns true on success.
+        Providers, which fetch on access, don't need to override it.
+        """
+        return self.get_current_weather() is not None and bool(self.get_5_day_forecast())
+
+    def load_cache(self) -> bool:
+        """
+        Load the data of an earlier run without fetching, to have data before the first fetch.
+        Returns true, if data is available. Providers without a cache don't need to override it.
+        """
+        return False
+
     @abstractmethod
-    def get_current_weather(self) -> Weather | None:
+    def get_current_weather(self, location=HOME_LOCATION) -> Weather | None:
         raise NotImplementedError
 
     @abstractmethod
-    def get_5_day_forecast(self) -> list[DailyWeather]:
+    def get_5_day_forecast(self, location=HOME_LOCATION) -> list[DailyWeather]:
         raise NotImplementedError
\ No newline at end of file
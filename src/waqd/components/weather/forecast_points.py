@@ -0,0 +1,152 @@
+"""
+Compact storage for the hourly or 3-hourly forecast points of the weather providers.
+"""
+
+from datetime import datetime, time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .base_types import Weather
+
+FLOAT_FIELDS = ("wind_speed", "wind_deg", "pressure", "pressure_sea_level", "humidity",
+                "clouds", "temp", "precipitation")
+
+
+class ForecastPoints:
+    """
+    Forecast points of several days as struct of arrays: one typed array per field,
+    instead of a Weather object per point. Condition names and icons are stored as
+    small integer codes and sunrise and sunset once per day.
+    Single points are accessed with lightweight ForecastPoint row views.
+    """
+
+    def __init__(self, date_time: Sequence, day: Sequence[int], wid: Sequence[int],
+                 main: Sequence[str], icon: Sequence[str], columns: Dict[str, Sequence[float]],
+                 sunrise: List[time], sunset: List[time], altitude=0.0,
+                 fetch_time: Optional[datetime] = None):
+        """
+        :param day: index of the day of each point, to be able to group them
+        :param columns: values for each of FLOAT_FIELDS
+        :param sunrise: per day
+        """
+        self.date_time = np.array(date_time, dtype="datetime64[m]")
+        self.day = np.array(day, dtype=np.int8)
+        self.wid = np.array(wid, dtype=np.int16)
+        # float32 would change the values of the provider in the last digits
+        self.columns = {name: np.array(columns[name], dtype=float) for name in FLOAT_FIELDS}
+        main_codes = np.array(main, dtype=object)
+        # same as Weather.__post_init__
+        heavy = ((np.char.lower(main_codes.astype(str)) == "clouds")
+                 & (self.columns["clouds"] > 65))
+        main_codes[heavy] = "heavy_clouds"
+        self.main_names, self.main = self._intern(main_codes)
+        self.icon_names, self.icon = self._intern(icon)
+        self.sunrise = list(sunrise)
+        self.sunset = list(sunset)
+        self.altitude = altitude
+        self.fetch_time = fetch_time or datetime.now()
+
+    @staticmethod
+    def _intern(values: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+        if not len(values):
+            return [], np.zeros(0, dtype=np.int16)
+        names, codes = np.unique(np.array(values, dtype=str), return_inverse=True)
+        return names.tolist(), codes.astype(np.int16)
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    def __getitem__(self, index: int) -> "ForecastPoint":
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return ForecastPoint(self, index % len(self))
+
+    def indices(self, day: int) -> np.ndarray:
+        return np.flatnonzero(self.day == day)
+
+    def days(self, day_count: int) -> List[List["ForecastPoint"]]:
+        """ Row views grouped per day, like the lists of Weather objects before. """
+        points: List[List[ForecastPoint]] = [[] for _ in range(day_count)]
+        for index, day in enumerate(self.day.tolist()):
+            if 0 <= day < day_count:
+                points[day].append(ForecastPoint(self, index))
+        return points
+
+    def min_max(self, day_count: int, field="temp") -> Tuple[np.ndarray, np.ndarray]:
+        """ Minimum and maximum of a field per day. Days without points are (-inf, inf). """
+        selected = (self.day >= 0) & (self.day < day_count)
+        days = self.day[selected].astype(np.intp)
+        values = self.columns[field][selected]
+        minimum = np.full(day_count, np.inf)
+        maximum = np.full(day_count, -np.inf)
+        np.minimum.at(minimum, days, values)
+        np.maximum.at(maximum, days, values)
+        empty = np.bincount(days, minlength=day_count) == 0
+        minimum[empty] = -np.inf
+        maximum[empty] = np.inf
+        return minimum, maximum
+
+    def nbytes(self) -> int:
+        """ Memory of the arrays. """
+        return sum(array.nbytes for array in
+                   [self.date_time, self.day, self.wid, self.main, self.icon,
+                    *self.columns.values()])
+
+
+class ForecastPoint:
+    """ Row view into ForecastPoints with the fields of Weather. Holds no values itself. """
+
+    __slots__ = ("_points", "_index")
+
+    def __init__(self, points: ForecastPoints, index: int):
+        self._points = points
+        self._index = index
+
+    def __getattr__(self, name: str) -> float:
+        if name in FLOAT_FIELDS:
+            return float(self._points.columns[name][self._index])
+        raise AttributeError(name)
+
+    def __repr__(self) -> str:
+        return f"ForecastPoint({self.date_time}, {self.main}, {self.temp})"
+
+    @property
+    def main(self) -> str:
+        return self._points.main_names[self._points.main[self._index]]
+
+    @property
+    def wid(self) -> int:
+        return int(self._points.wid[self._index])
+
+    @property
+    def date_time(self) -> datetime:
+        return self._points.date_time[self._index].astype(datetime)
+
+    @property
+    def icon(self) -> str:
+        return self._points.icon_names[self._points.icon[self._index]]
+
+    @property
+    def sunrise(self) -> time:
+        return self._points.sunrise[self._points.day[self._index]]
+
+    @property
+    def sunset(self) -> time:
+        return self._points.sunset[self._points.day[self._index]]
+
+    @property
+    def altitude(self) -> float:
+        return self._points.altitude
+
+    @property
+    def fetch_time(self) -> datetime:
+        return self._points.fetch_time
+
+    def to_weather(self) -> Weather:
+        weather = Weather(self.main, self.wid, self.date_time, self.icon, self.wind_speed,
+                          self.wind_deg, self.sunrise, self.sunset, self.pressure,
+                          self.pressure_sea_level, self.humidity, self.clouds, self.temp,
+                          self.altitude, self.precipitation)
+        weather.fetch_time = self.fetch_time
+        return weather
@@ -0,0 +1,100 @@
+"""
+Location search with the Open-Meteo geocoding API for the settings location picker.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from waqd.base.file_logger import Logger
+from waqd.base.http_client import HttpClient, HttpError
+from waqd.base.network import Network
+
+from .base_types import Location
+
+API_GEOCODING_CMD = "https://geocoding-api.open-meteo.com/v1/search?name={query}&language={lang}"
+
+
+def parse_locations(data: Dict[str, Any]) -> List[Location]:
+    locations = []
+    for result in data.get("results", []):
+        locations.append(
+            Location(
+                name=result.get("name", ""),
+                country=result.get("country", ""),
+                country_code=result.get("country_code", ""),
+                state=result.get("admin1", ""),
+                county=result.get("admin2", ""),
+                altitude=result.get("elevation", 0),
+                latitude=result.get("latitude", 0),
+                longitude=result.get("longitude", 0),
+            ))
+    return locations
+
+
+class GeocodingService:
+    """
+    Singleton to search locations while the user types.
+    Results are kept in an LRU cache of the exact queries. Results of shorter queries are not
+    narrowed down locally: the API matches short queries only exactly and also matches
+    other fields than the name.
+    A search, which was superseded by a newer one of the same client while waiting for the
+    API, returns None, so that outdated results are never shown.
+    """
+
+    CACHE_SIZE = 64
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.init()
+        return cls._instance
+
+    def init(self):
+        self._cache: "OrderedDict[Tuple[str, str], List[Location]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def search(self, query: str, lang="en", client="") -> Optional[List[Location]]:
+        query = " ".join(query.split()).casefold()
+        if not query:
+            return []
+        with self._lock:
+            generation = self._generations.get(client, 0) + 1
+            self._generations[client] = generation
+            locations = self._get_cached(query, lang)
+        if locations is not None:
+            return locations
+
+        locations = self._fetch(query, lang)
+        with self._lock:
+            if locations is not None:
+                self._cache[(lang, query)] = locations
+                while len(self._cache) > self.CACHE_SIZE:
+                    self._cache.popitem(last=False)
+            if self._generations.get(client) != generation:
+                return None
+        return locations or []
+
+    def _get_cached(self, query: str, lang: str) -> Optional[List[Location]]:
+        """ Needs the lock. """
+        locations = self._cache.get((lang, query))
+        if locations is not None:
+            self._cache.move_to_end((lang, query))
+        return locations
+
+    def _fetch(self, query: str, lang: str) -> Optional[List[Location]]:
+        """ Returns None on errors, so that they are not cached. """
+        if not Network().wait_for_internet():
+            Logger().error("Geocoding: No internet connection")
+            return None
+        try:
+            data = HttpClient().get_json(
+                API_GEOCODING_CMD.format(query=quote(query), lang=lang))
+        except (HttpError, ValueError) as error:
+            Logger().error(f"Geocoding: Can't search for {query}: {str(error)}")
+            return None
+        return parse_locations(data)
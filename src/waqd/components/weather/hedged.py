@@ -0,0 +1,176 @@
+"""
+Composite weather provider, which hedges slow providers with the next one.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from .base_types import HOME_LOCATION, DailyWeather, Weather, WeatherProvider
+from .refresher import WeatherRefresher
+
+# current weather and forecast of one location
+LocationData = Tuple[Optional[Weather], List[DailyWeather]]
+
+
+@dataclass
+class ProviderStats:
+    """ Smoothed latency and success rate of the fetches of one provider. """
+    latency_s: Optional[float] = None  # unknown until the first success
+    success_rate: float = 1.0
+    fetch_count: int = 0
+    served_count: int = 0  # fetches, which won
+
+
+class HedgedWeatherProvider(WeatherProvider):
+    """
+    Fetches from the provider ranked first. If it hasn't answered within LATENCY_BUDGET_S,
+    or failed, the next one is asked as well. The first good answer is served.
+    Providers are ranked by their measured latency, the ones failing too often come last,
+    so the fastest healthy provider becomes the primary one.
+    Like the single providers, readers only get the latest fetched data. Until the first
+    fetch succeeds, the cached data of an earlier run is served, e.g. while offline.
+    The providers should not refresh on their own schedule, because all fetches are
+    scheduled here (see OpenMeteo's scheduled).
+    """
+
+    LATENCY_BUDGET_S = 3.0
+    FETCH_TIMEOUT_S = 30.0  # for all providers together
+    REFRESH_TIME = timedelta(minutes=15)  # like OpenMeteo.MAX_AGE
+    RETRY_TIME = timedelta(minutes=1)  # after all providers failed
+    SMOOTHING = 0.3  # weight of the newest sample for the statistics
+    MIN_SUCCESS_RATE = 0.5  # below, a provider is unhealthy
+
+    def __init__(self, providers: List[Tuple[Type[WeatherProvider], List[Any]]]):
+        """ :param providers: class and arguments of the providers, the preferred one first """
+        super().__init__()
+        self._providers = [provider_class(*args) for provider_class, args in providers]
+        self._stats = {id(provider): ProviderStats() for provider in self._providers}
+        self._stats_lock = threading.Lock()
+        # one worker per provider - a hanging provider can't block the others
+        self._executor = ThreadPoolExecutor(max_workers=len(self._providers),
+                                            thread_name_prefix="WeatherHedge")
+        self._locations: Dict[str, LocationData] = {}
+        self._source: Optional[WeatherProvider] = None
+        for provider in self._providers:  # the preferred one with cached data
+            if provider.load_cache():
+                self._locations = self._get_data(provider)
+                self._source = provider
+                break
+        self._refresher = WeatherRefresher("HedgedWeatherRefresh", self._refresh,
+                                           self.REFRESH_TIME.total_seconds(),
+                                           self.RETRY_TIME.total_seconds())
+        self._refresher.start()
+        self._ready = True
+
+    @property
+    def providers(self) -> List[WeatherProvider]:
+        """ In the order of their rank. """
+        return self._rank_providers()
+
+    @property
+    def source(self) -> Optional[WeatherProvider]:
+        """ The provider of the served data. """
+        return self._source
+
+    @property
+    def location_names(self) -> List[str]:
+        return list(self._locations) or [HOME_LOCATION]
+
+    def get_stats(self, provider: WeatherProvider) -> ProviderStats:
+        with self._stats_lock:
+            stats = self._stats[id(provider)]
+            return ProviderStats(stats.latency_s, stats.success_rate,
+                                 stats.fetch_count, stats.served_count)
+
+    def get_current_weather(self, location=HOME_LOCATION) -> Optional[Weather]:
+        return self._locations.get(location, (None, []))[0]
+
+    def get_5_day_forecast(self, location=HOME_LOCATION) -> List[DailyWeather]:
+        return self._locations.get(location, (None, []))[1]
+
+    def fetch(self, timeout: Optional[float] = None) -> bool:
+        return (self._refresher.refresh(wait=True, timeout=timeout)
+                and self._refresher.last_success)
+
+    def wait_until_fetched(self, timeout: Optional[float] = None) -> bool:
+        return self._refresher.wait_until_fetched(timeout)
+
+    def stop(self):
+        self._refresher.stop()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for provider in self._providers:
+            provider.stop()
+
+    def _rank_providers(self) -> List[WeatherProvider]:
+        def rank(index_provider: Tuple[int, WeatherProvider]):
+            index, provider = index_provider
+            stats = self._stats[id(provider)]
+            latency = stats.latency_s if stats.latency_s is not None else self.LATENCY_BUDGET_S
+            return (stats.success_rate < self.MIN_SUCCESS_RATE, latency, index)
+
+        with self._stats_lock:
+            ranked = sorted(enumerate(self._providers), key=rank)
+        return [provider for _, provider in ranked]
+
+    def _refresh(self) -> bool:
+        remaining = [provider for provider in self._rank_providers()
+                     if not provider.is_disabled]
+        pending: Dict[Future, WeatherProvider] = {}
+        deadline = time.monotonic() + self.FETCH_TIMEOUT_S
+        while remaining or pending:
+            if remaining:
+                provider = remaining.pop(0)
+                pending[self._executor.submit(self._fetch_provider, provider)] = provider
+            time_left = deadline - time.monotonic()
+            if time_left <= 0:
+                break
+            # hedge with the next provider, if this one is slow
+            wait_s = min(self.LATENCY_BUDGET_S, time_left) if remaining else time_left
+            done, _ = wait(list(pending), timeout=wait_s, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                if future.result():
+                    self._serve(provider)
+                    return True
+        self._logger.error("Weather: No provider could fetch the weather")
+        return False
+
+    def _fetch_provider(self, provider: WeatherProvider) -> bool:
+        """ Runs in the executor. Statistics include late answers, which lost the race. """
+        start = time.monotonic()
+        try:
+            success = provider.fetch(self.FETCH_TIMEOUT_S)
+        except Exception as error:
+            self._logger.error("Weather: %s failed: %s", provider.__class__.__name__,
+                               str(error))
+            success = False
+        latency = time.monotonic() - start
+        with self._stats_lock:
+            stats = self._stats[id(provider)]
+            stats.fetch_count += 1
+            stats.success_rate += self.SMOOTHING * (float(success) - stats.success_rate)
+            if success:
+                if stats.latency_s is None:
+                    stats.latency_s = latency
+                else:
+                    stats.latency_s += self.SMOOTHING * (latency - stats.latency_s)
+        return success
+
+    def _serve(self, provider: WeatherProvider):
+        with self._stats_lock:
+            self._stats[id(provider)].served_count += 1
+        self._locations = self._get_data(provider)
+        if provider is not self._source:
+            self._logger.info("Weather: Serving data of %s", provider.__class__.__name__)
+        self._source = provider
+
+    @staticmethod
+    def _get_data(provider: WeatherProvider) -> Dict[str, LocationData]:
+        return {
+            name: (provider.get_current_weather(name), provider.get_5_day_forecast(name))
+            for name in provider.location_names
+        }
@@ -0,0 +1,193 @@
+"""
+Local short-term forecast from the pressure tendency of the own barometric sensor.
+Serves the conditions of the next hours between the refreshes of the online providers.
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Deque, Optional, Tuple
+
+from waqd.base.component import CyclicComponent
+
+if TYPE_CHECKING:
+    from waqd.base.component_reg import ComponentRegistry
+
+# pressure change in hPa per 3 hours - (upper limit, name) of the tendency categories,
+# of the WMO / Met Office shipping forecast
+TENDENCY_CATEGORIES = ((0.1, "steady"), (1.5, "slowly"), (3.5, ""), (6.0, "quickly"),
+                       (float("inf"), "very rapidly"))
+ZAMBRETTI_TREND_HPA = 1.6  # smaller changes in 3 hours count as steady
+
+# Zambretti forecasts by letter, with the condition name used for the weather icons
+ZAMBRETTI_FORECASTS = {
+    "A": ("Settled fine", "clear"),
+    "B": ("Fine weather", "clear"),
+    "C": ("Becoming fine", "clear"),
+    "D": ("Fine, becoming less settled", "clouds"),
+    "E": ("Fine, possible showers", "clouds"),
+    "F": ("Fairly fine, improving", "clear"),
+    "G": ("Fairly fine, possible showers early", "clouds"),
+    "H": ("Fairly fine, showery later", "clouds"),
+    "I": ("Showery early, improving", "drizzle"),
+    "J": ("Changeable, mending", "clouds"),
+    "K": ("Fairly fine, showers likely", "clouds"),
+    "L": ("Rather unsettled, clearing later", "clouds"),
+    "M": ("Unsettled, probably improving", "clouds"),
+    "N": ("Showery, bright intervals", "drizzle"),
+    "O": ("Showery, becoming less settled", "drizzle"),
+    "P": ("Changeable, some rain", "rain"),
+    "Q": ("Unsettled, short fine intervals", "heavy_clouds"),
+    "R": ("Unsettled, rain later", "heavy_clouds"),
+    "S": ("Unsettled, some rain", "rain"),
+    "T": ("Mostly very unsettled", "heavy_clouds"),
+    "U": ("Occasional rain, worsening", "rain"),
+    "V": ("Rain at times, very unsettled", "rain"),
+    "W": ("Rain at frequent intervals", "rain"),
+    "X": ("Rain, very unsettled", "rain"),
+    "Y": ("Stormy, may improve", "thunderstorm"),
+    "Z": ("Stormy, much rain", "thunderstorm"),
+}
+# letters of the Zambretti numbers for falling (1-9), steady (10-19) and rising (20-32) pressure
+ZAMBRETTI_FALLING = (1, "ABDHORUXZ")
+ZAMBRETTI_STEADY = (10, "ABEKNPSWXZ")
+ZAMBRETTI_RISING = (20, "ABCFGIJLMQTYZ")
+
+
+def get_tendency(change_3h: float) -> str:
+    """ Category of a pressure change, e.g. "falling slowly". """
+    for limit, name in TENDENCY_CATEGORIES:
+        if abs(change_3h) <= limit:
+            break
+    if name == "steady":
+        return name
+    direction = "rising" if change_3h > 0 else "falling"
+    return f"{direction} {name}".strip()
+
+
+def get_zambretti_letter(pressure_sea_level: float, change_3h: float) -> str:
+    """ Simplified Zambretti forecaster, without the wind and season corrections. """
+    if change_3h <= -ZAMBRETTI_TREND_HPA:
+        number, (first, letters) = 127 - 0.12 * pressure_sea_level, ZAMBRETTI_FALLING
+    elif change_3h >= ZAMBRETTI_TREND_HPA:
+        number, (first, letters) = 185 - 0.16 * pressure_sea_level, ZAMBRETTI_RISING
+    else:
+        number, (first, letters) = 144 - 0.13 * pressure_sea_level, ZAMBRETTI_STEADY
+    index = min(max(round(number) - first, 0), len(letters) - 1)
+    return letters[index]
+
+
+class PressureTrend:
+    """
+    Least-squares slope of the pressure over a rolling time window.
+    The sums of the regression are updated with every added and every expired sample,
+    so a sample costs O(1) regardless of the window length.
+    """
+
+    def __init__(self, window_s: float):
+        self._window_s = window_s
+        self._samples: Deque[Tuple[float, float]] = deque()
+        # the samples are stored relative to the first one, to keep the sums small
+        self._origin = 0.0
+        self._origin_pressure = 0.0
+        self._sum_t = self._sum_p = self._sum_tt = self._sum_tp = 0.0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    @property
+    def span_s(self) -> float:
+        """ Time between the oldest and the newest sample. """
+        if not self._samples:
+            return 0.0
+        return self._samples[-1][0] - self._samples[0][0]
+
+    @property
+    def latest(self) -> Optional[float]:
+        return self._samples[-1][1] + self._origin_pressure if self._samples else None
+
+    def add(self, timestamp: float, pressure: float):
+        if not self._samples:
+            # rebase - also clears the accumulated rounding errors
+            self._origin = timestamp
+            self._origin_pressure = pressure
+            self._sum_t = self._sum_p = self._sum_tt = self._sum_tp = 0.0
+        t = timestamp - self._origin
+        p = pressure - self._origin_pressure
+        self._samples.append((t, p))
+        self._update_sums(t, p, 1)
+        while self._samples and t - self._samples[0][0] > self._window_s:
+            self._update_sums(*self._samples.popleft(), -1)
+
+    def get_slope(self) -> Optional[float]:
+        """ Change of the pressure per second, None with less than two samples. """
+        count = len(self._samples)
+        if count < 2:
+            return None
+        denominator = count * self._sum_tt - self._sum_t ** 2
+        if denominator <= 0:
+            return None
+        return (count * self._sum_tp - self._sum_t * self._sum_p) / denominator
+
+    def _update_sums(self, t: float, p: float, sign: int):
+        self._sum_t += sign * t
+        self._sum_p += sign * p
+        self._sum_tt += sign * t * t
+        self._sum_tp += sign * t * p
+
+
+@dataclass
+class Nowcast:
+    """ Short-term forecast from the local pressure tendency. """
+    pressure: float  # hPa at sea level
+    change_3h: float  # hPa per 3 hours
+    tendency: str  # e.g. "falling slowly"
+    zambretti: str  # letter of the forecast
+    description: str
+    main: str  # condition name, like in Weather
+
+
+class PressureNowcast(CyclicComponent):
+    """
+    Samples the pressure sensor and keeps the tendency of the last WINDOW_S.
+    A nowcast is only given, when the samples span at least MIN_SPAN_S.
+    """
+
+    UPDATE_TIME = 60  # the sensor values are already a moving average
+    WINDOW_S = 3 * 3600
+    MIN_SPAN_S = 3600
+
+    def __init__(self, components: "ComponentRegistry", enabled=True):
+        super().__init__(components, enabled=enabled)
+        self._trend = PressureTrend(self.WINDOW_S)
+        self._lock = threading.Lock()
+        if not enabled:
+            return
+        self._start_update_loop(update_func=self._sample)
+        self._ready = True
+
+    def get_nowcast(self) -> Optional[Nowcast]:
+        with self._lock:
+            slope = self._trend.get_slope()
+            pressure = self._trend.latest
+            if slope is None or pressure is None or self._trend.span_s < self.MIN_SPAN_S:
+                return None
+        change_3h = round(slope * 3 * 3600, 2)
+        letter = get_zambretti_letter(pressure, change_3h)
+        description, main = ZAMBRETTI_FORECASTS[letter]
+        return Nowcast(round(pressure, 1), change_3h, get_tendency(change_3h), letter,
+                       description, main)
+
+    def add_sample(self, pressure: float, timestamp: Optional[float] = None):
+        with self._lock:
+            self._trend.add(time.monotonic() if timestamp is None else timestamp, pressure)
+
+    def _sample(self):
+        sensor = self._comps.pressure_sensor
+        if sensor.is_disabled:
+            return
+        pressure = sensor.get_pressure()
+        if pressure is None:
+            return
+        self.add_sample(pressure.m_as("hPa"))
@@ -1,4 +1,3 @@
-
 """
 This file contains classes concerning online weather data.
 Currently OpenWeatherMap is supported.
@@ -6,105 +5,396 @@ An own abstraction class was created to generalize the weather data.
 """
 
 
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import quote
 
-import requests
+import numpy as np
 
+from waqd.base.http_client import HttpClient, HttpError
 from waqd.base.network import Network
 
-from .base_types import (DailyWeather, Location, Weather, WeatherProvider,
-                         WeatherQuality, is_daytime)
+from .base_types import (HOME_LOCATION, DailyWeather, Location, Weather,
+                         WeatherProvider, WeatherQuality, is_daytime)
+from .forecast_points import ForecastPoint, ForecastPoints
+from .geocoding import API_GEOCODING_CMD, parse_locations
 from .icon_mapping import (om_condition_map, om_day_code_to_ico,
                            om_night_code_to_ico)
+from .refresher import WeatherRefresher
+from .solar import get_sun_times
+from .weather_cache import WeatherCache
+
+FORECAST_DAYS = 7
+NO_BIN = -1  # marks hourly points, which belong to no day or night
+
+
+class HourlyForecast:
+    """
+    The hourly forecast points as columns, like they are sent by Open-Meteo.
+    Binning into days and nights and the aggregation work on whole columns with NumPy,
+    Weather objects for single points are only created on request.
+    """
+
+    COLUMNS = ("temperature_2m", "relativehumidity_2m", "precipitation", "cloudcover",
+               "weathercode", "pressure_msl", "surface_pressure", "windspeed_10m",
+               "winddirection_10m")
+
+    def __init__(self, hourly: Dict[str, List[Any]], sunrises: List[time], sunsets: List[time]):
+        """ :param sunrises: of each day, beginning with today """
+        self.sunrises = sunrises
+        self.sunsets = sunsets
+        # local time, as the request is sent with timezone=auto
+        self.time = np.array(hourly.get("time", []), dtype="datetime64[m]")
+        # missing values (null) become NaN
+        self.columns = {name: np.array(hourly.get(name, [np.nan] * len(self.time)), dtype=float)
+                        for name in self.COLUMNS}
+        self.weathercode = np.nan_to_num(self.columns["weathercode"]).astype(int)
+        self.main = self._get_main_categories()
+        self.day_bin = np.full(len(self.time), NO_BIN)
+        self.night_bin = np.full(len(self.time), NO_BIN)
+
+    def _get_main_categories(self) -> np.ndarray:
+        codes, inverse = np.unique(self.weathercode, return_inverse=True)
+        main = np.array([om_condition_map.get(int(code), "unknown") for code in codes],
+                        dtype=object)[inverse]
+        # same as Weather.__post_init__
+        heavy = (main == "clouds") & (self.columns["cloudcover"] > 65)
+        main[heavy] = "heavy_clouds"
+        return main
+
+    def bin_days_and_nights(self, now: datetime):
+        """
+        Assign every future point to a day (sunrise to sunset) or to a night.
+        The hours after midnight count as the night of the previous day.
+        """
+        today = np.datetime64(now.date(), "D")
+        day_idx = (self.time.astype("datetime64[D]") - today).astype(int)
+        minutes = (self.time - self.time.astype("datetime64[D]")).astype(int)
+        # sunrise and sunset of the day of each point
+        sun_idx = np.clip(day_idx, 0, len(self.sunrises) - 1)
+        sunrise = np.array([day.hour * 60 + day.minute for day in self.sunrises])[sun_idx]
+        sunset = np.array([day.hour * 60 + day.minute for day in self.sunsets])[sun_idx]
+
+        valid = (self.time >= np.datetime64(now, "s")) & (day_idx >= 0) & (day_idx <= 5)
+        is_day = (sunrise < minutes) & (minutes < sunset)
+        before_sunrise = minutes < sunrise
+        night_idx = np.where(before_sunrise & (day_idx > 0), day_idx - 1, day_idx)
+        if now.time() < self.sunrises[0]:
+            # today's evening is not shown before today's sunrise
+            valid &= ~((day_idx == 0) & (minutes > sunset) & ~before_sunrise)
+        self.day_bin = np.where(valid & is_day, day_idx, NO_BIN)
+        self.night_bin = np.where(valid & ~is_day, night_idx, NO_BIN)
+
+    def min_max(self, bins: np.ndarray,
+                column="temperature_2m") -> Tuple[np.ndarray, np.ndarray]:
+        """ Minimum and maximum of a column per bin. Empty bins are (-inf, inf). """
+        selected = bins != NO_BIN
+        minimum = np.full(FORECAST_DAYS, np.inf)
+        maximum = np.full(FORECAST_DAYS, -np.inf)
+        np.minimum.at(minimum, bins[selected], self.columns[column][selected])
+        np.maximum.at(maximum, bins[selected], self.columns[column][selected])
+        empty = np.bincount(bins[selected], minlength=FORECAST_DAYS) == 0
+        minimum[empty] = -np.inf
+        maximum[empty] = np.inf
+        return minimum, maximum
+
+    def dominant_weather(self, indices: np.ndarray) -> Optional[Tuple[str, int]]:
+        """
+        Get the weather to be shown on the forecast icon for the given points.
+        The strategy is to first sort after the main category, e.g. rain, snow.
+        All the categories are listed in the WeatherQuality class and are ordered
+        from bad to good.
+        In case there are multiple categories, first try determine the most numerous one.
+        If there are equal in count, take the one with the most bad.
+        Then the most numerous weather code of this category is used.
+
+        return : main category and weather code
+        """
+        if not len(indices):
+            return None
+        main = self.main[indices]
+        categories, counts = np.unique(main, return_counts=True)
+        dominant_categories = categories[counts == counts.max()]
+        # get the worst case - we want to know, if it snows in the middle of the day
+        worst = min(WeatherQuality[category.upper()].value for category in dominant_categories)
+        result_category = WeatherQuality(worst)
+
+        in_category = np.array([result_category.name in category.upper() for category in main])
+        codes = self.weathercode[indices][in_category]
+        unique_codes, first_idx, counts = np.unique(codes, return_index=True,
+                                                    return_counts=True)
+        # ties are resolved by the first occurrence
+        candidates = np.flatnonzero(counts == counts.max())
+        wid = int(unique_codes[candidates[np.argmin(first_idx[candidates])]])
+        first_point = np.flatnonzero(self.weathercode[indices] == wid)[0]
+        return main[first_point], wid
+
+    def first_index(self, bins: np.ndarray, bin_idx: int) -> Optional[int]:
+        indices = np.flatnonzero(bins == bin_idx)
+        return int(indices[0]) if len(indices) else None
+
+
+@dataclass
+class LocationForecast:
+    """ The weather data of one location. """
+    latitude: float
+    longitude: float
+    cache: WeatherCache
+    current_weather: Optional[Weather] = None
+    five_day_forecast: List[DailyWeather] = field(default_factory=list)
+    hourly: Optional[HourlyForecast] = None
+    daytime_points: Optional[ForecastPoints] = None
+    nighttime_points: Optional[ForecastPoints] = None
+    altitude: float = 0.0
 
 
 class OpenMeteo(WeatherProvider):
     API_FORECAST_CMD = "https://api.open-meteo.com/v1/forecast?latitude={latitude}&longitude={longitude}"
-    API_GEOCONDING_CMD = "https://geocoding-api.open-meteo.com/v1/search?name={query}&language={lang}"
-
-    def __init__(self, longitude=0.0, latitude=0.0):
+    API_GEOCONDING_CMD = API_GEOCODING_CMD
+    # daily, hourly and current weather in one request
+    FORECAST_PARAMS = (
+        "&daily=weathercode,temperature_2m_max,temperature_2m_min,sunrise,sunset,precipitation_sum,"
+        "rain_sum,showers_sum,snowfall_sum,precipitation_hours,windspeed_10m_max,"
+        "winddirection_10m_dominant"
+        "&hourly=" + ",".join(HourlyForecast.COLUMNS) +
+        "&current_weather=true&windspeed_unit=ms&timezone=auto"
+    )
+    # refresh interval - short-term changes are covered by the local pressure nowcast
+    MAX_AGE = timedelta(minutes=15)
+    RETRY_TIME = timedelta(minutes=1)  # between failed refreshes
+
+    def __init__(self, longitude=0.0, latitude=0.0,
+                 additional_locations: Optional[Dict[str, Tuple[float, float]]] = None,
+                 scheduled=True):
+        """
+        :param additional_locations: latitude and longitude by name.
+            All locations are fetched with one request.
+        :param scheduled: Refresh every MAX_AGE. Otherwise only fetch on request,
+            e.g. if a HedgedWeatherProvider schedules the fetches.
+        """
         super().__init__()
-        self._longitude = longitude
-        self._latitude = latitude
-        self._current_weather: Optional[Weather] = None
-        self._five_day_forecast: List[DailyWeather] = []
+        coordinates = {HOME_LOCATION: (latitude, longitude)}
+        coordinates.update(additional_locations or {})
+        self._locations: Dict[str, LocationForecast] = {
+            name: LocationForecast(lat, lon, WeatherCache("open_meteo", lat, lon))
+            for name, (lat, lon) in coordinates.items()
+        }
+        self._home = self._locations[HOME_LOCATION]
+        self._scheduled = scheduled
+        if scheduled:
+            self._refresher = WeatherRefresher("OpenMeteoRefresh", self._refresh,
+                                               self.MAX_AGE.total_seconds(),
+                                               self.RETRY_TIME.total_seconds())
+        else:
+            self._refresher = WeatherRefresher("OpenMeteoRefresh", self._refresh, None, None)
+        self._cache_loaded = False
+        self._started = False
+        self._start_lock = threading.Lock()
         self._ready = True
-        self.daytime_forecast_points: List[List[Weather]] = []
-        self.nighttime_forecast_point: List[List[Weather]] = []
+
+    @property
+    def location_names(self) -> List[str]:
+        return list(self._locations)
+
+    @property
+    def daytime_points(self) -> Optional[ForecastPoints]:
+        """ Hourly points between sunrise and sunset, day by day. """
+        return self._home.daytime_points
+
+    @property
+    def nighttime_points(self) -> Optional[ForecastPoints]:
+        """ Hourly points after sunset until the next sunrise, night by night. """
+        return self._home.nighttime_points
+
+    @property
+    def daytime_forecast_points(self) -> List[List[ForecastPoint]]:
+        """ Row views of daytime_points per day. """
+        points = self._home.daytime_points
+        return points.days(FORECAST_DAYS) if points else []
+
+    @property
+    def nighttime_forecast_points(self) -> List[List[ForecastPoint]]:
+        """ Row views of nighttime_points per night. """
+        points = self._home.nighttime_points
+        return points.days(FORECAST_DAYS) if points else []
 
     def find_location_candidates(self, query: str, lang="en") -> List[Location]:
         data = self._call_api(self.API_GEOCONDING_CMD, query=quote(query), lang=lang)
-        locations = []
-        for result in data.get("results", []):
-            locations.append(
-                Location(
-                    name=result.get("name", ""),
-                    country=result.get("country", ""),
-                    country_code=result.get("country_code", ""),
-                    state=result.get("admin1", ""),
-                    county=result.get("admin2", ""),
-                    altitude=result.get("elevation", 0),
-                    latitude=result.get("latitude", 0),
-                    longitude=result.get("longitude", 0),
-                ))
-        return locations
-
-    def get_current_weather(self) -> Optional[Weather]:
-        """ Public API function to get the current weather. """
-        self._fetch_weather()
-        return self._current_weather
-
-    def get_5_day_forecast(self) -> List[DailyWeather]:
-        self._fetch_weather()
-        return self._five_day_forecast
-
-    def _fetch_weather(self):
-        # return if data is up-to-date in a window of 5 minutes
-        current_date_time = datetime.now()
-        if self._current_weather and self._current_weather.fetch_time:
-            time_delta = current_date_time - self._current_weather.fetch_time
-            if time_delta.seconds < 60 * 5:  # 5 minutes
+        return parse_locations(data)
+
+    def get_current_weather(self, location=HOME_LOCATION) -> Optional[Weather]:
+        """ Public API function to get the current weather. Never waits for the network. """
+        self._start_refresher()
+        location_forecast = self._locations.get(location)
+        return location_forecast.current_weather if location_forecast else None
+
+    def get_5_day_forecast(self, location=HOME_LOCATION) -> List[DailyWeather]:
+        self._start_refresher()
+        location_forecast = self._locations.get(location)
+        return location_forecast.five_day_forecast if location_forecast else []
+
+    def refresh(self, wait=False, timeout: Optional[float] = None) -> bool:
+        """ Fetch now, instead of waiting for the schedule. Joins a fetch in flight. """
+        self._start_refresher()
+        return self._refresher.refresh(wait, timeout)
+
+    def fetch(self, timeout: Optional[float] = None) -> bool:
+        return self.refresh(wait=True, timeout=timeout) and self._refresher.last_success
+
+    def wait_until_fetched(self, timeout: Optional[float] = None) -> bool:
+        """ Blocks until the first fetch after the start completed, successful or not. """
+        self._start_refresher()
+        return self._refresher.wait_until_fetched(timeout)
+
+    def load_cache(self) -> bool:
+        with self._start_lock:
+            self._load_caches()
+        return self._home.current_weather is not None
+
+    def stop(self):
+        self._refresher.stop()
+
+    def _start_refresher(self):
+        """
+        Started with the first read, so that instances only used for the location search
+        don't fetch. The last good data from the cache is served, until the first fetch is done
+        and is kept, while the provider can't be reached.
+        """
+        if self._started:
+            return
+        with self._start_lock:
+            if self._started:
                 return
-        self._fetch_daily_weather()
-        self._fetch_hourly_weather()
-        # add pressure, humidty and clouds to cw
-        self._complete_daily_weather()
-        for i, day_points in enumerate(self.daytime_forecast_points):
-            if not day_points:
-                continue
-            daily_weather = self._determine_daily_overall_weather(day_points)
-            if not daily_weather:
-                continue
-            self._five_day_forecast[i].main = daily_weather.main
-            self._five_day_forecast[i].icon = self._get_icon_name(daily_weather.wid, True)
+            self._load_caches()
+            if not self._scheduled:
+                self._refresher.start(None)
+                self._started = True
+                return
+            initial_delay = timedelta(0)
+            fetch_times = [location.current_weather.fetch_time
+                           for location in self._locations.values()
+                           if location.current_weather and location.current_weather.fetch_time]
+            if len(fetch_times) == len(self._locations):  # the oldest data decides
+                age = datetime.now() - min(fetch_times)
+                initial_delay = max(self.MAX_AGE - age, timedelta(0))
+            self._refresher.start(initial_delay.total_seconds())
+            self._started = True
+
+    def _load_caches(self):
+        """ Once, before the first fetch. Needs the start lock. """
+        if self._cache_loaded:
+            return
+        for location in self._locations.values():
+            self._load_cache(location)
+        self._cache_loaded = True
 
-    def _fetch_daily_weather(self):
+    def _refresh(self) -> bool:
+        """ Fetch all locations with one request - the API accepts lists of coordinates. """
+        locations = list(self._locations.values())
         response = self._call_api(
-            self.API_FORECAST_CMD +
-            "&daily=weathercode,temperature_2m_max,temperature_2m_min,sunrise,sunset,precipitation_sum," +
-            "rain_sum,showers_sum,snowfall_sum,precipitation_hours,windspeed_10m_max," +
-            "winddirection_10m_dominant&current_weather=true&windspeed_unit=ms&timezone=auto",
-            latitude=self._latitude, longitude=self._longitude)
+            self.API_FORECAST_CMD + self.FORECAST_PARAMS,
+            latitude=",".join(str(location.latitude) for location in locations),
+            longitude=",".join(str(location.longitude) for location in locations))
         if not response:
-            return None
+            if self._home.current_weather:
+                self._logger.warning("OpenMeteo: Refresh failed, keeping data from %s",
+                                     str(self._home.current_weather.fetch_time))
+            return False
+        # one response per location in the order of the request, if more than one was requested
+        responses = response if isinstance(response, list) else [response]
+        if len(responses) != len(locations):
+            self._logger.error("OpenMeteo: Expected %i locations, got %i",
+                               len(locations), len(responses))
+            return False
+        fetch_time = datetime.now()
+        success = True
+        for location, location_response in zip(locations, responses):
+            if self._parse_response(location, location_response, fetch_time):
+                location.cache.store(location_response, fetch_time)
+            else:
+                success = False
+        return success
+
+    def _load_cache(self, location: LocationForecast):
+        cached = location.cache.load()
+        if not cached:
+            return
+        response, fetch_time = cached
+        if self._parse_response(location, response, fetch_time):
+            self._logger.info("OpenMeteo: Using cached weather data from %s", str(fetch_time))
+
+    def _parse_response(self, location: LocationForecast, response: Dict[str, Any],
+                        fetch_time: datetime) -> bool:
+        """ Parse completely, before the new data replaces the served one. """
+        now = datetime.now()
+        sun_times = self._get_sun_times(location, response, now.date())
+        daily_result = self._parse_daily_weather(response, sun_times, now.date())
+        if not daily_result:
+            return False
+        current_weather, five_day_forecast = daily_result
+        hourly = self._parse_hourly_weather(response, current_weather, five_day_forecast,
+                                            now, sun_times)
+        current_weather.fetch_time = fetch_time  # age of the data, not of the object
+        location.altitude = current_weather.altitude
+        location.daytime_points = self._build_points(hourly, hourly.day_bin, True,
+                                                     current_weather)
+        location.nighttime_points = self._build_points(hourly, hourly.night_bin, False,
+                                                       current_weather)
+        location.hourly = hourly
+        location.five_day_forecast = five_day_forecast
+        location.current_weather = current_weather
+        return True
 
+    @staticmethod
+    def _get_sun_times(location: LocationForecast, response: Dict[str, Any],
+                       today: date) -> Tuple[List[time], List[time]]:
+        """
+        Sunrise and sunset of the forecast days, beginning with today.
+        Days, which are not in the daily forecast, e.g. with older cached data, are computed.
+        """
+        daily = response.get("daily", {})
+        provided = {}
+        for day, sunrise, sunset in zip(daily.get("time", []), daily.get("sunrise", []),
+                                        daily.get("sunset", [])):
+            if sunrise and sunset:
+                provided[date.fromisoformat(day)] = (datetime.fromisoformat(sunrise).time(),
+                                                     datetime.fromisoformat(sunset).time())
+        utc_offset = response.get("utc_offset_seconds")
+        if utc_offset is not None:
+            utc_offset = timedelta(seconds=utc_offset)
+        sunrises, sunsets = [], []
+        for day_idx in range(FORECAST_DAYS):
+            day = today + timedelta(days=day_idx)
+            sunrise, sunset = provided.get(day) or get_sun_times(
+                location.latitude, location.longitude, day, utc_offset)
+            sunrises.append(sunrise)
+            sunsets.append(sunset)
+        return sunrises, sunsets
+
+    def _parse_daily_weather(
+        self, response: Dict[str, Any], sun_times: Tuple[List[time], List[time]], today: date
+    ) -> Optional[Tuple[Weather, List[DailyWeather]]]:
+        """ The forecast begins with today - older cached data contains past days. """
         current_weather = response.get("current_weather", {})
         daily = response.get("daily", {})
+        altitude = response.get("elevation", 0)
+        five_day_forecast = []
         for i in range(len(daily.get("time", []))):
-            sunrise = datetime.fromisoformat(daily.get("sunrise", [])[i]).time()
-            sunset = datetime.fromisoformat(daily.get("sunset", [])[i]).time()
-            is_day = is_daytime(sunrise, sunset)
+            if date.fromisoformat(daily["time"][i]) < today:
+                continue
+            sunrise = datetime.fromisoformat(daily["sunrise"][i]).time()
+            sunset = datetime.fromisoformat(daily["sunset"][i]).time()
+            weathercode = daily["weathercode"][i]
             daily_weather = DailyWeather(
-                self._get_main_category(daily.get("weathercode", [])[i]),
-                daily.get("weathercode", [])[i],
-                # "",
-                datetime.fromisoformat(daily.get("time", [])[i]),
+                self._get_main_category(weathercode),
+                weathercode,
+                datetime.fromisoformat(daily["time"][i]),
                 # always show daytime for forecast
-                self._get_icon_name(daily.get("weathercode", [])[i], True),
-                daily.get("windspeed_10m_max", [])[i],
-                daily.get("winddirection_10m_dominant", [])[i],
+                self._get_icon_name(weathercode, True),
+                daily["windspeed_10m_max"][i],
+                daily["winddirection_10m_dominant"][i],
                 sunrise,
                 sunset,
                 0,
@@ -112,237 +402,121 @@ class OpenMeteo(WeatherProvider):
                 0,
                 0,
                 0,
-                response.get(
-                    "elevation",
-                    [],
-                ),
-                current_weather.get("precipitation_sum"),
+                altitude,
+                daily["precipitation_sum"][i],
             )
-            daily_weather.temp_min = daily.get("temperature_2m_min", [])[i]
-            daily_weather.temp_max = daily.get("temperature_2m_max", [])[i]
-            # TODO
-            daily_weather.temp_night_min = daily.get("temperature_2m_min", [])[i]
-            daily_weather.temp_night_max = daily.get("temperature_2m_min", [])[i]
-            self._five_day_forecast.append(daily_weather)
-        # current weather
-        if not self._five_day_forecast:
+            daily_weather.temp_min = daily["temperature_2m_min"][i]
+            daily_weather.temp_max = daily["temperature_2m_max"][i]
+            # overwritten by the hourly values
+            daily_weather.temp_night_min = daily["temperature_2m_min"][i]
+            daily_weather.temp_night_max = daily["temperature_2m_min"][i]
+            five_day_forecast.append(daily_weather)
+        if not five_day_forecast:
             self._logger.warning("OpenMeteo: No daily forecast weather data received")
-            return
-        sunrise = self._five_day_forecast[0].sunrise
-        sunset = self._five_day_forecast[0].sunset
+            return None
+
+        # current weather
+        sunrise = sun_times[0][0]
+        sunset = sun_times[1][0]
         is_day = is_daytime(sunrise, sunset)
-        self._current_weather = Weather(
-            # "",
+        current = Weather(
             self._get_main_category(current_weather.get("weathercode", 0)),
             current_weather.get("weathercode", 0),
-            # "",
-            # current_weather.get("description"), # TODO detail
             datetime.now(),
             self._get_icon_name(current_weather.get("weathercode", ""), is_day),
             current_weather.get("windspeed", 0.0) * 3.6,  # km/h -> m/s
             current_weather.get("winddirection", 0.0),
             sunrise,
             sunset,
-            1000.0,  # no data
-            1000.0,  # no data, TODO get from hourly forecast
-            0,  # TODO get from hourly forecast
+            1000.0,  # completed from the hourly forecast
+            1000.0,
+            0,
             0.0,
             current_weather.get("temperature", 0.0),
-            response.get("elevation", 0),
+            altitude,
             current_weather.get("precipitation_sum"),
         )
+        return current, five_day_forecast
 
-        return self._current_weather
-
-    def _complete_daily_weather(self):
-        # fill up current weather with hourly data
-        if not self._current_weather:
-            return
-        weather_points = self.daytime_forecast_points[0] + self.nighttime_forecast_points[0]
-        for point in weather_points:
-            if point.date_time + timedelta(hours=1) > datetime.now():
-                self._current_weather.humidity = point.humidity
-                self._current_weather.clouds = point.clouds
-                self._current_weather.pressure = point.pressure
-                self._current_weather.pressure_sea_level = point.pressure_sea_level
-                return
-
-    def _fetch_hourly_weather(self):
-        response = self._call_api(
-            self.API_FORECAST_CMD +
-            "&hourly=temperature_2m,relativehumidity_2m,precipitation,cloudcover,weathercode,pressure_msl," +
-            "surface_pressure,windspeed_10m,winddirection_10m&windspeed_unit=ms",
-            latitude=self._latitude, longitude=self._longitude)
-        if not response:
-            return None
-        # now aggregate the data - every 3 hours for 5 days and populate daily_forecast_points
-        daytime_forecast_points: List[List[Weather]] = [[] for i in range(7)]
-        nighttime_forecast_points: List[List[Weather]] = [[] for i in range(7)]
-        # we need sunrise and sunset info from current weather to know what day and night is
-        current_weather = self._current_weather
-        if not current_weather:
-            return ([], [])
-        current_datetime = datetime.now()
-        hourly = response.get("hourly", {})
-        for i in range(len(hourly.get("time", []))):
-            # utc to local time
-            entry_date_time = datetime.fromisoformat(hourly.get("time", [])[i])
-            if entry_date_time < current_datetime:  # throw away entries im the past
-                continue
-            time_delta = entry_date_time.date() - current_datetime.date()
-            day_idx = time_delta.days
-            if day_idx > 5 or day_idx < 0:
-                continue
-            is_day = is_daytime(current_weather.sunrise, current_weather.sunset, entry_date_time)
-            weather_point = Weather(
-                # "",  # no name necessary
-                self._get_main_category(hourly.get("weathercode", [i])[i]),
-                hourly.get("weathercode", [i])[i],
-                entry_date_time,
-                self._get_icon_name(hourly.get("weathercode", [])[i], is_day),
-                hourly.get("windspeed_10m", [])[i],
-                hourly.get("winddirection_10m", [])[i],
-                current_weather.sunrise,
-                current_weather.sunset,  # TODO use day
-                hourly.get("surface_pressure", [])[i],
-                hourly.get("pressure_msl", [])[i],
-                hourly.get("relativehumidity_2m", [])[i],
-                hourly.get("cloudcover", [])[i],
-                hourly.get("temperature_2m", [])[i],
-                current_weather.altitude,
-                hourly.get("precipitation", [])[i],
-            )
+    def _parse_hourly_weather(self, response: Dict[str, Any], current_weather: Weather,
+                              five_day_forecast: List[DailyWeather],
+                              current_date_time: datetime,
+                              sun_times: Tuple[List[time], List[time]]) -> HourlyForecast:
+        # we need sunrise and sunset of each day to know what day and night is
+        hourly = HourlyForecast(response.get("hourly", {}), *sun_times)
+        hourly.bin_days_and_nights(current_date_time)
 
-            if is_day:
-                daytime_forecast_points[day_idx].append(weather_point)
-            # this counts as night of the previous day
-            elif entry_date_time.time() < current_weather.sunrise:
-                if day_idx == 0:  # separate handling for today before and after midnight
-                    nighttime_forecast_points[0].append(weather_point)
-                # elif day_idx == 1:  # skip todays night points that fall on next day
-                #     #continue
-                #     nighttime_forecast_points[1].append(weather_point)
-                else:
-                    nighttime_forecast_points[day_idx-1].append(weather_point)
-            else:
-                if day_idx == 0:
-                    if entry_date_time.time() > current_weather.sunset:
-                        if current_datetime.time() < current_weather.sunrise:
-                            continue  # ignore for now
-                    nighttime_forecast_points[0].append(weather_point)
-                else:
-                    nighttime_forecast_points[day_idx].append(weather_point)
-        self.daytime_forecast_points = daytime_forecast_points
-        self.nighttime_forecast_points = nighttime_forecast_points
         # calculate min/max night and daytime temps
-        self._set_min_max_temps(daytime_forecast_points, nighttime_forecast_points)
-
-    def _set_min_max_temps(self, daytime_forecast_points: List[List[Weather]], nighttime_forecast_points: List[List[Weather]]):
-        for day_idx, forecast_points in enumerate(daytime_forecast_points):
-            if not forecast_points:  # empty 0. day before midnight
-                if len(self._five_day_forecast) > day_idx:
-                    self._five_day_forecast[day_idx].temp_max = float("inf")
-                    self._five_day_forecast[day_idx].temp_min = -float("inf")
-                continue
-            max_temp = max([point.temp for point in forecast_points])
-            self._five_day_forecast[day_idx].temp_max = max_temp
-            min_temp = min([point.temp for point in forecast_points])
-            self._five_day_forecast[day_idx].temp_min = min_temp
-
-        for day_idx, forecast_points in enumerate(nighttime_forecast_points):
-            if not forecast_points:  # empty 0. day before midnight
-                if len(self._five_day_forecast) > day_idx:
-                    self._five_day_forecast[day_idx].temp_night_max = float("inf")
-                    self._five_day_forecast[day_idx].temp_night_min = -float("inf")
-                continue
-            max_temp = max([point.temp for point in forecast_points])
-            self._five_day_forecast[day_idx].temp_night_max = max_temp
-            min_temp = min([point.temp for point in forecast_points])
-            self._five_day_forecast[day_idx].temp_night_min = min_temp
-
-    @staticmethod
-    def _determine_daily_overall_weather(measurement_points: Optional[List[Weather]]) -> Optional[Weather]:
-        """
-        Get the weather to be shown on the forecast icon.
-        The strategy is to first sort after the main category, e.g. rain, snow.
-        All the categories are listed in the WeatherQuality class and are ordered from bad to good.
-        In case there are multiple categories, first try determine the most numerous one.
-        If there are equal in count, take the one with the most bad.
-
-        return : the measurement point (Weather) representing the daily weather(main and description)
-        """
-
-        if not measurement_points:
-            return None
-
-        # first try look in main categories and get enumerate all of them
-        main_count_dict: Dict[str, int] = {}
-        for measurement_point in measurement_points:
-            if measurement_point.main not in main_count_dict:  # filter empty
-                main_count_dict.update({measurement_point.main: 1})
-                continue
-            main_count_dict[measurement_point.main] += 1
-
-        if not main_count_dict:  # something went wrong, no categories were found
-            return None
-
-        # dominant_categories can be a list or a single element
-        max_count = max(main_count_dict.values())
-        max_indices = [i for i, x in enumerate(main_count_dict.values()) if x == max_count]
-        dominant_categories = [list(main_count_dict)[i] for i in max_indices]
-
-        # there are multiple candidates
-        # if isinstance(dominant_categories, list):
-        # get the worst case - we want to know, if it snows in the middle of the day
-        # init with max value
-        worst_idx = max(list(map(lambda c: c.value, WeatherQuality)))
-        for category in dominant_categories:
-            # enum is uppercase
-            category_quality = WeatherQuality[category.upper()]
-            worst_idx = min(worst_idx, category_quality.value)
-        result_category = WeatherQuality(worst_idx)
-        # else:  # one element
-        #     result_category = dominant_categories
-
-        # get the most prevalent detailed description
-        wid = OpenMeteo._find_dominant_detailed_weather(measurement_points, result_category)
-
-        # only need one
-        return [point for point in measurement_points if point.wid == wid][0]
+        day_min, day_max = hourly.min_max(hourly.day_bin)
+        night_min, night_max = hourly.min_max(hourly.night_bin)
+        for day_idx, daily_weather in enumerate(five_day_forecast[:FORECAST_DAYS]):
+            # empty bins, e.g. the 0. day before midnight, are shown as (-inf, inf)
+            daily_weather.temp_min = float(day_min[day_idx])
+            daily_weather.temp_max = float(day_max[day_idx])
+            daily_weather.temp_night_min = float(night_min[day_idx])
+            daily_weather.temp_night_max = float(night_max[day_idx])
+
+            overall_weather = hourly.dominant_weather(np.flatnonzero(hourly.day_bin == day_idx))
+            if overall_weather:
+                daily_weather.main, wid = overall_weather
+                daily_weather.icon = self._get_icon_name(wid, True)
+
+        # fill up current weather with the next hourly point
+        point_idx = hourly.first_index(hourly.day_bin, 0)
+        if point_idx is None:
+            point_idx = hourly.first_index(hourly.night_bin, 0)
+        if point_idx is not None:
+            columns = hourly.columns
+            current_weather.humidity = float(columns["relativehumidity_2m"][point_idx])
+            current_weather.clouds = float(columns["cloudcover"][point_idx])
+            current_weather.pressure = float(columns["surface_pressure"][point_idx])
+            current_weather.pressure_sea_level = float(columns["pressure_msl"][point_idx])
+        return hourly
+
+    def _build_points(self, hourly: HourlyForecast, bins: np.ndarray, is_day: bool,
+                      current_weather: Weather) -> ForecastPoints:
+        """ Select the binned points, all columns at once. """
+        selected = np.flatnonzero(bins != NO_BIN)
+        wids = hourly.weathercode[selected]
+        codes, inverse = np.unique(wids, return_inverse=True)
+        main = np.array([self._get_main_category(int(code)) for code in codes], dtype=object)
+        icons = np.array([self._get_icon_name(int(code), is_day) for code in codes],
+                         dtype=object)
+        columns = hourly.columns
+        return ForecastPoints(
+            hourly.time[selected],
+            bins[selected],
+            wids,
+            main[inverse],
+            icons[inverse],
+            {
+                "wind_speed": columns["windspeed_10m"][selected],
+                "wind_deg": columns["winddirection_10m"][selected],
+                "pressure": columns["surface_pressure"][selected],
+                "pressure_sea_level": columns["pressure_msl"][selected],
+                "humidity": columns["relativehumidity_2m"][selected],
+                "clouds": columns["cloudcover"][selected],
+                "temp": columns["temperature_2m"][selected],
+                "precipitation": columns["precipitation"][selected],
+            },
+            hourly.sunrises,
+            hourly.sunsets,
+            current_weather.altitude,
+            current_weather.fetch_time,
+        )
 
-    @staticmethod
-    def _find_dominant_detailed_weather(measurement_points: List[Weather], category: WeatherQuality):
-        """ Tries to find the best matching detailed weather for the day """
-
-        # count all detailed conditions with the selected main category
-        detail_count_dict = {}
-        for point in measurement_points:
-            if category.name in point.main.upper():  # and point.description:
-                if not point.wid in detail_count_dict:
-                    detail_count_dict[point.wid] = 1
-                    continue
-                detail_count_dict[point.wid] += 1
-        max_count = max(detail_count_dict.values())
-        max_indices = [i for i, x in enumerate(detail_count_dict.values()) if x == max_count]
-        dominant_categories = [list(detail_count_dict)[i]for i in max_indices]
-        return dominant_categories[0]
-
-
-    def _call_api(self, command: str, **kwargs) -> Dict[str, Any]:
+    def _call_api(self, command: str, **kwargs) -> Any:
         """ Call the REST like API of OpenWeatherMap. Return response. """
         if self._disabled:
             return {}
-        # wait a little bit for connection
+        # cached verdict - don't stall the update loop while offline
         is_connected = Network().wait_for_internet()
         if not is_connected:
-            self._logger.error("OpenMeteo: Timeout while wating for network connection")
+            self._logger.error("OpenMeteo: No internet connection")
             return {}
         try:
-            command = command.format(**kwargs)
-            response = requests.get(command, timeout=5)
-            if response.ok:
-                return response.json()
-        except Exception as error:
+            return HttpClient().get_json(command.format(**kwargs))
+        except (HttpError, ValueError) as error:
             self._logger.error(f"OpenMeteo: Can't get data: {str(error)}")
         return {}
 
@@ -1,51 +1,92 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import waqd
+from waqd.base.http_client import HttpClient, HttpError
 from waqd.base.network import Network
 from waqd.base.file_logger import Logger
-import urllib.request
-import json
 
 
 class OpenTopoData:
     """
     Get altitude (elevation) from geo coordinates.
     Needed for OpenWeatherMap)
+    The elevation does not change, so every location is requested only once
+    and stored persistently.
     """
 
     QUERY = "https://api.opentopodata.org/v1/eudem25m?locations={lat},{long}"
+    CACHE_FILE_NAME = "elevation_cache.json"
+    COORDINATE_DECIMALS = 3  # about 100 m
+    # about 10 km - providers query the coordinates of the city next to the seeded location
+    SEED_TOLERANCE_DEG = 0.1
 
-    def __init__(self):
+    def __init__(self, cache_path: Optional[Path] = None):
         super().__init__()
-        self._altitude_info = {}
+        self._cache_path = cache_path or waqd.user_config_dir / self.CACHE_FILE_NAME
+        self._elevations: Dict[str, float] = self._load()
+        self._seeds: List[Tuple[float, float, float]] = []  # latitude, longitude, altitude
+
+    def seed(self, latitude: float, longitude: float, altitude: float):
+        """
+        Use a known altitude, e.g. from the settings, instead of requesting it.
+        It is also used for coordinates within SEED_TOLERANCE_DEG.
+        """
+        self._elevations.setdefault(self._get_key(latitude, longitude), altitude)
+        self._seeds.append((latitude, longitude, altitude))
 
     def get_altitude(self, latitude: float, longitude: float) -> float:
-        location_data = self._altitude_info.get("location")
-        if (
-            location_data
-            and location_data.get("lat") == latitude
-            and location_data.get("lng") == longitude
-        ):
-            return self._altitude_info.get("elevation", 0.0)
-
-        # wait a little bit for connection
+        key = self._get_key(latitude, longitude)
+        if key in self._elevations:
+            return self._elevations[key]
+        for seed_latitude, seed_longitude, altitude in self._seeds:
+            if (abs(latitude - seed_latitude) <= self.SEED_TOLERANCE_DEG
+                    and abs(longitude - seed_longitude) <= self.SEED_TOLERANCE_DEG):
+                return altitude
+
+        # cached verdict - don't stall the update loop while offline
         is_connected = Network().wait_for_internet()
         if not is_connected:
-            Logger().error("OpenTopo: Timeout while wating for network connection")
+            Logger().error("OpenTopo: No internet connection")
             return 0
-        response_file = None
         try:
-            response_file = urllib.request.urlretrieve(
-                self.QUERY.format(lat=latitude, long=longitude)
-            )
-        except Exception as error:
+            response = HttpClient().get_json(self.QUERY.format(lat=latitude, long=longitude))
+        except (HttpError, ValueError) as error:
             Logger().error(
                 f"OpenTopo: Can't get altitude for {latitude} {longitude} : {str(error)}"
             )
+            return 0
 
-        if not response_file:
+        results = response.get("results")
+        if response.get("status", "") != "OK" or not results:
+            return 0
+        elevation = results[0].get("elevation")
+        if elevation is None:  # no data for this location, e.g. outside of Europe
             return 0
+        self._elevations[key] = elevation
+        self._store()
+        return elevation
+
+    def _get_key(self, latitude: float, longitude: float) -> str:
+        decimals = self.COORDINATE_DECIMALS
+        return f"{latitude:.{decimals}f},{longitude:.{decimals}f}"
 
-        with open(response_file[0], encoding="utf-8") as response_json:
-            response = json.load(response_json)
-            if response.get("status", "") != "OK":
-                return 0
-            self._altitude_info = response.get("results")[0]  # TODO guard
-            return self._altitude_info.get("elevation")
+    def _load(self) -> Dict[str, float]:
+        try:
+            return json.loads(self._cache_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except Exception as error:  # corrupt - will be overwritten with the next location
+            Logger().warning("OpenTopo: Can't read %s: %s", str(self._cache_path), str(error))
+            return {}
+
+    def _store(self):
+        try:
+            self._cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._cache_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self._elevations), encoding="utf-8")
+            os.replace(tmp_path, self._cache_path)
+        except OSError as error:
+            Logger().warning("OpenTopo: Can't write %s: %s", str(self._cache_path), str(error))
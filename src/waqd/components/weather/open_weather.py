@@ -1,12 +1,15 @@
-from datetime import datetime
+from datetime import date, datetime, time, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
-import requests
-
+from waqd.base.http_client import HttpClient, HttpError
 from waqd.base.network import Network
+from waqd.settings import (LOCATION_ALTITUDE_M, LOCATION_LATITUDE,
+                           LOCATION_LONGITUDE, Settings)
 
-from .base_types import (BeaufortScale, DailyWeather, Weather, WeatherProvider,
-                         WeatherQuality, is_daytime)
+from .base_types import (HOME_LOCATION, BeaufortScale, DailyWeather, Weather,
+                         WeatherProvider, WeatherQuality, is_daytime)
+from .forecast_points import FLOAT_FIELDS, ForecastPoint, ForecastPoints
+from .solar import get_sun_times
 from .icon_mapping import owm_icon_mapping
 from .open_topo import OpenTopoData
 
@@ -24,12 +27,19 @@ class OpenWeatherMap(WeatherProvider):
         "https://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}"
     )
     API_POSTFIX = "&units=metric&APPID={apikey}"
+    FORECAST_DAYS = 7
 
-    def __init__(self, city_id, api_key):
-        super().__init__()
+    def __init__(self, city_id, api_key, settings: Optional[Settings] = None):
+        super().__init__(settings=settings)
         self._city_id = city_id  # use id, name is ambiguous
         self._api_key = api_key
         self._topo_data = OpenTopoData()
+        if settings:
+            latitude = settings.get_float(LOCATION_LATITUDE)
+            longitude = settings.get_float(LOCATION_LONGITUDE)
+            if latitude or longitude:  # not the unset default
+                self._topo_data.seed(latitude, longitude,
+                                     settings.get_float(LOCATION_ALTITUDE_M))
 
         if not self._city_id:
             self._logger.error(
@@ -42,14 +52,16 @@ class OpenWeatherMap(WeatherProvider):
 
         self._current_weather: Optional[Weather] = None
         self._five_day_forecast: List[DailyWeather] = []
-        self.daytime_forecast_points = []
-        self.nighttime_forecast_points = []
+        self.daytime_points: Optional[ForecastPoints] = None
+        self.nighttime_points: Optional[ForecastPoints] = None
         # query data ini init, so it doesn't run in the GUI thread
         self.get_5_day_forecast()
         self._ready = True
 
-    def get_current_weather(self) -> Optional[Weather]:
-        """Public API function to get the current weather."""
+    def get_current_weather(self, location=HOME_LOCATION) -> Optional[Weather]:
+        """Public API function to get the current weather. Only for the home location."""
+        if location != HOME_LOCATION:
+            return None
         # return if data is up-to-date in a window of 5 minutes
         current_date_time = datetime.now()
         if self._current_weather:
@@ -83,11 +95,14 @@ class OpenWeatherMap(WeatherProvider):
             current_info.get("clouds", {}).get("all", 0.0),
             current_info.get("main", {}).get("temp", 0.0),
             self._topo_data.get_altitude(coord.get("lat", 0.0), coord.get("lon", 0.0)),
+            current_info.get("rain", {}).get("1h", 0.0),
         )
         return self._current_weather
 
-    def get_5_day_forecast(self) -> List[DailyWeather]:
+    def get_5_day_forecast(self, location=HOME_LOCATION) -> List[DailyWeather]:
         """Public forecast API function."""
+        if location != HOME_LOCATION:
+            return []
         # return if data is up-to-date in a window half an hour
         current_date_time = datetime.now()
         if len(self._five_day_forecast) > 1:
@@ -96,11 +111,10 @@ class OpenWeatherMap(WeatherProvider):
                 if time_delta.seconds < 1800:  # 0.5 h
                     return self._five_day_forecast
 
-        [self.daytime_forecast_points, self.nighttime_forecast_points] = (
-            self._get_forecast_points()
-        )
-        if not self.daytime_forecast_points:  # error from url call, nothing to do
+        points = self._get_forecast_points()
+        if not points:  # error from url call, nothing to do
             return []
+        self.daytime_points, self.nighttime_points = points
         current_weather = self.get_current_weather()
         if not current_weather:
             return []
@@ -110,20 +124,37 @@ class OpenWeatherMap(WeatherProvider):
 
         return self._five_day_forecast
 
-    def _get_forecast_points(self) -> Tuple[List[List[Weather]], List[List[Weather]]]:
+    @property
+    def daytime_forecast_points(self) -> List[List[ForecastPoint]]:
+        """ Row views of daytime_points per day. """
+        if self.daytime_points is None:
+            return []
+        return self.daytime_points.days(self.FORECAST_DAYS)
+
+    @property
+    def nighttime_forecast_points(self) -> List[List[ForecastPoint]]:
+        """ Row views of nighttime_points per night. """
+        if self.nighttime_points is None:
+            return []
+        return self.nighttime_points.days(self.FORECAST_DAYS)
+
+    def _get_forecast_points(self) -> Optional[Tuple[ForecastPoints, ForecastPoints]]:
         """Get all forecast points, separated into day and nighttime"""
         forecast = self._call_api(self.FORECAST_BY_CITY_ID_API_CMD)
         if not forecast:  # error from call, nothing to do
-            return ([], [])
+            return None
 
-        # now aggregate the data - every 3 hours for 5 days and populate daily_forecast_points
-        daytime_forecast_points: List[List[Weather]] = [[] for i in range(7)]
-        nighttime_forecast_points: List[List[Weather]] = [[] for i in range(7)]
+        # now aggregate the data - every 3 hours for 5 days and populate the points
+        # rows of (date time, day index, wid, main, icon, values of FLOAT_FIELDS)
+        daytime_rows: List[Tuple] = []
+        nighttime_rows: List[Tuple] = []
         # we need sunrise and sunset info from current weather to know what day and night is
         current_weather = self.get_current_weather()
         if not current_weather:
-            return ([], [])
+            return None
         current_datetime = datetime.now()
+        sunrises, sunsets = self._get_sun_times(forecast, current_weather,
+                                                current_datetime.date())
         for measurement_point in forecast.get("list", []):
             # utc to local time
             entry_date_time = datetime.fromtimestamp(measurement_point.get("dt"))
@@ -131,55 +162,85 @@ class OpenWeatherMap(WeatherProvider):
             day_idx = time_delta.days
             if day_idx > 5 or day_idx < 0:
                 continue
-            is_day = is_daytime(
-                current_weather.sunrise, current_weather.sunset, entry_date_time
-            )
+            is_day = is_daytime(sunrises[day_idx], sunsets[day_idx], entry_date_time)
             # api defines only one point, no defense needed - and if is, the functionilty will not work either
             weather_info: Dict[str, Any] = measurement_point.get("weather")[0]
             if not weather_info:
                 continue
-            weather_point = Weather(
+            values = (
+                weather_info.get("id", 0),
                 weather_info.get("main", ""),
-                weather_info.get("id", ""),
-                entry_date_time,
                 self._get_icon_name(weather_info.get("id", ""), is_day),
                 measurement_point.get("wind").get("speed"),
                 measurement_point.get("wind").get("deg"),
-                current_weather.sunrise,
-                current_weather.sunset,
                 0,
                 0,
                 0,  # currently unused
                 measurement_point.get("clouds").get("all"),
                 measurement_point.get("main").get("temp"),
-                current_weather.altitude,
+                measurement_point.get("rain", {}).get("3h", 0.0),
             )
 
             if is_day:
-                daytime_forecast_points[day_idx].append(weather_point)
+                daytime_rows.append((entry_date_time, day_idx, *values))
             # this counts as night of the previous day
-            elif entry_date_time.time() < current_weather.sunrise:
+            elif entry_date_time.time() < sunrises[day_idx]:
                 if day_idx == 0:  # separate handling for today before and after midnight
-                    nighttime_forecast_points[0].append(weather_point)
+                    nighttime_rows.append((entry_date_time, 0, *values))
                 # elif day_idx == 1:  # skip todays night points that fall on next day
                 #     #continue
                 #     nighttime_forecast_points[1].append(weather_point)
                 else:
-                    nighttime_forecast_points[day_idx - 1].append(weather_point)
+                    nighttime_rows.append((entry_date_time, day_idx - 1, *values))
             else:
                 if day_idx == 0:
-                    if entry_date_time.time() > current_weather.sunset:
+                    if entry_date_time.time() > sunsets[0]:
                         if current_datetime.time() < current_weather.sunrise:
                             continue  # ignore for now
-                    nighttime_forecast_points[0].append(weather_point)
+                    nighttime_rows.append((entry_date_time, 0, *values))
                 else:
-                    nighttime_forecast_points[day_idx].append(weather_point)
-        return (daytime_forecast_points, nighttime_forecast_points)
+                    nighttime_rows.append((entry_date_time, day_idx, *values))
+        return (self._to_forecast_points(daytime_rows, sunrises, sunsets, current_weather),
+                self._to_forecast_points(nighttime_rows, sunrises, sunsets, current_weather))
+
+    def _get_sun_times(self, forecast: Dict[str, Any], current_weather: Weather,
+                       today: date) -> Tuple[List[time], List[time]]:
+        """
+        Sunrise and sunset of the forecast days in local time, beginning with today.
+        The API only sends the ones of today, the following days are computed.
+        """
+        sunrises = [current_weather.sunrise]
+        sunsets = [current_weather.sunset]
+        coord = forecast.get("city", {}).get("coord", {})
+        for day_idx in range(1, self.FORECAST_DAYS):
+            if "lat" in coord and "lon" in coord:
+                sunrise, sunset = get_sun_times(coord["lat"], coord["lon"],
+                                                today + timedelta(days=day_idx))
+            else:
+                sunrise, sunset = current_weather.sunrise, current_weather.sunset
+            sunrises.append(sunrise)
+            sunsets.append(sunset)
+        return sunrises, sunsets
+
+    def _to_forecast_points(self, rows: List[Tuple], sunrises: List[time], sunsets: List[time],
+                            current_weather: Weather) -> ForecastPoints:
+        columns = list(zip(*rows)) or [()] * (5 + len(FLOAT_FIELDS))
+        return ForecastPoints(
+            columns[0],
+            columns[1],
+            columns[2],
+            columns[3],
+            columns[4],
+            dict(zip(FLOAT_FIELDS, columns[5:])),
+            sunrises,
+            sunsets,
+            current_weather.altitude,
+        )
 
     def _aggregate_forecast_points_to_days(
         self,
-        daytime_forecast_points: List[List[Weather]],
-        nighttime_forecast_points: List[List[Weather]],
+        daytime_forecast_points: List[List[ForecastPoint]],
+        nighttime_forecast_points: List[List[ForecastPoint]],
         current_weather: Weather,
     ):
         """Calculate the daily weather form the points and set self._five_day_forecast"""
@@ -206,22 +267,23 @@ class OpenWeatherMap(WeatherProvider):
             max_wind_speed = max([point.wind_speed for point in forecast_points])
             # enhance icon with wind information - we already have strong wind and onwards
             # as an extra condition
+            icon = overall_weather.icon  # the points are read-only views
             if max_wind_speed > BeaufortScale.FRESH_BREEZE.value:
                 if overall_weather.main == "Clear":
-                    overall_weather.icon = self._get_icon_name("windy", True)
+                    icon = self._get_icon_name("windy", True)
                 if overall_weather.main == "Clouds":
-                    overall_weather.icon = self._get_icon_name("cloudy-windy", True)
+                    icon = self._get_icon_name("cloudy-windy", True)
                 if overall_weather.main == "Rain":
-                    overall_weather.icon = self._get_icon_name("rain-windy", True)
+                    icon = self._get_icon_name("rain-windy", True)
                 if overall_weather.main == "Snow":
-                    overall_weather.icon = self._get_icon_name("snow-windy", True)
+                    icon = self._get_icon_name("snow-windy", True)
 
             # init DailyWeather
             daily_weather = DailyWeather(
                 overall_weather.main,
                 overall_weather.wid,
                 overall_weather.date_time,
-                overall_weather.icon,
+                icon,
                 max_wind_speed,
                 overall_weather.wind_deg,
                 overall_weather.sunrise,
@@ -232,37 +294,23 @@ class OpenWeatherMap(WeatherProvider):
                 overall_weather.clouds,
                 float(overall_weather.temp),
                 overall_weather.altitude,
+                sum(point.precipitation for point in forecast_points),
             )
             self._five_day_forecast.append(daily_weather)
         # calculate min/max night and daytime temps
-        self._set_min_max_temps(daytime_forecast_points, nighttime_forecast_points)
-
-    def _set_min_max_temps(
-        self,
-        daytime_forecast_points: List[List[Weather]],
-        nighttime_forecast_points: List[List[Weather]],
-    ):
-        for day_idx, forecast_points in enumerate(daytime_forecast_points):
-            if not forecast_points:  # empty 0. day before midnight
-                if len(self._five_day_forecast) > day_idx:
-                    self._five_day_forecast[day_idx].temp_max = float("inf")
-                    self._five_day_forecast[day_idx].temp_min = -float("inf")
-                continue
-            max_temp = max([point.temp for point in forecast_points])
-            self._five_day_forecast[day_idx].temp_max = max_temp
-            min_temp = min([point.temp for point in forecast_points])
-            self._five_day_forecast[day_idx].temp_min = min_temp
-
-        for day_idx, forecast_points in enumerate(nighttime_forecast_points):
-            if not forecast_points:  # empty 0. day before midnight
-                if len(self._five_day_forecast) > day_idx:
-                    self._five_day_forecast[day_idx].temp_night_max = float("inf")
-                    self._five_day_forecast[day_idx].temp_night_min = -float("inf")
-                continue
-            max_temp = max([point.temp for point in forecast_points])
-            self._five_day_forecast[day_idx].temp_night_max = max_temp
-            min_temp = min([point.temp for point in forecast_points])
-            self._five_day_forecast[day_idx].temp_night_min = min_temp
+        self._set_min_max_temps()
+
+    def _set_min_max_temps(self):
+        """ Empty days, e.g. the 0. day before midnight, are shown as (-inf, inf). """
+        if self.daytime_points is None or self.nighttime_points is None:
+            return
+        day_min, day_max = self.daytime_points.min_max(self.FORECAST_DAYS)
+        night_min, night_max = self.nighttime_points.min_max(self.FORECAST_DAYS)
+        for day_idx, daily_weather in enumerate(self._five_day_forecast[:self.FORECAST_DAYS]):
+            daily_weather.temp_min = float(day_min[day_idx])
+            daily_weather.temp_max = float(day_max[day_idx])
+            daily_weather.temp_night_min = float(night_min[day_idx])
+            daily_weather.temp_night_max = float(night_max[day_idx])
 
     @staticmethod
     def _determine_daily_overall_weather(measurement_points: List[Weather]):
@@ -346,20 +394,17 @@ class OpenWeatherMap(WeatherProvider):
         """Call the REST like API of OpenWeatherMap. Return response."""
         if self._disabled:
             return {}
-        # wait a little bit for connection
+        # cached verdict - don't stall the update loop while offline
         is_connected = Network().wait_for_internet()
         if not is_connected:
-            self._logger.error("OpenWeatherMap: Timeout while wating for network connection")
+            self._logger.error("OpenWeatherMap: No internet connection")
             return {}
         try:
-            response = requests.get(
+            return HttpClient().get_json(
                 command.format(cid=self._city_id)
-                + self.API_POSTFIX.format(apikey=self._api_key),
-                timeout=5,
+                + self.API_POSTFIX.format(apikey=self._api_key)
             )
-            if response.ok:
-                return response.json()
-        except Exception as error:
+        except (HttpError, ValueError) as error:
             self._logger.error(
                 f"OpenWeatherMap: Can't get current weather for {self._city_id} : {str(error)}"
             )
@@ -0,0 +1,103 @@
+import threading
+from typing import Callable, Optional
+
+from waqd.base.file_logger import Logger
+
+
+class WeatherRefresher:
+    """
+    Fetches the data of a weather provider on a schedule in its own thread,
+    so that readers only get the latest cached result and never wait for the network.
+    Fetches are single-flight: a refresh requested while one is running joins it
+    instead of starting another request.
+    """
+
+    def __init__(self, name: str, fetch: Callable[[], bool], interval_s: Optional[float],
+                 retry_s: Optional[float]):
+        """
+        :param fetch: Fetches and stores the new data. Returns false on failure.
+        :param interval_s: Time between successful fetches. None fetches only on request.
+        :param retry_s: Time until the next try after a failed fetch. None waits for a request.
+        """
+        self._name = name
+        self._fetch = fetch
+        self._interval_s = interval_s
+        self._retry_s = retry_s
+        self._condition = threading.Condition()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._started = 0  # number of fetches started
+        self._completed = 0  # number of fetches completed
+        self._in_flight = False
+        self._last_success = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def last_success(self) -> bool:
+        """ Result of the last completed fetch. """
+        return self._last_success
+
+    @property
+    def fetch_count(self) -> int:
+        """ Number of completed fetches, successful or not. """
+        return self._completed
+
+    def start(self, initial_delay_s: Optional[float] = 0):
+        """
+        Start the schedule. The first fetch is done after the initial delay.
+        With None, the first fetch waits for a request.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(name=self._name, target=self._refresh_loop,
+                                        args=[initial_delay_s], daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def refresh(self, wait=False, timeout: Optional[float] = None) -> bool:
+        """
+        Request a fetch now. If one is in flight, it is not repeated.
+        With wait, blocks until the requested fetch completed. Returns false on timeout.
+        """
+        with self._condition:
+            if self._in_flight:
+                target = self._started
+            else:
+                target = self._started + 1
+                self._wake_event.set()
+            if not wait:
+                return True
+            return self._condition.wait_for(lambda: self._completed >= target, timeout)
+
+    def wait_until_fetched(self, timeout: Optional[float] = None) -> bool:
+        """ Blocks until the first fetch completed. Returns false on timeout. """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._completed > 0, timeout)
+
+    def _refresh_loop(self, initial_delay_s: Optional[float]):
+        delay = initial_delay_s
+        while True:
+            if delay is None or delay > 0:
+                self._wake_event.wait(delay)
+            if self._stop_event.is_set():
+                return
+            self._wake_event.clear()
+            with self._condition:
+                self._started += 1
+                self._in_flight = True
+            success = False
+            try:
+                success = self._fetch()
+            except Exception as error:
+                Logger().error("%s: Fetch failed: %s", self._name, str(error))
+            finally:
+                with self._condition:
+                    self._last_success = success
+                    self._completed = self._started
+                    self._in_flight = False
+                    self._condition.notify_all()
+            delay = self._interval_s if success else self._retry_s
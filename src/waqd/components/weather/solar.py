@@ -0,0 +1,76 @@
+"""
+Local computation of sunrise and sunset, to classify day and night without a provider.
+Uses the approximation of the NOAA Global Monitoring Division
+("General Solar Position Calculations"), which is accurate to a few minutes.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+
+ZENITH_DEG = 90.833  # sun center at the horizon, with refraction and the radius of the sun
+COORDINATE_DECIMALS = 2  # about 1 km, less than a minute of sun time
+
+
+@lru_cache(maxsize=16)
+def get_year_table(latitude: float, longitude: float,
+                   year: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sunrise and sunset of every day of the year in minutes after midnight UTC,
+    indexed by the day of the year - 1.
+    On polar days sunrise is -inf and sunset inf, on polar nights both are NaN.
+    """
+    days_in_year = 366 if date(year, 12, 31).timetuple().tm_yday == 366 else 365
+    day_of_year = np.arange(1, days_in_year + 1)
+    # fractional year at noon in radians
+    gamma = 2 * np.pi / days_in_year * (day_of_year - 1)
+    equation_of_time = 229.18 * (0.000075 + 0.001868 * np.cos(gamma) - 0.032077 * np.sin(gamma)
+                                 - 0.014615 * np.cos(2 * gamma) - 0.040849 * np.sin(2 * gamma))
+    declination = (0.006918 - 0.399912 * np.cos(gamma) + 0.070257 * np.sin(gamma)
+                   - 0.006758 * np.cos(2 * gamma) + 0.000907 * np.sin(2 * gamma)
+                   - 0.002697 * np.cos(3 * gamma) + 0.00148 * np.sin(3 * gamma))
+    lat = np.radians(latitude)
+    cos_hour_angle = (np.cos(np.radians(ZENITH_DEG)) / (np.cos(lat) * np.cos(declination))
+                      - np.tan(lat) * np.tan(declination))
+    with np.errstate(invalid="ignore"):  # |cos| > 1: the sun does not cross the horizon
+        hour_angle = np.degrees(np.arccos(cos_hour_angle))
+    sunrise = 720 - 4 * (longitude + hour_angle) - equation_of_time
+    sunset = 720 - 4 * (longitude - hour_angle) - equation_of_time
+    polar_day = cos_hour_angle < -1
+    sunrise[polar_day] = -np.inf
+    sunset[polar_day] = np.inf
+    for table in (sunrise, sunset):
+        table.flags.writeable = False  # shared by the cache
+    return sunrise, sunset
+
+
+def get_sun_times(latitude: float, longitude: float, day: date,
+                  utc_offset: Optional[timedelta] = None) -> Tuple[time, time]:
+    """
+    Sunrise and sunset of a day in local time.
+    :param utc_offset: of the location, the local timezone of the system if not given
+    On polar days it returns the whole day, on polar nights an empty span at midnight,
+    so that is_daytime works without special cases.
+    """
+    sunrise_table, sunset_table = get_year_table(round(latitude, COORDINATE_DECIMALS),
+                                                 round(longitude, COORDINATE_DECIMALS),
+                                                 day.year)
+    day_idx = day.timetuple().tm_yday - 1
+    sunrise, sunset = float(sunrise_table[day_idx]), float(sunset_table[day_idx])
+    if np.isinf(sunrise):
+        return time.min, time.max
+    if np.isnan(sunrise):
+        return time.min, time.min
+    return (_to_local_time(day, sunrise, utc_offset), _to_local_time(day, sunset, utc_offset))
+
+
+def _to_local_time(day: date, minutes_utc: float, utc_offset: Optional[timedelta]) -> time:
+    date_time = (datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+                 + timedelta(minutes=minutes_utc))
+    if utc_offset is None:
+        local = date_time.astimezone()
+    else:
+        local = date_time.astimezone(timezone(utc_offset))
+    return local.time().replace(second=0, microsecond=0)
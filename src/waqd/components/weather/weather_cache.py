@@ -0,0 +1,52 @@
+"""
+On-disk cache for the raw responses of the weather providers,
+so that the last good data is available right after a restart and while offline.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import waqd
+from waqd.base.file_logger import Logger
+
+
+class WeatherCache:
+    """ Stores the last response of one provider for one location. """
+
+    CACHE_DIR_NAME = "weather_cache"
+
+    def __init__(self, provider: str, latitude: float, longitude: float,
+                 cache_dir: Optional[Path] = None):
+        cache_dir = cache_dir or waqd.user_config_dir / self.CACHE_DIR_NAME
+        self._path = cache_dir / f"{provider}_{latitude:.3f}_{longitude:.3f}.json"
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def load(self) -> Optional[Tuple[Dict[str, Any], datetime]]:
+        """ Returns the cached response and the time it was fetched, if there is one. """
+        try:
+            content = json.loads(self._path.read_text(encoding="utf-8"))
+            return content["response"], datetime.fromisoformat(content["fetch_time"])
+        except FileNotFoundError:
+            return None
+        except Exception as error:  # corrupt - will be overwritten with the next response
+            Logger().warning("WeatherCache: Can't read %s: %s", str(self._path), str(error))
+            return None
+
+    def store(self, response: Dict[str, Any], fetch_time: datetime):
+        """ Write atomically, so that a power loss never leaves a half written file. """
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._path.with_suffix(".tmp")
+            tmp_path.write_text(
+                json.dumps({"fetch_time": fetch_time.isoformat(), "response": response}),
+                encoding="utf-8",
+            )
+            os.replace(tmp_path, self._path)
+        except OSError as error:
+            Logger().warning("WeatherCache: Can't write %s: %s", str(self._path), str(error))
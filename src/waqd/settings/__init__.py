@@ -24,6 +24,7 @@ CCS811_ENABLED = "ccs811_enabled"
 MH_Z19_ENABLED = "mh_z19_enabled"
 MH_Z19_VALUE_OFFSET = "mh_z19_value_offset"
 LOG_SENSOR_DATA = "log_sensor_data"
+SENSOR_WORKER_PROCESS = "sensor_worker_process"  # run sensor drivers in a separate process
 USER_SESSION_SECRET = "user_session_secret"
 USER_API_KEY = "user_api_key"
 REMOTE_API_KEY = "remote_api_key"
@@ -55,6 +56,8 @@ LOCATION_LATITUDE = "location_lat"
 LOCATION_ALTITUDE_M = "last_altitude_value"
 LOCATION_STATE = "location_state"  # e.g. state, province, region
 LOCATION_COUNTRY_CODE = "location_country_code"
+# more locations to forecast, as "name:latitude:longitude;name:latitude:longitude"
+ADDITIONAL_LOCATIONS = "additional_locations"
 
 OW_API_KEY = "open_weather_api_key"
 
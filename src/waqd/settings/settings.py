@@ -3,9 +3,10 @@ import logging
 import os
 import secrets
 from pathlib import Path
-from typing import Union, Dict
+from typing import Union, Dict, Set
 from waqd import PROG_NAME
 from waqd.settings import (
+    ADDITIONAL_LOCATIONS,
     AUTO_UPDATER_ENABLED,
     CCS811_ENABLED,
     FORECAST_BG,
@@ -46,6 +47,7 @@ from waqd.settings import (
     WAVESHARE_DISP_BRIGHTNESS_PIN,
     DHT_22_DISABLED,
     LOG_SENSOR_DATA,
+    SENSOR_WORKER_PROCESS,
 )
 
 def strtobool(value: str) -> bool:
@@ -87,6 +89,7 @@ class Settings:
         else:
             self._logger.info("Settings: Using %s", str(self._ini_file_path))
         self._auto_save = auto_save
+        self._changed_keys: Set[str] = set()  # changed since last pop_changed_keys
 
         ### default setting values ###
         self._values = {
@@ -119,6 +122,7 @@ class Settings:
                 LOCATION_LONGITUDE: 0.0,
                 LOCATION_ALTITUDE_M: 400.0,
                 LOCATION_STATE: "",
+                ADDITIONAL_LOCATIONS: "",
             },
             self._REMOTE_SECTION_NAME: {
                 REMOTE_MODE_URL: "",
@@ -134,6 +138,7 @@ class Settings:
                 MOTION_SENSOR_ENABLED: True,
                 MOTION_SENSOR_PIN: 23,
                 LOG_SENSOR_DATA: True,
+                SENSOR_WORKER_PROCESS: False,
             },
             self._SECRET_SECTION_NAME: {
                 USER_SESSION_SECRET: secrets.token_hex(32),
@@ -143,6 +148,7 @@ class Settings:
         }
 
         self._read_ini()
+        self._changed_keys.clear()  # values from the file are the starting point
 
     def get(self, name: str) -> Union[str, int, float, bool, Dict[str, str]]:
         """Get a specific setting"""
@@ -186,6 +192,8 @@ class Settings:
                     elif isinstance(current_value, int):
                         value = int(value)
 
+                if current_value != value:
+                    self._changed_keys.add(setting_name)
                 self._values[section][setting_name] = value
                 # self._logger.debug("Settings: Set %s to %s", setting_name, value)
                 break
@@ -193,6 +201,17 @@ class Settings:
             self._logger.debug("Settings: Auto-saving settings")
             self.save()
 
+    @property
+    def ini_folder(self) -> Path:
+        """Folder of the ini file, e.g. to read the settings in another process."""
+        return self._ini_file_path.parent
+
+    def pop_changed_keys(self) -> Set[str]:
+        """Returns the names of all settings changed since the last call and resets them."""
+        changed_keys = self._changed_keys
+        self._changed_keys = set()
+        return changed_keys
+
     def get_all(self) -> Dict[str, Union[str, int, float, bool]]:
         """Get all settings without sections and secrets as a dictionary."""
         all_settings = {}
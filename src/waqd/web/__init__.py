@@ -19,7 +19,11 @@ local_server = None
 LOCAL_SERVER_PORT = "8080"
 
 
-def start_web_server(reload=False):
+def start_web_server(reload=False, workers=1):
+    """
+    Serve the web UI. With more than one worker, the components stay in this (core) process
+    and the workers get their state from the state service.
+    """
     import uvicorn
 
     os.system("sudo setcap 'cap_net_bind_service=+ep' /usr/bin/python3.11")
@@ -28,15 +32,31 @@ def start_web_server(reload=False):
     prepare_local_login()
     if reload:
         hostname = "localhost"
+        workers = 1  # not supported by uvicorn
     else:
         hostname = "0.0.0.0"
+    state_service = None
+    if workers > 1:
+        from .state_service import CONFIG_DIR_ENV, STATE_SOCKET_ENV, StateService
+
+        state_service = StateService(waqd.user_config_dir / "state.sock")
+        state_service.start()
+        # inherited by the worker processes
+        os.environ[STATE_SOCKET_ENV] = str(state_service.socket_path)
+        os.environ[CONFIG_DIR_ENV] = str(waqd.user_config_dir)
+    # loop and http "auto" use uvloop and httptools, if they are installed
     uvicorn.run(
         "waqd.web.main:web_app",
         host=hostname,
         port=80,
         reload=reload,
         reload_excludes=["*.html", "*.css", ".log"],
+        workers=workers,
+        loop="auto",
+        http="auto",
     )
+    if state_service is not None:
+        state_service.stop()
     if browser_proc is not None:
         browser_proc.terminate()
     if local_server is not None:
@@ -0,0 +1,30 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
+
+import waqd.app as base_app
+from waqd.base.diagnostics import STACK_SAMPLES, collect_diagnostics
+from waqd.web.authentication import (PermissionChecker, User,
+                                     get_current_user_with_exception)
+from waqd.web.state_service import get_state_client
+
+rt = APIRouter()
+
+MAX_STACK_SAMPLES = 100
+
+
+@rt.get("/", response_class=JSONResponse)
+def get_diagnostics(current_user: Annotated[User, Depends(get_current_user_with_exception)],
+                    samples: int = STACK_SAMPLES):
+    """ Threads with their CPU time, update loop statistics and sampled stacks of the core. """
+    permission_checker = PermissionChecker(required_permissions=["users:admin"])
+    if not permission_checker.check_permissions(current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissions")
+    # sampling blocks for a while - this is a sync route, so it runs in the threadpool
+    samples = max(0, min(samples, MAX_STACK_SAMPLES))
+    state_client = get_state_client()
+    if state_client:  # the components run in the core process
+        return state_client.call("diagnostics", samples)
+    return collect_diagnostics(base_app.comp_ctrl.components if base_app.comp_ctrl else None,
+                               samples)
@@ -6,16 +6,23 @@ from pint.facets.plain import PlainQuantity as Quantity
 import waqd.app as base_app
 import waqd.app as app
 from waqd.web.helper import format_unit_disp_value
+from waqd.web.state_service import get_state_client
 
 from .model import SensorApi_v1, TempHumSensorApi_v1
 
 
 class SensorRetrieval:
     def __init__(self) -> None:
+        self._state_client = get_state_client()
+        if self._state_client:  # web worker - values are rendered by the core process
+            return
         assert base_app.comp_ctrl
         self._comps = base_app.comp_ctrl.components
 
     def get_exterior_sensor_values(self, units=False):
+        if self._state_client:
+            exterior = self._state_client.get_snapshot().get("exterior", {})
+            return exterior.get(units, TempHumSensorApi_v1())
         temp = self._comps.remote_exterior_sensor.get_temperature()
         hum = self._comps.remote_exterior_sensor.get_humidity()
 
@@ -38,6 +45,9 @@ class SensorRetrieval:
         return html.escape(disp_value)
 
     def get_interior_sensor_values(self, units=False):
+        if self._state_client:
+            interior = self._state_client.get_snapshot().get("interior", {})
+            return interior.get(units, SensorApi_v1())
         temp = self._comps.temp_sensor.get_temperature()
         hum = self._comps.humidity_sensor.get_humidity()
         pres = self._comps.pressure_sensor.get_pressure()
@@ -8,13 +8,13 @@ rt = APIRouter()
 
 
 @rt.get("/interior", response_class=JSONResponse)
-async def get_interior(request: Request, units: bool = False) -> SensorApi_v1:
+def get_interior(request: Request, units: bool = False) -> SensorApi_v1:
     values = SensorRetrieval().get_interior_sensor_values(units=units)
     return values
 
 
 @rt.get("/exterior", response_class=JSONResponse)
-async def get_exterior(request: Request, units: bool = False) -> SensorApi_v1:
+def get_exterior(request: Request, units: bool = False) -> SensorApi_v1:
     values = SensorRetrieval().get_exterior_sensor_values(units=units)
     return values
 
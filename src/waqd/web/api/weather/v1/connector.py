@@ -1,13 +1,43 @@
+from typing import List, Optional
+
 import waqd.app as base_app
+from waqd.components.weather.base_types import HOME_LOCATION
+from waqd.components.weather.nowcast import Nowcast
+from waqd.web.state_service import get_state_client
 
 
 class WeatherRetrieval:
     def __init__(self) -> None:
+        self._state_client = get_state_client()
+        if self._state_client:  # web worker - values are fetched by the core process
+            return
         assert base_app.comp_ctrl
         self._comps = base_app.comp_ctrl.components
 
-    def get_current_weather(self):
-        return self._comps.weather_info.get_current_weather()
+    def get_location_names(self) -> List[str]:
+        if self._state_client:
+            locations = self._state_client.get_snapshot().get("locations", {})
+            return [HOME_LOCATION] + list(locations)
+        return self._comps.weather_info.location_names
+
+    def get_current_weather(self, location=HOME_LOCATION):
+        if self._state_client:
+            snapshot = self._state_client.get_snapshot()
+            if location == HOME_LOCATION:
+                return snapshot.get("current_weather")
+            return snapshot.get("locations", {}).get(location, {}).get("current_weather")
+        return self._comps.weather_info.get_current_weather(location)
+
+    def get_5_day_forecast(self, location=HOME_LOCATION):
+        if self._state_client:
+            snapshot = self._state_client.get_snapshot()
+            if location == HOME_LOCATION:
+                return snapshot.get("forecast")
+            return snapshot.get("locations", {}).get(location, {}).get("forecast")
+        return self._comps.weather_info.get_5_day_forecast(location)
 
-    def get_5_day_forecast(self):
-        return self._comps.weather_info.get_5_day_forecast()
+    def get_nowcast(self) -> Optional[Nowcast]:
+        """ Short-term forecast of the home location from the local pressure sensor """
+        if self._state_client:
+            return self._state_client.get_snapshot().get("nowcast")
+        return self._comps.nowcast.get_nowcast()
@@ -3,6 +3,7 @@ from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
 
 from waqd.components.weather.base_types import DailyWeather, Weather
+from waqd.components.weather.nowcast import Nowcast
 
 from .connector import WeatherRetrieval
 
@@ -10,7 +11,7 @@ rt = APIRouter()
 
 
 @rt.get("/current", response_class=JSONResponse)
-async def weather_current(request: Request) -> Weather:
+def weather_current(request: Request) -> Weather:
     values = WeatherRetrieval().get_current_weather()
     if not values:
         raise HTTPException(status_code=404, detail='{"message": "No data available"}')
@@ -18,8 +19,38 @@ async def weather_current(request: Request) -> Weather:
 
 
 @rt.get("/5day-forecast", response_class=JSONResponse)
-async def weather_forecast(request: Request) -> list[DailyWeather]:
+def weather_forecast(request: Request) -> list[DailyWeather]:
     values = WeatherRetrieval().get_5_day_forecast()
     if not values:
         raise HTTPException(status_code=404, detail='{"message": "No data available"}')
     return values
+
+
+@rt.get("/nowcast", response_class=JSONResponse)
+def weather_nowcast(request: Request) -> Nowcast:
+    values = WeatherRetrieval().get_nowcast()
+    if not values:
+        raise HTTPException(status_code=404, detail='{"message": "No data available"}')
+    return values
+
+
+@rt.get("/{location}/current", response_class=JSONResponse)
+def location_weather_current(request: Request, location: str) -> Weather:
+    weather = WeatherRetrieval()
+    if location not in weather.get_location_names():
+        raise HTTPException(status_code=404, detail='{"message": "Unknown location"}')
+    values = weather.get_current_weather(location)
+    if not values:
+        raise HTTPException(status_code=404, detail='{"message": "No data available"}')
+    return values
+
+
+@rt.get("/{location}/5day-forecast", response_class=JSONResponse)
+def location_weather_forecast(request: Request, location: str) -> list[DailyWeather]:
+    weather = WeatherRetrieval()
+    if location not in weather.get_location_names():
+        raise HTTPException(status_code=404, detail='{"message": "Unknown location"}')
+    values = weather.get_5_day_forecast(location)
+    if not values:
+        raise HTTPException(status_code=404, detail='{"message": "No data available"}')
+    return values
@@ -12,6 +12,7 @@ import waqd
 import waqd.app as base_app
 
 from . import LOCAL_SERVER_PORT
+from .api.diagnostics.v1.routes import rt as diagnostics_v1_router
 from .api.sensor.v1.routes import rt as sensor_v1_router
 from .api.weather.v1.routes import rt as weather_v1_router
 from .authentication import (get_current_user_with_exception,
@@ -95,6 +96,11 @@ web_app.include_router(
     prefix="/api/sensor/v1",
     dependencies=[Depends(get_current_user_with_exception)],
 )
+web_app.include_router(
+    diagnostics_v1_router,
+    prefix="/api/diagnostics/v1",
+    dependencies=[Depends(get_current_user_with_exception)],
+)
 
 
 @web_app.get("/", response_class=HTMLResponse)
@@ -103,4 +109,9 @@ async def root():
 
 
 if base_app.comp_ctrl is None:
-    base_app.basic_setup()
+    from .state_service import get_state_client
+
+    if get_state_client():  # started as one of multiple web workers
+        base_app.worker_setup()
+    else:
+        base_app.basic_setup()
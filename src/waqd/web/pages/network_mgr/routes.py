@@ -68,9 +68,16 @@ async def ethernet_status(
 
 
 @rt.get("/wifi_list", response_class=HTMLResponse)
-async def wifi_list(current_user: Annotated[User, Depends(get_current_user_with_exception)]):
+def wifi_list(
+    current_user: Annotated[User, Depends(get_current_user_with_exception)],
+    rescan: bool = False,
+):
+    # a rescan blocks for seconds - this is a sync route, so it runs in the threadpool
     content = sub_template(
-        "wifi_list.html", {"wifi_networks": Network().list_wifi()}, current_path, True
+        "wifi_list.html",
+        {"wifi_networks": Network().list_wifi(rescan=rescan)},
+        current_path,
+        True,
     )
     return HTMLResponse(content)
 
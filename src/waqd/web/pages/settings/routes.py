@@ -1,15 +1,15 @@
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Any, Dict
 
-from fastapi import APIRouter, Depends, Form
+from fastapi import APIRouter, Depends, Form, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 
 import waqd.app as app
 from ....base.file_logger import Logger
 from waqd.components.weather.base_types import Location
-from waqd.components.weather.open_meteo import OpenMeteo
+from waqd.components.weather.geocoding import GeocodingService
 from waqd.settings import (
-    BRIGHTNESS,
     LOCATION_ALTITUDE_M,
     LOCATION_COUNTRY_CODE,
     LOCATION_LATITUDE,
@@ -18,6 +18,7 @@ from waqd.settings import (
     LOCATION_STATE,
 )
 from waqd.web.authentication import PermissionChecker, User, get_current_user_with_redirect
+from waqd.web.state_service import get_state_client
 from waqd.web.templates import render_main, sub_template
 
 rt = APIRouter()
@@ -25,10 +26,27 @@ rt = APIRouter()
 current_path = Path(__file__).parent.resolve()
 
 
+def _get_all_settings() -> Dict[str, Any]:
+    state_client = get_state_client()
+    if state_client:  # web worker - the core process owns the settings
+        return dict(state_client.get_snapshot().get("settings", {}))
+    return app.settings.get_all()
+
+
+def _store_settings(values: Dict[str, Any]):
+    """Store the settings and reload the affected components."""
+    state_client = get_state_client()
+    if state_client:
+        state_client.set_settings(values)
+        return
+    for name, value in values.items():
+        app.settings.set(name, value)
+    app.comp_ctrl.apply_setting_changes()
+
+
 @rt.get("/", response_class=HTMLResponse)
-async def settings(current_user: Annotated[User, Depends(get_current_user_with_redirect)]):
-    app.comp_ctrl.unload_all()
-    context = app.settings.get_all()
+def settings(current_user: Annotated[User, Depends(get_current_user_with_redirect)]):
+    context = _get_all_settings()
     context["local"] = PermissionChecker(
         required_permissions=[
             "users:local",
@@ -43,9 +61,12 @@ async def settings(current_user: Annotated[User, Depends(get_current_user_with_r
 
 
 @rt.get("/location_search_result", response_class=HTMLResponse)
-async def location_search_result(query: str):
+async def location_search_result(request: Request, query: str):
     # request to the Open-Meteo Geocoding API
-    location_data = OpenMeteo().find_location_candidates(query, lang="en")
+    client = request.client.host if request.client else ""
+    location_data = await run_in_threadpool(GeocodingService().search, query, "en", client)
+    if location_data is None:  # superseded by a newer query - keep the list as it is
+        return HTMLResponse(status_code=204)
     if not location_data:
         return HTMLResponse("No location found")
     return sub_template(
@@ -56,9 +77,15 @@ async def location_search_result(query: str):
     )
 
 @rt.get("/new_release_available", response_class=HTMLResponse)
-async def new_release_available():
+def new_release_available():
     try:
-        latest_version, update_available = app.comp_ctrl.components.auto_updater.check_newer_version()
+        state_client = get_state_client()
+        if state_client:
+            latest_version, update_available = state_client.call("check_newer_version")
+        else:
+            latest_version, update_available = (
+                app.comp_ctrl.components.auto_updater.check_newer_version()
+            )
     except Exception as e:
         Logger().debug("Failed to check for updates: %s", e)
         return HTMLResponse("Failed to check update information. Try again later!")
@@ -78,37 +105,43 @@ async def new_release_available():
     )
 
 @rt.post("/trigger_update", response_class=HTMLResponse)
-async def trigger_update():
+def trigger_update():
     try:
-        app.comp_ctrl.components.auto_updater.install_update(
-            app.comp_ctrl.components.auto_updater.latest_release.tag_name
-        )
+        state_client = get_state_client()
+        if state_client:
+            state_client.call("install_update")
+        else:
+            app.comp_ctrl.components.auto_updater.install_update(
+                app.comp_ctrl.components.auto_updater.latest_release.tag_name
+            )
         return HTMLResponse("Update started. Please wait for the device to restart.")
     except Exception as e:
         return HTMLResponse(f"Error: {e}", status_code=500)
 
 @rt.post("/set", response_class=HTMLResponse)
-async def set_setting(name: str = Form(), value=Form()):
+def set_setting(name: str = Form(), value=Form()):
     try:
-        app.settings.set(name, value)
-        if name == BRIGHTNESS: # instant set settings
-            app.comp_ctrl.components.display.set_brightness(int(value))
+        _store_settings({name: value})
         return HTMLResponse("Set ☑")
     except Exception as e:
         return HTMLResponse(f"Error: {e}", status_code=500)
 
 
 @rt.post("/set/location", response_class=HTMLResponse)
-async def set_location(
+def set_location(
     location: Location
 ):
     try:
-        app.settings.set(LOCATION_NAME, location.name)
-        app.settings.set(LOCATION_LATITUDE, location.latitude)
-        app.settings.set(LOCATION_LONGITUDE, location.longitude)
-        app.settings.set(LOCATION_COUNTRY_CODE, location.country_code)
-        app.settings.set(LOCATION_ALTITUDE_M, location.altitude)
-        app.settings.set(LOCATION_STATE, location.state)
+        _store_settings(
+            {
+                LOCATION_NAME: location.name,
+                LOCATION_LATITUDE: location.latitude,
+                LOCATION_LONGITUDE: location.longitude,
+                LOCATION_COUNTRY_CODE: location.country_code,
+                LOCATION_ALTITUDE_M: location.altitude,
+                LOCATION_STATE: location.state,
+            }
+        )
 
         return HTMLResponse("Set ☑")
     except Exception as e:
@@ -36,6 +36,10 @@ class ExteriorView(BaseModel):
     )
     weather_day_min_max: str = Field(description="Day min/max temperature", default="N/A")
     weather_night_min_max: str = Field(description="Night min/max temperature", default="N/A")
+    weather_age: str = Field(description="Shown, when the weather data is outdated", default="")
+    weather_trend: str = Field(
+        description="Short-term forecast from the local pressure tendency", default=""
+    )
     background: str = Field(
         description="Background image", default="/static/gui_bgrs/background_s7.jpg"
     )
@@ -7,7 +7,6 @@ from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from frozendict import frozendict
 
 import waqd.app as base_app
-from waqd.assets.assets import get_asset_file_relative
 from waqd.web.helper import get_localized_date
 from waqd.web.api.sensor.v1.connector import SensorRetrieval
 from waqd.web.api.weather.v1.connector import WeatherRetrieval
@@ -21,12 +20,15 @@ from waqd.web.templates import render_main, sub_template
 
 rt = APIRouter()
 
+WEATHER_OUTDATED_AGE = datetime.timedelta(minutes=30)
+
 current_path = Path(__file__).parent.resolve()
 
 
 @rt.get("/", response_class=HTMLResponse)
 async def root(current_user: Annotated[User, Depends(get_current_user_with_redirect)]):
-    base_app.comp_ctrl.init_all()
+    if base_app.comp_ctrl:  # not in a web worker
+        base_app.comp_ctrl.init_all()
 
     interior = sub_template("interior.html", {}, current_path, True)
     exterior = sub_template("exterior.html", {}, current_path, True)
@@ -74,27 +76,38 @@ async def interior(current_user: Annotated[User, Depends(get_current_user_with_e
 
 
 @rt.get("/exterior", response_class=JSONResponse)
-async def exterior(
+def exterior(
     current_user: Annotated[User, Depends(get_current_user_with_exception)],
 ) -> ExteriorView:
     ext_values = SensorRetrieval().get_exterior_sensor_values(units=True)
     current_weather = WeatherRetrieval().get_current_weather()
     forecast = WeatherRetrieval().get_5_day_forecast()
+    nowcast = WeatherRetrieval().get_nowcast()
     if not current_weather:
         return ExteriorView()
-    weather_bgr = get_asset_file_relative(current_weather.get_background_image())
+    weather_bgr = current_weather.get_background_url()
+    weather_age = ""
+    # the last good data is served, while the provider is not reachable
+    if datetime.datetime.now() - current_weather.fetch_time > WEATHER_OUTDATED_AGE:
+        weather_age = (
+            "as of "
+            + get_localized_date(current_weather.fetch_time, base_app.settings)
+            + current_weather.fetch_time.strftime(" %H:%M")
+        )
     return ExteriorView(
         background=weather_bgr,
         temp=ext_values.temp,
         hum=ext_values.hum,
-        weather_icon=get_asset_file_relative(current_weather.get_icon()),
+        weather_icon=current_weather.get_icon_url(),
         weather_day_min_max=f"{forecast[0].temp_min}°/{forecast[0].temp_max}°",
         weather_night_min_max=f"{forecast[0].temp_night_min}°/{forecast[0].temp_night_max}°",
+        weather_age=weather_age,
+        weather_trend=f"{nowcast.description} ({nowcast.tendency})" if nowcast else "",
     )
 
 
 @rt.get("/forecast", response_class=JSONResponse)
-async def forecast(
+def forecast(
     current_user: Annotated[User, Depends(get_current_user_with_exception)],
 ) -> ForecastView:
     forecast = WeatherRetrieval().get_5_day_forecast()
@@ -104,19 +117,19 @@ async def forecast(
         day_1_label=get_localized_date(
             current_date_time + datetime.timedelta(days=1), base_app.settings
         ),
-        day_1_weather_icon=get_asset_file_relative(forecast[0].get_icon()),
+        day_1_weather_icon=forecast[0].get_icon_url(),
         day_1_weather_day_min_max=f"{forecast[0].temp_min}°/{forecast[0].temp_max}°",
         day_1_weather_night_min_max=f"{forecast[0].temp_night_min}°/{forecast[0].temp_night_max}°",
         day_2_label=get_localized_date(
             current_date_time + datetime.timedelta(days=2), base_app.settings
         ),
-        day_2_weather_icon=get_asset_file_relative(forecast[1].get_icon()),
+        day_2_weather_icon=forecast[1].get_icon_url(),
         day_2_weather_day_min_max=f"{forecast[1].temp_min}°/{forecast[1].temp_max}°",
         day_2_weather_night_min_max=f"{forecast[1].temp_night_min}°/{forecast[1].temp_night_max}°",
         day_3_label=get_localized_date(
             current_date_time + datetime.timedelta(days=3), base_app.settings
         ),
-        day_3_weather_icon=get_asset_file_relative(forecast[2].get_icon()),
+        day_3_weather_icon=forecast[2].get_icon_url(),
         day_3_weather_day_min_max=f"{forecast[2].temp_min}°/{forecast[2].temp_max}°",
         day_3_weather_night_min_max=f"{forecast[2].temp_night_min}°/{forecast[2].temp_night_max}°",
     )
@@ -0,0 +1,246 @@
+"""
+Shares the state of the component core with stateless web worker processes.
+The core process renders a snapshot of all values shown by the web UI at a fixed interval
+and serves it over a local Unix socket. Changes, like settings, are forwarded to the core.
+"""
+
+import os
+import pickle
+import socket
+import socketserver
+import struct
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+
+import waqd.app as base_app
+from waqd.base.file_logger import Logger
+
+STATE_SOCKET_ENV = "WAQD_STATE_SOCKET"
+CONFIG_DIR_ENV = "WAQD_CONFIG_DIR"
+
+_HEADER = struct.Struct(">I")  # length of the following pickled message
+_PEER_CREDENTIALS = struct.Struct("3i")  # pid, uid, gid
+
+
+def _send_message(sock: socket.socket, payload: bytes):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _receive_message(sock: socket.socket) -> bytes:
+    header = _receive_exactly(sock, _HEADER.size)
+    return _receive_exactly(sock, _HEADER.unpack(header)[0])
+
+
+def _receive_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("State service closed the connection")
+        data += chunk
+    return bytes(data)
+
+
+def _is_own_user(sock: socket.socket) -> bool:
+    """ Only processes of the own user may send pickled messages. """
+    if not hasattr(socket, "SO_PEERCRED"):  # Linux only - the socket permissions must do
+        return True
+    credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, _PEER_CREDENTIALS.size)
+    _, uid, _ = _PEER_CREDENTIALS.unpack(credentials)
+    return uid == os.getuid()
+
+
+class StateService:
+    """
+    Runs in the core process. Publishes the snapshot and executes commands of the workers.
+    The socket is only accessible by the own user from its creation on and connections of
+    other users are rejected, so the pickled messages can be trusted.
+    """
+
+    PUBLISH_TIME = 2  # in seconds
+
+    def __init__(self, socket_path: Path):
+        self._socket_path = socket_path
+        self._snapshot_response = pickle.dumps(("ok", None))
+        self._stop_event = threading.Event()
+        self._commands: Dict[str, Callable] = {
+            "set_settings": self._set_settings,
+            "check_newer_version": self._check_newer_version,
+            "install_update": self._install_update,
+            "diagnostics": self._diagnostics,
+        }
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    @property
+    def socket_path(self) -> Path:
+        return self._socket_path
+
+    def start(self):
+        self._socket_path.unlink(missing_ok=True)
+        service = self
+
+        class RequestHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                service._handle(self.request)
+
+        # bound with 0600, so that nobody else can connect before the permissions are set
+        old_umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(
+                str(self._socket_path), RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon_threads = True
+        self._publish()  # workers must find a snapshot right from the start
+        threading.Thread(name="StatePublisher", target=self._publish_loop, daemon=True).start()
+        threading.Thread(name="StateService", target=self._server.serve_forever,
+                         daemon=True).start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        self._socket_path.unlink(missing_ok=True)
+
+    def _publish_loop(self):
+        while not self._stop_event.wait(self.PUBLISH_TIME):
+            self._publish()
+
+    def _publish(self):
+        try:
+            snapshot = self._build_snapshot()
+            self._snapshot_response = pickle.dumps(("ok", snapshot))
+        except Exception as error:
+            Logger().debug("StateService: Cannot build snapshot: %s", str(error))
+
+    def _build_snapshot(self) -> Dict[str, Any]:
+        """ Render everything a worker needs once, instead of in every worker and request. """
+        from waqd.components.weather.base_types import HOME_LOCATION
+        from waqd.web.api.sensor.v1.connector import SensorRetrieval
+        from waqd.web.api.weather.v1.connector import WeatherRetrieval
+
+        sensors = SensorRetrieval()
+        weather = WeatherRetrieval()
+        return {
+            "time": time.time(),
+            "interior": {units: sensors.get_interior_sensor_values(units=units)
+                         for units in (False, True)},
+            "exterior": {units: sensors.get_exterior_sensor_values(units=units)
+                         for units in (False, True)},
+            "current_weather": weather.get_current_weather(),
+            "forecast": weather.get_5_day_forecast(),
+            "locations": {location: {"current_weather": weather.get_current_weather(location),
+                                     "forecast": weather.get_5_day_forecast(location)}
+                          for location in weather.get_location_names()
+                          if location != HOME_LOCATION},
+            "nowcast": weather.get_nowcast(),
+            "settings": base_app.settings.get_all(),
+        }
+
+    def _handle(self, sock: socket.socket):
+        if not _is_own_user(sock):
+            Logger().warning("StateService: Rejected a connection of another user")
+            return
+        try:
+            command, args = pickle.loads(_receive_message(sock))
+            if command == "snapshot":  # pre-rendered
+                _send_message(sock, self._snapshot_response)
+                return
+            function = self._commands.get(command)
+            if not function:
+                raise ValueError(f"Unknown command {command}")
+            response = ("ok", function(*args))
+        except Exception as error:
+            response = ("error", str(error))
+        try:
+            _send_message(sock, pickle.dumps(response))
+        except OSError:
+            pass  # worker is gone
+
+    def _set_settings(self, values: Dict[str, Any]):
+        for name, value in values.items():
+            base_app.settings.set(name, value)
+        base_app.comp_ctrl.apply_setting_changes()
+        self._publish()  # make the change visible to all workers at once
+
+    def _check_newer_version(self):
+        release, update_available = (
+            base_app.comp_ctrl.components.auto_updater.check_newer_version())
+        if release:  # the GitHub object holds a connection - pass only what is displayed
+            release = SimpleNamespace(title=release.title, body=release.body)
+        return release, update_available
+
+    def _install_update(self):
+        auto_updater = base_app.comp_ctrl.components.auto_updater
+        auto_updater.install_update(auto_updater.latest_release.tag_name)
+
+    def _diagnostics(self, samples: int):
+        from waqd.base.diagnostics import collect_diagnostics
+        return collect_diagnostics(base_app.comp_ctrl.components, samples)
+
+
+class StateClient:
+    """
+    Used by a web worker to access the state of the core process.
+    The snapshot is cached shortly, so that a burst of requests needs only one round trip.
+    Calls block on the socket, so routes using it are sync and run in the threadpool.
+    """
+
+    SNAPSHOT_TTL_S = 1
+    TIMEOUT_S = 5
+
+    def __init__(self, socket_path: Path):
+        self._socket_path = socket_path
+        self._snapshot: Dict[str, Any] = {}
+        self._snapshot_time = 0.0
+        self._lock = threading.Lock()
+
+    def call(self, command: str, *args):
+        """ Executes a command in the core process and returns its result. """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.TIMEOUT_S)
+            sock.connect(str(self._socket_path))
+            _send_message(sock, pickle.dumps((command, args)))
+            status, result = pickle.loads(_receive_message(sock))
+        if status != "ok":
+            raise RuntimeError(f"State service: {result}")
+        return result
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            if time.monotonic() - self._snapshot_time > self.SNAPSHOT_TTL_S:
+                snapshot = self.call("snapshot")
+                if snapshot:
+                    self._snapshot = snapshot
+                    self._sync_settings(snapshot.get("settings", {}))
+                self._snapshot_time = time.monotonic()
+            return self._snapshot
+
+    def set_settings(self, values: Dict[str, Any]):
+        self.call("set_settings", values)
+        with self._lock:
+            self._snapshot_time = 0.0  # fetch the new state with the next access
+
+    @staticmethod
+    def _sync_settings(values: Dict[str, Any]):
+        """ Keep the read-only settings of this worker up to date with the core. """
+        if not base_app.settings:
+            return
+        for name, value in values.items():
+            base_app.settings.set(name, value)
+
+
+_state_client: Optional[StateClient] = None
+
+
+def get_state_client() -> Optional[StateClient]:
+    """ Returns a client, if this process is a web worker, otherwise None. """
+    global _state_client
+    # the core process holds the components itself
+    if _state_client is None and base_app.comp_ctrl is None and os.getenv(STATE_SOCKET_ENV):
+        _state_client = StateClient(Path(os.environ[STATE_SOCKET_ENV]))
+    return _state_client
@@ -1,4 +1,11 @@
-from waqd.assets.assets import get_asset_file, Logger
+import json
+import os
+import shutil
+from datetime import datetime, time
+
+import waqd
+from waqd.assets.assets import AssetCatalog, get_asset_file, Logger
+from waqd.components.weather.base_types import Weather
 
 
 def test_get_with_file_type(base_fixture):
@@ -44,6 +51,38 @@ def test_no_rsc_file(base_fixture, capsys):
     assert "ERROR" in captured.out
     assert "Cannot find resource file" in captured.out
 
+def test_asset_catalog(base_fixture, tmp_path, mocker):
+    rsc_folder = tmp_path / "with_filetype"
+    shutil.copytree(base_fixture.testdata_path / "assets" / "with_filetype", rsc_folder)
+    catalog = AssetCatalog()
+    assert catalog.get_file(rsc_folder, "dummy1") == rsc_folder / "dummy1_value.png"
+    # served from memory
+    open_spy = mocker.patch("builtins.open", side_effect=AssertionError("read again"))
+    for _ in range(10):
+        assert get_asset_file(rsc_folder, "dummy2") == rsc_folder / "dummy2_value.png"
+    mocker.stopall()
+
+    # a changed catalog is reloaded after the check interval
+    toc_path = rsc_folder / "filetoc.json"
+    toc_path.write_text(json.dumps({"filetype": "png", "filelist": {"dummy1": "dummy2_value"}}))
+    os.utime(toc_path, (1, 1))
+    assert catalog.get_file(rsc_folder, "dummy1") == rsc_folder / "dummy1_value.png"
+    mocker.patch.object(AssetCatalog, "MTIME_CHECK_S", 0)
+    assert catalog.get_file(rsc_folder, "dummy1") == rsc_folder / "dummy2_value.png"
+    assert open_spy.call_count == 0
+
+
+def test_weather_asset_urls(base_fixture):
+    day = Weather("Clouds", 803, datetime(2023, 1, 2, 12), "wi-day-cloudy", 0, 0, time(8),
+                  time(16), 0, 0, 0, 90, 0, 0, 0)
+    assert day.get_icon_url() == "weather_icons/wi-day-cloudy.svg"
+    assert day.get_background_url() == "weather_bgrs/heavy_clouds_bg.jpg"
+    assert day.get_background_url() == AssetCatalog().get_url(
+        "weather_bgrs", "bg_day_heavy_clouds")
+    day.date_time = datetime(2023, 1, 2, 22)
+    assert day.get_background_url() == "weather_bgrs/cloudy_night_bg.jpg"
+    assert day.get_icon() == waqd.assets_path / "weather_icons/wi-day-cloudy.svg"
+
 # TODO, test if every asset file exists
 
 
@@ -0,0 +1,36 @@
+import os
+import threading
+
+from waqd.base.file_watcher import FileWatcher
+
+
+def check_file_watcher(file_path):
+    changed = threading.Event()
+    watcher = FileWatcher(file_path, changed.set)
+    try:
+        (file_path.parent / "other.txt").write_text("other")  # other files are ignored
+        assert not changed.wait(0.5)
+        # replaced by a rename, like atomic writes do
+        temp_file_path = file_path.with_name(file_path.name + ".tmp")
+        temp_file_path.write_text("changed")
+        os.replace(temp_file_path, file_path)
+        assert changed.wait(5)
+        changed.clear()
+        file_path.write_text("changed again")
+        assert changed.wait(5)
+    finally:
+        watcher.stop()
+
+
+def test_file_watcher(base_fixture, tmp_path):
+    file_path = tmp_path / "watched.json"
+    file_path.write_text("initial")
+    check_file_watcher(file_path)
+
+
+def test_file_watcher_polling(base_fixture, tmp_path, monkeypatch):
+    monkeypatch.setattr("waqd.base.file_watcher.platform.system", lambda: "Windows")
+    monkeypatch.setattr(FileWatcher, "POLL_INTERVAL_S", 0.1)
+    file_path = tmp_path / "watched.json"
+    file_path.write_text("initial")
+    check_file_watcher(file_path)
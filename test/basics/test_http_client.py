@@ -0,0 +1,107 @@
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from waqd.base.http_client import CircuitBreaker, CircuitOpenError, HttpClient, HttpError
+
+ETAG = '"v1"'
+BODY = b'{"temperature": 21.5}'
+
+
+class LocalHostHandler(BaseHTTPRequestHandler):
+    """ Stands in for the weather APIs. """
+    protocol_version = "HTTP/1.1"  # keep-alive
+    requests = []  # (path, client port, request headers)
+    flaky_failures = 0
+
+    def do_GET(self):
+        LocalHostHandler.requests.append((self.path, self.client_address[1], self.headers))
+        if self.path == "/etag":
+            if self.headers.get("If-None-Match") == ETAG:
+                self._send(304, b"")
+                return
+            body = BODY
+            headers = {"ETag": ETAG, "Content-Type": "application/json"}
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(BODY)
+                headers["Content-Encoding"] = "gzip"
+            self._send(200, body, headers)
+        elif self.path == "/flaky":
+            if LocalHostHandler.flaky_failures > 0:
+                LocalHostHandler.flaky_failures -= 1
+                self._send(503, b"busy")
+                return
+            self._send(200, BODY)
+        elif self.path == "/down":
+            self._send(503, b"down")
+        else:
+            self._send(404, b"not found")
+
+    def _send(self, status: int, body: bytes, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def local_host():
+    LocalHostHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LocalHostHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_client(base_fixture, local_host, mocker):
+    mocker.patch.object(HttpClient, "RETRY_DELAY_MIN_S", 0.01)
+    mocker.patch.object(HttpClient, "RETRY_DELAY_MAX_S", 0.01)
+    client = HttpClient()
+    assert client is HttpClient()
+
+    # compressed transfer, revalidated with the ETag
+    response = client.get(local_host + "/etag")
+    assert response.json() == {"temperature": 21.5}
+    assert not response.from_cache
+    response = client.get(local_host + "/etag")
+    assert response.from_cache
+    assert response.json() == {"temperature": 21.5}
+    first_headers = LocalHostHandler.requests[0][2]
+    assert "gzip" in first_headers["Accept-Encoding"]
+    assert LocalHostHandler.requests[1][2]["If-None-Match"] == ETAG
+    # both requests on one kept alive connection
+    assert LocalHostHandler.requests[0][1] == LocalHostHandler.requests[1][1]
+
+    # temporary errors are retried
+    LocalHostHandler.flaky_failures = 2
+    assert client.get_json(local_host + "/flaky") == {"temperature": 21.5}
+    with pytest.raises(HttpError) as error:
+        client.get(local_host + "/missing")
+    assert error.value.status_code == 404
+
+    # a failing host is not contacted, until the open time is over
+    mocker.patch.object(CircuitBreaker, "FAILURE_THRESHOLD", 2)
+    for _ in range(2):
+        with pytest.raises(HttpError):
+            client.get(local_host + "/down")
+    request_count = len(LocalHostHandler.requests)
+    with pytest.raises(CircuitOpenError):
+        client.get(local_host + "/etag")
+    assert len(LocalHostHandler.requests) == request_count
+    mocker.patch.object(CircuitBreaker, "OPEN_TIME_S", 0)
+    assert client.get(local_host + "/etag")  # trial request closes the breaker
+    assert not client.get_breaker(local_host).is_open
+
+
+def test_http_client_download(base_fixture, local_host, tmp_path):
+    target = HttpClient().download(local_host + "/flaky", tmp_path / "download" / "file.json")
+    assert target.read_bytes() == BODY
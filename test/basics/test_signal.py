@@ -0,0 +1,40 @@
+from waqd.base.signal import Signal
+
+
+def test_signal_subscriptions(base_fixture):
+    signal = Signal("Test")
+    calls = []
+
+    def on_emit(value):
+        calls.append(("permanent", value))
+
+    def on_emit_once(value):
+        calls.append(("once", value))
+
+    signal.subscribe(on_emit)
+    signal.subscribe(on_emit)  # only subscribed once
+    signal.subscribe_once(on_emit_once)
+    signal.emit(1)
+    signal.emit(2)
+    assert calls == [("permanent", 1), ("once", 1), ("permanent", 2)]
+
+    # a one-shot subscriber can be withdrawn only before the emit
+    signal.subscribe_once(on_emit_once)
+    assert signal.unsubscribe(on_emit_once)
+    assert not signal.unsubscribe(on_emit_once)
+    assert signal.unsubscribe(on_emit)
+    signal.emit(3)
+    assert len(calls) == 3
+
+
+def test_signal_failing_subscriber(base_fixture):
+    signal = Signal("Test")
+    calls = []
+
+    def on_emit():
+        raise ValueError("failed")
+
+    signal.subscribe(on_emit)
+    signal.subscribe(lambda: calls.append(True))
+    signal.emit()  # does not raise and calls the others
+    assert calls == [True]
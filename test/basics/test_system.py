@@ -1,5 +1,8 @@
 import os
 import platform
+import time
+from pathlib import Path
+from tempfile import gettempdir
 
 from test.conftest import mock_run_on_target, mock_run_on_non_target
 
@@ -58,25 +61,146 @@ def test_get_ip_on_target(base_fixture, mocker):
 
     ip4_ref = "192.168.1.274"
     ip6_ref = "2001:db8:85a3:8d3:1319:8a2e:370:7348"
-    mock_call = mocker.Mock()
+    mock_call = mocker.patch("waqd.base.network.AddressResolver.get_addresses")
 
     # check only ip4
-    mock_call.return_value = ip4_ref.encode("utf-8")
-    mocker.patch('subprocess.check_output', mock_call)
+    mock_call.return_value = {"eth0": ([ip4_ref], [])}
     [ip4, ip6] = Network().get_ip()
     assert ip4 == ip4_ref
     assert ip6 == ""
 
     # check only ip6
-    mock_call.return_value = ip6_ref.encode("utf-8")
-    mocker.patch('subprocess.check_output', mock_call)
+    mock_call.return_value = {"eth0": ([], [ip6_ref])}
     [ip4, ip6] = Network().get_ip()
     assert ip4 == ""
     assert ip6 == ip6_ref
 
     # check both ip4 and ip6
-    mock_call.return_value = (ip4_ref + " " + ip6_ref).encode("utf-8")
-    mocker.patch('subprocess.check_output', mock_call)
+    mock_call.return_value = {"eth0": ([ip4_ref], [ip6_ref])}
     [ip4, ip6] = Network().get_ip()
     assert ip4 == ip4_ref
     assert ip6 == ip6_ref
+
+    # per interface
+    mock_call.return_value = {"eth0": ([ip4_ref], []), "wlan0": (["10.0.0.2"], [])}
+    assert Network().get_ip("wlan0") == ("10.0.0.2", "")
+
+
+def test_address_resolver(base_fixture, mocker):
+    from waqd.base.network import AddressResolver
+
+    if_inet6 = Path(gettempdir()) / "waqd_test_if_inet6"
+    if_inet6.write_text(
+        "20010db885a308d313198a2e03707348 02 40 00 80    eth0\n"
+        "fe80000000000000020000fffe000001 02 40 20 80    eth0\n"
+        "00000000000000000000000000000001 01 80 10 80       lo\n"
+    )
+    mocker.patch.object(AddressResolver, "IF_INET6_PATH", if_inet6)
+    mocker.patch("socket.if_nameindex", return_value=[(1, "lo"), (2, "eth0"), (3, "wlan0")])
+    mocker.patch.object(AddressResolver, "_read_ipv4_address",
+                        lambda self, name: "10.0.0.2" if name == "wlan0" else "")
+    resolver = AddressResolver()
+    addresses = resolver.get_addresses()
+    # link-local and loopback are left out
+    assert addresses == {"eth0": ([], ["2001:db8:85a3:8d3:1319:8a2e:370:7348"]),
+                         "wlan0": (["10.0.0.2"], [])}
+    assert resolver.get_addresses() is addresses  # cached
+    resolver.invalidate()
+    assert resolver.get_addresses() is not addresses
+    resolver.stop()
+    if_inet6.unlink()
+
+
+def test_connectivity_monitor(base_fixture, mocker):
+    from waqd.base.network import ConnectivityMonitor
+
+    connection = mocker.MagicMock()
+    create_connection = mocker.patch("socket.create_connection", return_value=connection)
+    # before the creation, which sets up the backoff
+    mocker.patch.object(ConnectivityMonitor, "ONLINE_INTERVAL_S", 10)
+    mocker.patch.object(ConnectivityMonitor, "OFFLINE_INTERVAL_MIN_S", 0.1)
+    monitor = ConnectivityMonitor()
+    transitions = []
+    monitor.subscribe(transitions.append)
+
+    assert monitor.is_online
+    assert monitor.is_online  # cached - no new probe
+    assert create_connection.call_count == 1
+    connection.__exit__.assert_called_once()  # socket is closed again
+    time.sleep(0.1)  # subscribers are notified after the state is set
+    assert transitions == [True]
+
+    create_connection.side_effect = OSError("unreachable")
+    monitor.refresh()
+    time.sleep(0.5)
+    assert not monitor.is_online
+    assert transitions == [True, False]
+    assert not monitor.wait_online(0.1)
+
+    create_connection.side_effect = None
+    assert monitor.wait_online(2)
+    time.sleep(0.1)
+    assert transitions == [True, False, True]
+    monitor.stop()
+
+
+def test_network_state_cache(base_fixture, mocker):
+    import nmcli
+    from waqd.base.network import NetworkStateCache
+
+    status = mocker.spy(nmcli.device, "status")
+    wifi = mocker.spy(nmcli.device, "wifi")
+    # without nmcli monitor the state is read again after its lifetime
+    mocker.patch.object(NetworkStateCache, "MONITOR_COMMAND", ["/nonexistent/nmcli", "monitor"])
+    cache = NetworkStateCache()
+    assert not cache.is_monitoring
+    cache.get_devices()
+    cache.get_devices()
+    assert status.call_count == 1
+    cache.get_wifi_networks()
+    cache.get_wifi_networks()
+    assert wifi.call_count == 1
+    cache.get_wifi_networks(rescan=True)
+    assert wifi.call_count == 2
+
+    # a change event invalidates the cached state
+    NetworkStateCache._instance = None
+    mocker.patch.object(NetworkStateCache, "MONITOR_COMMAND",
+                        ["sh", "-c", "sleep 0.5; echo 'wlan0: connected'; sleep 5"])
+    cache = NetworkStateCache()
+    assert cache.is_monitoring
+    cache.get_devices()
+    cache.get_devices()
+    assert status.call_count == 2
+    time.sleep(1)
+    cache.get_devices()
+    assert status.call_count == 3
+    cache.stop()
+
+
+def test_wait_online(base_fixture, mocker):
+    import asyncio
+    from waqd.base.network import ConnectivityMonitor
+
+    create_connection = mocker.patch("socket.create_connection", side_effect=OSError())
+    # no re-probe during the test - only the refresh can bring it online
+    mocker.patch.object(ConnectivityMonitor, "OFFLINE_INTERVAL_MIN_S", 10)
+    monitor = ConnectivityMonitor()
+    assert not monitor.is_online
+    # fails fast with the cached verdict
+    start = time.monotonic()
+    assert not monitor.wait_online(0)
+    assert asyncio.run(monitor.wait_online_async(0.1)) is False
+    assert time.monotonic() - start < 1
+
+    async def wait_for_transition():
+        waiter = asyncio.create_task(monitor.wait_online_async(5))
+        await asyncio.sleep(0.1)
+        create_connection.side_effect = None
+        monitor.refresh()  # wakes up the monitor instead of waiting for the next probe
+        return await waiter
+
+    offline_probe_count = create_connection.call_count
+    assert asyncio.run(wait_for_transition())
+    assert create_connection.call_count == offline_probe_count + 1  # only the refresh
+    monitor.stop()
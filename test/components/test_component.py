@@ -1,5 +1,12 @@
 import logging
+import os
+import signal
+import subprocess
+import threading
 import time
+from pathlib import Path
+
+import pytest
 
 from waqd.base.component_reg import (Component, ComponentRegistry,
                                        CyclicComponent)
@@ -81,3 +88,119 @@ def test_cyclic_component(base_fixture):
 
     # TODO test stop timeout
 
+
+def test_supervisor_restart_with_backoff(base_fixture, mocker):
+    from waqd.base.supervisor import Supervisor
+
+    class CrashingComp(CyclicComponent):
+        UPDATE_TIME = 0.1
+
+        def __init__(self):
+            super().__init__()
+            self._start_update_loop(update_func=self._update)
+
+        def _update(self):
+            raise RuntimeError("crash")
+
+    settings = Settings(base_fixture.testdata_path / "integration")
+    cr = ComponentRegistry(settings)
+    supervisor = Supervisor(cr)
+    supervisor.BACKOFF_BASE_S = 0.1
+    supervisor.MAX_RESTARTS = 2
+    # re-create only the crashing component instead of all default components
+    mocker.patch.object(cr, "watch_all", lambda: cr._create_component_instance(CrashingComp))
+    supervisor.start()
+
+    cr._create_component_instance(CrashingComp)
+    time.sleep(3)
+    assert "CrashingComp" in supervisor.degraded
+    comp = cr.get("CrashingComp")
+    assert comp and comp.is_disabled
+    supervisor.stop()
+
+
+def test_apply_setting_changes(base_fixture, mocker):
+    from waqd.settings import BRIGHTNESS, LANG, NIGHT_MODE_BEGIN
+
+    class InPlaceComp(Component):
+        def update_setting(self, name, value):
+            self.lang = value
+            return True
+
+    class ReloadComp(Component):
+        pass
+
+    settings = Settings(base_fixture.testdata_path / "integration", auto_save=False)
+    cr = ComponentRegistry(settings)
+    mocker.patch.object(
+        cr, "SETTING_CONSUMERS", {LANG: ["InPlaceComp"], BRIGHTNESS: ["ReloadComp"]}
+    )
+    mocker.patch.object(cr, "watch_all", lambda: cr._create_component_instance(ReloadComp))
+    in_place = cr._create_component_instance(InPlaceComp)
+    reloaded = cr._create_component_instance(ReloadComp)
+
+    settings.set(LANG, "English")
+    settings.set(NIGHT_MODE_BEGIN, settings.get_int(NIGHT_MODE_BEGIN) + 1)
+    changed = settings.pop_changed_keys()
+    assert changed == {LANG, NIGHT_MODE_BEGIN}
+    assert not settings.pop_changed_keys()
+    cr.apply_setting_changes(changed)
+    assert cr.get("InPlaceComp") is in_place
+    assert in_place.lang == "English"
+    assert cr.get("ReloadComp") is reloaded  # not affected
+
+    settings.set(BRIGHTNESS, settings.get_int(BRIGHTNESS) + 1)
+    cr.apply_setting_changes(settings.pop_changed_keys())
+    assert cr.get("ReloadComp") is not reloaded
+    assert cr.get("InPlaceComp") is in_place
+
+
+def test_diagnostics(base_fixture):
+    from waqd.base.diagnostics import collect_diagnostics, format_diagnostics
+
+    class SlowComp(CyclicComponent):
+        UPDATE_TIME = 0.1
+
+        def __init__(self):
+            super().__init__()
+            self._start_update_loop(update_func=self._update)
+
+        def _update(self):
+            time.sleep(0.2)
+
+    settings = Settings(base_fixture.testdata_path / "integration")
+    cr = ComponentRegistry(settings)
+    comp = cr._create_component_instance(SlowComp)
+    time.sleep(1)
+    diagnostics = collect_diagnostics(cr, samples=3)
+    comp.stop()
+
+    comp_stats = [stats for stats in diagnostics["components"] if stats["name"] == "SlowComp"]
+    assert comp_stats[0]["overrun_count"] >= 1
+    assert comp_stats[0]["last_update_duration_s"] >= 0.2
+    thread_stats = [stats for stats in diagnostics["threads"] if stats["name"] == "SlowComp"]
+    assert thread_stats and thread_stats[0]["user_time_s"] is not None
+    assert "_update" in diagnostics["stacks"]["SlowComp"][0]["stack"]
+    assert "SlowComp" in format_diagnostics(diagnostics)
+
+
+def test_request_dump(base_fixture, mocker):
+    from waqd.base.diagnostics import request_dump
+
+    other_process = subprocess.Popen(["sleep", "10"])
+    try:
+        with pytest.raises(ValueError):  # the signal would terminate it
+            request_dump(other_process.pid)
+        assert other_process.poll() is None
+    finally:
+        other_process.kill()
+        other_process.wait()
+
+    received = threading.Event()
+    previous_handler = signal.signal(signal.SIGUSR1, lambda signum, frame: received.set())
+    try:
+        mocker.patch.object(Path, "read_bytes", return_value=b"python\0-m\0waqd\0")
+        request_dump(os.getpid())
+        assert received.wait(5)
+    finally:
+        signal.signal(signal.SIGUSR1, previous_handler)
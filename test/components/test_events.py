@@ -8,8 +8,9 @@ from freezegun import freeze_time
 import waqd
 from waqd.base.component_ctrl import ComponentController
 from waqd.base.file_logger import Logger
-from waqd.components.events import (EventHandler, get_time_of_day,
-                                    parse_event_file, write_events_file)
+from waqd.components.event_rules import Condition, Rule, RuleEngine, compile_rule
+from waqd.components.events import (PERSIST_JOB_ID, Event, EventHandler, get_events_validator,
+                                    get_time_of_day, parse_event_file, write_events_file)
 from waqd.settings import (NIGHT_MODE_BEGIN, NIGHT_MODE_END, SOUND_ENABLED,
                            Settings)
 # from waqd.ui.qt.main_window import WeatherMainUi
@@ -28,6 +29,96 @@ def test_parser(base_fixture, target_mockup_fixture):
         events_read = json.load(fp)
     assert events_read.get("events")[0].get("name") == "Daily Greeting"
     assert events_read.get("events")[1].get("name") == "Wakeup"
+    # conditions are written back
+    assert events_read.get("events")[4].get("conditions") == events[4].conditions
+    assert events_read.get("events")[4].get("hold_s") == 60
+    assert "conditions" not in events_read.get("events")[0]
+
+
+def test_write_events_file(base_fixture, tmp_path):
+    events = parse_event_file(base_fixture.testdata_path / "events" / "events.json")
+    events_file_path = tmp_path / "events.json"
+    write_events_file(events_file_path, events)
+    assert [path.name for path in tmp_path.iterdir()] == ["events.json"]  # temp file renamed
+    assert ([event.name for event in parse_event_file(events_file_path)]
+            == [event.name for event in events])
+    assert get_events_validator() is get_events_validator()
+
+
+def test_event_handler_reload_and_persist(base_fixture):
+    events = parse_event_file(base_fixture.testdata_path / "events" / "events.json")
+    waqd.user_config_dir.mkdir(parents=True)
+    events_file_path = waqd.user_config_dir / "events.json"
+    # without direct executions, which need the components
+    write_events_file(events_file_path, [events[1], events[4]])
+    handler = EventHandler(None, "en", 5)
+    handler.PERSIST_DELAY_S = 0.5
+    try:
+        while not handler.is_ready:
+            time.sleep(0.1)
+        assert len(handler._event_jobs) == 1
+        assert handler._has_rules
+
+        # edits are reloaded
+        write_events_file(events_file_path, events[1:4])
+        for _ in range(50):
+            if len(handler._event_jobs) == 3:
+                break
+            time.sleep(0.1)
+        assert ([event.name for event in handler._events]
+                == [event.name for event in events[1:4]])
+        assert not handler._has_rules
+        # invalid files are ignored
+        events_file_path.write_text("{")
+        time.sleep(handler.RELOAD_DELAY_S + 0.5)
+        assert len(handler._events) == 3
+
+        # changes are written debounced and are not reloaded
+        current_events = handler._events
+        current_events[0].last_triggered = "2020-12-25 16:49:50"
+        handler._persist_events()
+        handler._persist_events()
+        job_ids = [job.id for job in handler._scheduler.get_jobs()]
+        assert job_ids.count(PERSIST_JOB_ID) == 1
+        time.sleep(handler.PERSIST_DELAY_S + handler.RELOAD_DELAY_S + 0.5)
+        assert parse_event_file(events_file_path)[0].last_triggered == "2020-12-25 16:49:50"
+        assert handler._events is current_events
+    finally:
+        handler.stop()
+
+
+def test_rule_engine(base_fixture):
+    events = parse_event_file(base_fixture.testdata_path / "events" / "events.json")
+    ventilation = events[4]
+    assert ventilation.name == "Ventilation"
+    fired = []
+    engine = RuleEngine(fired.append)
+    engine.add_rule(compile_rule(ventilation))  # CO2 above 1200, 200 hysteresis, 60 s hold
+    dry_air = Event("Dry air")
+    engine.add_rule(Rule(dry_air, [Condition("interior", "humidity_%", 30, above=False),
+                                   Condition("interior", "temp_degC", 20, above=True)],
+                         hold_s=0, cooldown_s=0))
+
+    engine.add_sample("interior", "CO2_ppm", 1300, now=0)
+    engine.add_sample("exterior", "CO2_ppm", 1300, now=30)  # other location
+    engine.add_sample("interior", "CO2_ppm", 1300, now=59)
+    assert not fired  # hold time not reached
+    engine.add_sample("interior", "CO2_ppm", 1100, now=60)  # still within the hysteresis
+    assert fired == [ventilation]
+    engine.add_sample("interior", "CO2_ppm", 1300, now=120)
+    assert fired == [ventilation]  # only once per activation
+    engine.add_sample("interior", "CO2_ppm", 900, now=200)  # released
+    engine.add_sample("interior", "CO2_ppm", 1300, now=300)
+    engine.add_sample("interior", "CO2_ppm", 1300, now=1000)
+    assert fired == [ventilation]  # cooldown
+    engine.add_sample("interior", "CO2_ppm", 1300, now=1860)
+    assert fired == [ventilation, ventilation]
+
+    # all conditions must be met
+    engine.add_sample("interior", "humidity_%", 25, now=0)
+    assert len(fired) == 2
+    engine.add_sample("interior", "temp_degC", 21, now=1)
+    assert fired[-1] == dry_air
 
 
 def test_daily_greeting(base_fixture, qtbot, target_mockup_fixture, monkeypatch):
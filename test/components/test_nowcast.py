@@ -0,0 +1,51 @@
+import pytest
+
+from waqd.components.weather.nowcast import (PressureNowcast, PressureTrend, get_tendency,
+                                             get_zambretti_letter)
+
+
+def test_pressure_trend():
+    trend = PressureTrend(window_s=3 * 3600)
+    assert trend.get_slope() is None
+    # falling 2 hPa per hour with noise
+    for minute in range(0, 4 * 60 + 1, 5):
+        noise = 0.05 if minute % 10 else -0.05
+        trend.add(1e6 + minute * 60, 1010 - 2 * minute / 60 + noise)
+    # only the last 3 hours are kept
+    assert trend.span_s == 3 * 3600
+    assert trend.get_slope() * 3600 == pytest.approx(-2, abs=0.01)
+    assert trend.latest == pytest.approx(1001.95)
+
+    # a change of the weather replaces the old trend within the window
+    for minute in range(5, 3 * 60 + 1, 5):
+        trend.add(1e6 + (4 * 60 + minute) * 60, 1002 + minute / 60)
+    assert trend.get_slope() * 3600 == pytest.approx(1, abs=0.01)
+
+
+def test_tendency_and_zambretti():
+    assert get_tendency(0.05) == "steady"
+    assert get_tendency(-1.0) == "falling slowly"
+    assert get_tendency(2.0) == "rising"
+    assert get_tendency(-4.0) == "falling quickly"
+    assert get_tendency(7.0) == "rising very rapidly"
+    # reference values of the simple Zambretti formulas
+    assert get_zambretti_letter(1000, -3) == "U"
+    assert get_zambretti_letter(1020, 0) == "B"
+    assert get_zambretti_letter(1020, 3) == "C"
+    assert get_zambretti_letter(1050, 3) == "A"  # clamped
+    assert get_zambretti_letter(950, -3) == "Z"
+
+
+def test_pressure_nowcast(base_fixture):
+    nowcast = PressureNowcast(None, enabled=False)
+    nowcast.add_sample(1013, timestamp=0)
+    nowcast.add_sample(1012, timestamp=1800)
+    assert nowcast.get_nowcast() is None  # too short for a tendency
+    nowcast.add_sample(1011, timestamp=3600)
+    nowcast.add_sample(1010, timestamp=5400)
+    result = nowcast.get_nowcast()
+    assert result.change_3h == pytest.approx(-6)
+    assert result.tendency == "falling quickly"
+    assert result.pressure == 1010
+    assert result.zambretti == "R"
+    assert result.main == "heavy_clouds"
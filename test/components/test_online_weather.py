@@ -1,22 +1,36 @@
 import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
 from pathlib import Path
+import numpy as np
 from freezegun import freeze_time
 
-from waqd.components.weather import OpenTopoData, OpenWeatherMap, OpenMeteo
+from waqd.components.weather import OpenTopoData, OpenWeatherMap, OpenMeteo, WeatherProvider
+from waqd.components.weather.base_types import HOME_LOCATION
+from waqd.components.weather.forecast_points import FLOAT_FIELDS, ForecastPoints
+from waqd.components.weather.hedged import HedgedWeatherProvider
+from waqd.components.weather.open_meteo import NO_BIN, HourlyForecast
+from waqd.components.weather.solar import get_sun_times, get_year_table
 
 
 class MockOpenMeteo(OpenMeteo):
     daily_test_json = Path()
     hourly_test_json = Path()
+    api_calls = 0
 
     def _call_api(self, command: str, **kwargs):
+        self.api_calls += 1
+        response = {}
+        # the test data was recorded with separate requests
+        if "&daily" in command:
+            with open(self.daily_test_json) as fp:
+                response.update(json.load(fp))
         if "&hourly" in command:
             with open(self.hourly_test_json) as fp:
-                return json.load(fp)
-        elif "&daily" in command:
-            with open(self.daily_test_json) as fp:
-                return json.load(fp)
-        return {}
+                response["hourly"] = json.load(fp)["hourly"]
+        return response
 
 
 def test_open_meteo_geocoder(base_fixture, mocker):
@@ -37,6 +51,35 @@ def test_open_meteo_geocoder(base_fixture, mocker):
     assert ret[0].latitude == 52.52437
 
 
+def test_geocoding_service(base_fixture, mocker):
+    from waqd.components.weather.geocoding import GeocodingService
+    test_data = json.loads(
+        (base_fixture.testdata_path / "online_weather/om_search_berlin.json").read_text())
+    mocker.patch("waqd.components.weather.geocoding.Network.wait_for_internet",
+                 return_value=True)
+    get_json = mocker.patch("waqd.components.weather.geocoding.HttpClient.get_json",
+                            return_value=test_data)
+    service = GeocodingService()
+    assert len(service.search("Berlin")) == 10
+    assert len(service.search(" berlin")) == 10  # cached
+    assert get_json.call_count == 1
+    # results of shorter queries are not reused - short queries only match exactly
+    get_json.return_value = {}
+    assert service.search("b") == []
+    get_json.return_value = test_data
+    assert len(service.search("berlin-mitte")) == 10
+    assert get_json.call_count == 3
+
+    # a newer query of the same client supersedes the one in flight
+    def type_ahead(url):
+        get_json.side_effect = None
+        assert service.search("Hamburg", client="a") is not None
+        return test_data
+    get_json.side_effect = type_ahead
+    assert service.search("Ham", client="a") is None
+    assert service.search("Ham", client="b")  # cached meanwhile
+
+
 def test_open_meteo(base_fixture, mocker):
     daily_test_json: Path = base_fixture.testdata_path / "online_weather/om_current_weather.json"
     hourly_test_json: Path = base_fixture.testdata_path / "online_weather/om_hourly_weather.json"
@@ -44,12 +87,103 @@ def test_open_meteo(base_fixture, mocker):
         om = MockOpenMeteo(13.41053, 52.52437)
         om.daily_test_json = daily_test_json
         om.hourly_test_json = hourly_test_json
+        assert om.wait_until_fetched(5)
         ret = om.get_current_weather()
         assert ret
         ret = om.get_5_day_forecast()
         assert ret
+        assert om.api_calls == 1  # daily, hourly and current weather at once
         assert om.nighttime_forecast_points
         assert om.daytime_forecast_points
+        # aggregated from the hourly points
+        assert ret[1].temp_min == 4.5
+        assert ret[1].temp_max == 7.2
+        assert ret[1].temp_night_min == 3.6
+        assert ret[1].temp_night_max == 5.5
+        assert ret[1].main == "clouds"
+        assert ret[0].temp_min == -float("inf")  # no daylight left
+        assert len(om.nighttime_forecast_points[0]) == 9
+        # current weather is completed with the next hourly point
+        assert ret and om.get_current_weather().humidity == 80
+
+
+def test_open_meteo_locations(base_fixture):
+    from waqd.components.weather.base_types import HOME_LOCATION, parse_location_list
+
+    class BatchedOpenMeteo(MockOpenMeteo):
+        def _call_api(self, command: str, **kwargs):
+            response = super()._call_api(command, **kwargs)
+            return [response] * len(kwargs["latitude"].split(","))
+
+    locations = parse_location_list("office:48.137:11.575; holiday:47.269:11.404;broken:1")
+    assert locations == {"office": (48.137, 11.575), "holiday": (47.269, 11.404)}
+    with freeze_time("2023-01-02 22:00:00"):
+        om = BatchedOpenMeteo(13.41053, 52.52437, locations)
+        testdata_path: Path = base_fixture.testdata_path / "online_weather"
+        om.daily_test_json = testdata_path / "om_current_weather.json"
+        om.hourly_test_json = testdata_path / "om_hourly_weather.json"
+        assert om.wait_until_fetched(5)
+        assert om.location_names == [HOME_LOCATION, "office", "holiday"]
+        assert om.api_calls == 1  # all locations in one request
+        for name in om.location_names:
+            assert om.get_current_weather(name)
+            assert om.get_5_day_forecast(name)
+            assert om._locations[name].cache.path.is_file()
+        assert om.get_current_weather("unknown") is None
+        assert om.get_5_day_forecast("unknown") == []
+        om.stop()
+
+
+class FakeProvider(WeatherProvider):
+    def __init__(self, name: str, delay_s=0.0, fail=False):
+        super().__init__()
+        self.name = name
+        self.delay_s = delay_s
+        self.fail = fail
+        self.fetch_calls = 0
+
+    def fetch(self, timeout=None):
+        self.fetch_calls += 1
+        time.sleep(self.delay_s)
+        return not self.fail
+
+    def get_current_weather(self, location=HOME_LOCATION):
+        return self.name
+
+    def get_5_day_forecast(self, location=HOME_LOCATION):
+        return [self.name]
+
+
+def test_hedged_weather_provider(base_fixture, mocker):
+    mocker.patch.object(HedgedWeatherProvider, "LATENCY_BUDGET_S", 0.1)
+    # the slow primary is hedged by the secondary
+    hedged = HedgedWeatherProvider([(FakeProvider, ["slow", 0.5]), (FakeProvider, ["fast"])])
+    slow, fast = hedged.providers
+    assert hedged.wait_until_fetched(5)
+    assert hedged.get_current_weather() == "fast"
+    assert hedged.get_5_day_forecast() == ["fast"]
+    assert hedged.source is fast
+    assert slow.fetch_calls == 1 and fast.fetch_calls == 1
+    time.sleep(0.6)  # late answer is measured as well
+    assert hedged.get_stats(slow).latency_s > hedged.get_stats(fast).latency_s
+    assert hedged.providers == [fast, slow]  # fastest is primary now
+    hedged.stop()
+
+    # a failing provider falls back at once, without waiting for the latency budget
+    mocker.patch.object(HedgedWeatherProvider, "LATENCY_BUDGET_S", 5)
+    hedged = HedgedWeatherProvider([(FakeProvider, ["down", 0.0, True]),
+                                    (FakeProvider, ["up"])])
+    down, up = hedged.providers
+    start = time.monotonic()
+    assert hedged.wait_until_fetched(5)
+    assert time.monotonic() - start < 1
+    assert hedged.get_current_weather() == "up"
+    assert hedged.providers == [up, down]
+    for _ in range(2):
+        assert hedged.fetch(5)
+    assert down.fetch_calls == 1  # the healthy primary answers in time
+    assert hedged.get_stats(up).served_count == 3
+    hedged.stop()
 
 
 class MockOpenWeatherMap(OpenWeatherMap):
@@ -66,13 +200,87 @@ class MockOpenWeatherMap(OpenWeatherMap):
         return {}
 
 
-def test_open_topo():
+def test_forecast_points(base_fixture):
+    start = datetime(2023, 1, 2, 12)
+    count = 48
+    columns = {name: [float(index) for index in range(count)] for name in FLOAT_FIELDS}
+    columns["clouds"] = [80.0] * count
+    points = ForecastPoints([start + timedelta(hours=index) for index in range(count)],
+                            [index // 24 for index in range(count)], [803] * count,
+                            ["Clouds"] * count, ["cloudy"] * count, columns,
+                            [dt_time(8), dt_time(9)], [dt_time(16), dt_time(17)], altitude=34.0)
+    assert len(points) == count
+    assert points.nbytes() < count * 100  # no Weather object per point
+    point = points[25]
+    assert point.main == "heavy_clouds"  # same rule as Weather
+    assert point.date_time == start + timedelta(hours=25)
+    assert point.temp == 25.0
+    assert point.sunrise == dt_time(9)  # of its own day
+    weather = point.to_weather()
+    assert weather.wid == 803 and weather.altitude == 34.0 and weather.temp == 25.0
+    days = points.days(3)
+    assert [len(day) for day in days] == [24, 24, 0]
+    temp_min, temp_max = points.min_max(3)
+    assert temp_min[:2].tolist() == [0.0, 24.0]
+    assert temp_max[:2].tolist() == [23.0, 47.0]
+    assert (temp_min[2], temp_max[2]) == (-float("inf"), float("inf"))  # no points
+
+
+def test_solar_sun_times(base_fixture):
+    berlin = (52.52, 13.42)
+    utc_offset = timedelta(hours=1)
+    # Open-Meteo sends 08:14 and 16:05 for this day
+    sunrise, sunset = get_sun_times(*berlin, date(2023, 1, 2), utc_offset)
+    assert abs(sunrise.hour * 60 + sunrise.minute - (8 * 60 + 14)) <= 3
+    assert abs(sunset.hour * 60 + sunset.minute - (16 * 60 + 5)) <= 3
+    summer_sunrise, summer_sunset = get_sun_times(*berlin, date(2023, 6, 21), utc_offset)
+    assert summer_sunrise < sunrise and summer_sunset > sunset
+    # one table per year and location
+    get_year_table.cache_clear()
+    for day in range(1, 32):
+        get_sun_times(*berlin, date(2023, 1, day), utc_offset)
+    assert get_year_table.cache_info().misses == 1
+    # polar day and night
+    assert get_sun_times(78.2, 15.6, date(2023, 6, 21)) == (dt_time.min, dt_time.max)
+    assert get_sun_times(78.2, 15.6, date(2023, 12, 21)) == (dt_time.min, dt_time.min)
+
+
+def test_hourly_forecast_sun_times_per_day(base_fixture):
+    times = [f"2023-01-0{day}T{hour:02}:00" for day in (2, 3) for hour in range(24)]
+    hourly = HourlyForecast({"time": times, "weathercode": [0] * len(times)},
+                            [dt_time(8), dt_time(10)], [dt_time(16), dt_time(14)])
+    hourly.bin_days_and_nights(datetime(2023, 1, 2, 0, 30))
+    day_hours = [int(times[idx][11:13]) for idx in np.flatnonzero(hourly.day_bin != NO_BIN)]
+    assert day_hours == [*range(9, 16), *range(11, 14)]  # each day with its own sun times
+    # before the sunrise of the next day, it is still the night before
+    assert hourly.night_bin[24 + 9] == 0
+    assert hourly.night_bin[24 + 10] == 1 and hourly.day_bin[24 + 10] == NO_BIN
+
+
+def test_open_topo(base_fixture, mocker):
+    mocker.patch("waqd.components.weather.open_topo.Network.wait_for_internet",
+                 return_value=True)
+    response = {"status": "OK", "results": [
+        {"elevation": 439.6, "location": {"lat": 48.2085, "lng": 12.3989}}]}
+    get_json = mocker.patch("waqd.components.weather.open_topo.HttpClient.get_json",
+                            return_value=response)
     op = OpenTopoData()
     alt = op.get_altitude(48.2085, 12.3989)
     assert alt > 439 and alt < 440
-    op._altitude_info["elevation"] = 0
-    alt = op.get_altitude(48.2085, 12.3989)
-    assert alt == 0
+    assert op.get_altitude(48.20851, 12.39889) == alt  # same quantized location
+    assert get_json.call_count == 1
+
+    # persistent over restarts
+    assert OpenTopoData().get_altitude(48.2085, 12.3989) == alt
+    assert get_json.call_count == 1
+
+    # a known altitude is not requested
+    op.seed(47.0, 11.0, 600)
+    assert op.get_altitude(47.0, 11.0) == 600
+    assert op.get_altitude(47.04, 10.97) == 600  # coordinates of the city
+    assert get_json.call_count == 1
+    assert op.get_altitude(47.5, 11.0) == alt  # too far away
+    assert get_json.call_count == 2
 
 
 def test_open_weather_forecast_api_call(base_fixture):
@@ -146,3 +354,94 @@ def test_open_weather_get3_day_forecast(base_fixture):
         assert forecast[3].temp_night_min == 16.16
         assert forecast[3].temp_night_max == 18.81
         assert forecast[3].wid == 803
+
+
+def test_open_meteo_cache(base_fixture):
+    testdata_path: Path = base_fixture.testdata_path / "online_weather"
+    daily_test_json = testdata_path / "om_current_weather.json"
+    hourly_test_json = testdata_path / "om_hourly_weather.json"
+    with freeze_time("2023-01-02 22:00:00"):
+        om = MockOpenMeteo(13.41053, 52.52437)
+        om.daily_test_json = daily_test_json
+        om.hourly_test_json = hourly_test_json
+        assert om.wait_until_fetched(5)
+        forecast = om.get_5_day_forecast()
+        assert om._home.cache.path.is_file()
+        om.stop()
+
+    class OfflineOpenMeteo(MockOpenMeteo):
+        def _call_api(self, command: str, **kwargs):
+            self.api_calls += 1
+            return {}
+
+    # after a restart, the cached data is served at once, while the refresh fails
+    with freeze_time("2023-01-02 23:00:00"):
+        offline_om = OfflineOpenMeteo(13.41053, 52.52437)
+        current_weather = offline_om.get_current_weather()
+        assert current_weather
+        assert str(current_weather.fetch_time) == "2023-01-02 22:00:00"
+        assert offline_om.get_5_day_forecast()[1].temp_min == forecast[1].temp_min
+        assert offline_om.wait_until_fetched(5)
+        assert offline_om.api_calls == 1
+        # last good data is kept
+        assert offline_om.get_current_weather() is current_weather
+        assert offline_om.api_calls == 1  # no retry storm
+        offline_om.stop()
+
+    # on the next day, the forecast of the cached data begins with the new day
+    with freeze_time("2023-01-03 00:30:00"):
+        offline_om = OfflineOpenMeteo(13.41053, 52.52437)
+        next_day_forecast = offline_om.get_5_day_forecast()
+        assert len(next_day_forecast) == len(forecast) - 1
+        assert next_day_forecast[0].date_time == datetime(2023, 1, 3)
+        assert next_day_forecast[0].wid == forecast[1].wid
+        assert next_day_forecast[0].temp_max == forecast[1].temp_max
+        offline_om.stop()
+
+    # a hedge serves the cached data at once and is the only one to schedule fetches
+    with freeze_time("2023-01-02 23:00:00"):
+        hedged = HedgedWeatherProvider([(FakeProvider, ["down", 0.0, True]),
+                                        (OfflineOpenMeteo, [13.41053, 52.52437, None, False])])
+        down, offline_om = hedged.providers
+        assert hedged.source is offline_om
+        assert str(hedged.get_current_weather().fetch_time) == "2023-01-02 22:00:00"
+        assert hedged.get_5_day_forecast()[1].temp_min == forecast[1].temp_min
+        assert hedged.wait_until_fetched(5)
+        assert offline_om.get_current_weather()
+        time.sleep(0.1)
+        assert offline_om.api_calls == 1 and down.fetch_calls == 1
+        assert hedged.get_current_weather() is offline_om.get_current_weather()  # kept
+        hedged.stop()
+
+
+def test_open_meteo_single_flight(base_fixture):
+    fetch_started = threading.Event()
+    release_fetch = threading.Event()
+
+    class SlowOpenMeteo(MockOpenMeteo):
+        def _call_api(self, command: str, **kwargs):
+            fetch_started.set()
+            release_fetch.wait(5)
+            return super()._call_api(command, **kwargs)
+
+    testdata_path: Path = base_fixture.testdata_path / "online_weather"
+    with freeze_time("2023-01-02 22:00:00"):  # date of the test data
+        om = SlowOpenMeteo(13.41053, 52.52437)
+        om.daily_test_json = testdata_path / "om_current_weather.json"
+        om.hourly_test_json = testdata_path / "om_hourly_weather.json"
+        # readers don't wait for the fetch in flight
+        assert om.get_current_weather() is None
+        assert fetch_started.wait(5)
+        callers = [threading.Thread(target=om.refresh, kwargs={"wait": True, "timeout": 5})
+                   for _ in range(5)]
+        for caller in callers:
+            caller.start()
+        release_fetch.set()
+        for caller in callers:
+            caller.join()
+        assert om.api_calls == 1  # all callers joined the fetch in flight
+        assert om.get_current_weather()
+        # a new request is fetched again
+        assert om.refresh(wait=True, timeout=5)
+        assert om.api_calls == 2
+        om.stop()
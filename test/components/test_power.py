@@ -1,5 +1,8 @@
 
 import time
+from datetime import datetime, time as day_time
+
+import pytest
 from freezegun import freeze_time
 
 from waqd.components.power import (BRIGHTNESS, DAY_STANDBY_TIMEOUT,
@@ -8,7 +11,7 @@ from waqd.components.power import (BRIGHTNESS, DAY_STANDBY_TIMEOUT,
                                         NIGHT_MODE_BRIGHTNESS, NIGHT_MODE_END,
                                         NIGHT_STANDBY_TIMEOUT,
                                         NIGHTMODE_WAKEUP_DELTA_BRIGHTNESS,
-                                        STANDBY_BRIGHTNESS, ESaver)
+                                        STANDBY_BRIGHTNESS, ESaver, get_night_mode)
 from waqd.settings import Settings
 from waqd.base.component_reg import ComponentRegistry
 
@@ -29,13 +32,36 @@ def test_no_standby_if_sensor_is_disabled(base_fixture):
         # energy_saver needs to be initalized in freeze time, otherwise testing time will have an impact
         energy_saver = ESaver(comps, settings)
         time.sleep(energy_saver.INIT_WAIT_TIME)
-        time.sleep(energy_saver.UPDATE_TIME + 1)
+        time.sleep(1)  # first evaluation after the init wait
         assert disp.get_brightness() == settings.get(BRIGHTNESS)
 
     energy_saver.stop()
 
 
-def test_night_mode_startup(base_fixture, target_mockup_fixture):
+def create_energy_saver(comps, settings, monkeypatch) -> ESaver:
+    """ The state is only evaluated by the test, like the thread would at the frozen time. """
+    monkeypatch.setattr(ESaver, "INIT_WAIT_TIME", 3600)
+    return ESaver(comps, settings)
+
+
+def test_night_mode_times():
+    night_begin, night_end = day_time(22), day_time(5)
+    assert (get_night_mode(datetime(2019, 1, 1, 12), night_begin, night_end)
+            == (False, datetime(2019, 1, 1, 22)))
+    assert (get_night_mode(datetime(2019, 1, 1, 23), night_begin, night_end)
+            == (True, datetime(2019, 1, 2, 5)))
+    assert (get_night_mode(datetime(2019, 1, 2, 3), night_begin, night_end)
+            == (True, datetime(2019, 1, 2, 5)))
+    assert (get_night_mode(datetime(2019, 1, 2, 5), night_begin, night_end)
+            == (False, datetime(2019, 1, 2, 22)))
+    # night after midnight
+    assert (get_night_mode(datetime(2019, 1, 1, 0, 30), day_time(1), day_time(6))
+            == (False, datetime(2019, 1, 1, 1)))
+    assert (get_night_mode(datetime(2019, 1, 1, 7), day_time(1), day_time(6))
+            == (False, datetime(2019, 1, 2, 1)))
+
+
+def test_night_mode_startup(base_fixture, target_mockup_fixture, monkeypatch):
     settings = Settings(base_fixture.testdata_path / "integration")
     settings.set(MOTION_SENSOR_ENABLED, True)
     settings.set(NIGHT_MODE_BEGIN, 23)
@@ -43,99 +69,76 @@ def test_night_mode_startup(base_fixture, target_mockup_fixture):
     settings.set(BRIGHTNESS, 70)
     # night
     with freeze_time("2019-01-01 01:59:59"):
-        energy_saver = None
         comps = ComponentRegistry(settings)
         disp = comps.display
-        energy_saver = ESaver(comps, settings)
-        time.sleep(energy_saver.INIT_WAIT_TIME)
+        energy_saver = create_energy_saver(comps, settings, monkeypatch)
         assert not energy_saver._update_thread is None
         assert not energy_saver.night_mode_active
         assert disp.get_brightness() == 70
-        time.sleep(energy_saver.UPDATE_TIME + 1)
+        # sleeps until the end of the night, but at most UPDATE_TIME
+        assert energy_saver._update_state() == energy_saver.UPDATE_TIME
         assert disp.get_brightness() == NIGHT_MODE_BRIGHTNESS
         assert energy_saver.night_mode_active
 
-    with freeze_time("2019-01-01 02:00:01"):
-        time.sleep(2 * energy_saver.UPDATE_TIME + 1)
-        assert energy_saver.night_mode_active
-        assert disp.get_brightness() == NIGHT_MODE_BRIGHTNESS
-
-    with freeze_time("2019-01-02 04:59:01"):
-        time.sleep(energy_saver.UPDATE_TIME + 1)
+    with freeze_time("2019-01-01 04:59:01"):
+        assert energy_saver._update_state() == pytest.approx(59)
         assert energy_saver.night_mode_active
         assert disp.get_brightness() == NIGHT_MODE_BRIGHTNESS
 
     energy_saver.stop()
 
 
-def test_night_mode_enter(base_fixture, target_mockup_fixture):
+def test_night_mode_enter(base_fixture, target_mockup_fixture, monkeypatch):
     settings = Settings(base_fixture.testdata_path / "integration")
     settings.set(MOTION_SENSOR_ENABLED, True)
     settings.set(NIGHT_MODE_BEGIN, 23)
     settings.set(NIGHT_MODE_END, 5)
     settings.set(BRIGHTNESS, 70)
 
-    energy_saver = None
     comps = ComponentRegistry(settings)
     disp = comps.display
     # day
     with freeze_time("2019-01-01 22:59:59"):
-        energy_saver = ESaver(comps, settings)
-        time.sleep(energy_saver.INIT_WAIT_TIME)
-        assert not energy_saver._update_thread is None
-        assert not energy_saver.night_mode_active
+        energy_saver = create_energy_saver(comps, settings, monkeypatch)
         assert disp.get_brightness() == 70
-        time.sleep(energy_saver.UPDATE_TIME + 1)
+        assert energy_saver._update_state() == pytest.approx(1)
         assert disp.get_brightness() == STANDBY_BRIGHTNESS
         assert not energy_saver.night_mode_active
 
-    with freeze_time("2019-01-01 23:00:01"):
-        time.sleep(2 * energy_saver.UPDATE_TIME + 1)
-        assert energy_saver.night_mode_active
-        assert disp.get_brightness() == NIGHT_MODE_BRIGHTNESS
-
-    with freeze_time("2019-01-02 04:59:01"):
-        time.sleep(energy_saver.UPDATE_TIME + 1)
+    with freeze_time("2019-01-01 23:00:00"):
+        assert energy_saver._update_state() == energy_saver.UPDATE_TIME
         assert energy_saver.night_mode_active
         assert disp.get_brightness() == NIGHT_MODE_BRIGHTNESS
 
     energy_saver.stop()
 
 
-def test_day_mode_enter(base_fixture, target_mockup_fixture):
+def test_day_mode_enter(base_fixture, target_mockup_fixture, monkeypatch):
     settings = Settings(base_fixture.testdata_path / "integration")
     settings.set(MOTION_SENSOR_ENABLED, True)
     settings.set(NIGHT_MODE_BEGIN, 22)
     settings.set(NIGHT_MODE_END, 5)
     settings.set(BRIGHTNESS, 70)
 
-    energy_saver = None
     comps = ComponentRegistry(settings)
     disp = comps.display
 
     with freeze_time("2019-01-01 22:59:59"):
-        energy_saver = ESaver(comps, settings)
-        time.sleep(energy_saver.INIT_WAIT_TIME)
-        assert not energy_saver._update_thread is None
-        assert 70 == disp.get_brightness()
-        time.sleep(energy_saver.UPDATE_TIME + 1)
+        energy_saver = create_energy_saver(comps, settings, monkeypatch)
+        energy_saver._update_state()
         assert disp.get_brightness() == NIGHT_MODE_BRIGHTNESS
-        assert energy_saver.night_mode_active == True
-
-    with freeze_time("2019-01-02 05:00:01"):
-        time.sleep(2 * energy_saver.UPDATE_TIME + 1)
-        assert energy_saver.night_mode_active == False
-        assert disp.get_brightness() == STANDBY_BRIGHTNESS
+        assert energy_saver.night_mode_active
 
-    with freeze_time("2019-01-02 21:59:01"):
-        time.sleep(energy_saver.UPDATE_TIME + 1)
-        assert energy_saver.night_mode_active == False
+    with freeze_time("2019-01-02 05:00:00"):
+        # the longest sleep is limited, to follow changes of the clock
+        assert energy_saver._update_state() == energy_saver.UPDATE_TIME
+        assert not energy_saver.night_mode_active
         assert disp.get_brightness() == STANDBY_BRIGHTNESS
 
     energy_saver.stop()
 
 
-def test_wake_up_from_night_mode(base_fixture, target_mockup_fixture):
+def test_wake_up_from_night_mode(base_fixture, target_mockup_fixture, monkeypatch):
     settings = Settings(base_fixture.testdata_path / "integration")
 
     settings.set(MOTION_SENSOR_ENABLED, True)
@@ -144,31 +147,31 @@ def test_wake_up_from_night_mode(base_fixture, target_mockup_fixture):
     settings.set(BRIGHTNESS, 70)
     settings.set(NIGHT_STANDBY_TIMEOUT, 10)
 
-    energy_saver = None
     comps = ComponentRegistry(settings)
     disp = comps.display
 
     with freeze_time("2019-01-01 22:59:59"):
-        energy_saver = ESaver(comps, settings)
-        time.sleep(energy_saver.INIT_WAIT_TIME)
-        time.sleep(energy_saver.UPDATE_TIME + 1)
+        energy_saver = create_energy_saver(comps, settings, monkeypatch)
+        energy_saver._update_state()
         assert NIGHT_MODE_BRIGHTNESS == disp.get_brightness()
-        assert energy_saver.night_mode_active == True
+        assert energy_saver.night_mode_active
 
-        # set sensor high
-        comps.motion_detection_sensor._motion_detected = 1
-        time.sleep(energy_saver.UPDATE_TIME + 1)
+        # motion wakes up the state loop
+        energy_saver._on_motion()
+        assert energy_saver._state_event.is_set()
+        assert energy_saver._update_state() == pytest.approx(10)
         assert disp.get_brightness() == 70 - NIGHTMODE_WAKEUP_DELTA_BRIGHTNESS
 
-        # set sensor low
-        comps.motion_detection_sensor._motion_detected = 0
-        time.sleep(10 + 1)
+    with freeze_time("2019-01-01 23:00:08"):
+        assert energy_saver.is_awake
+    with freeze_time("2019-01-01 23:00:10"):
+        energy_saver._update_state()
         assert disp.get_brightness() == NIGHT_MODE_BRIGHTNESS
 
     energy_saver.stop()
 
 
-def test_standby_in_day_mode(base_fixture, target_mockup_fixture):
+def test_standby_in_day_mode(base_fixture, target_mockup_fixture, monkeypatch):
     settings = Settings(base_fixture.testdata_path / "integration")
     settings.set(MOTION_SENSOR_ENABLED, True)
     settings.set(NIGHT_MODE_BEGIN, 22)
@@ -176,26 +179,67 @@ def test_standby_in_day_mode(base_fixture, target_mockup_fixture):
     settings.set(BRIGHTNESS, 70)
     settings.set(DAY_STANDBY_TIMEOUT, 10)
 
-    energy_saver = None
     comps = ComponentRegistry(settings)
     disp = comps.display
 
     # day
     with freeze_time("2019-01-01 12:59:59"):
+        monkeypatch.setattr(ESaver, "INIT_WAIT_TIME", 3600)
         energy_saver = comps.energy_saver
-        time.sleep(energy_saver.INIT_WAIT_TIME)
-        time.sleep(energy_saver.UPDATE_TIME + 1)
-        assert energy_saver.night_mode_active == False
+        energy_saver._update_state()
+        assert not energy_saver.night_mode_active
         assert disp.get_brightness() == STANDBY_BRIGHTNESS
 
     # switch to wake
-    comps.motion_detection_sensor._motion_detected = 1
     with freeze_time("2019-01-01 13:00:10"):
-        time.sleep(energy_saver.UPDATE_TIME + 2)
+        energy_saver.wake_up(5)
+        assert energy_saver._update_state() == pytest.approx(10)
         assert disp.get_brightness() == settings.get(BRIGHTNESS)
-        time.sleep(10 - energy_saver.UPDATE_TIME)
-        # switch to standby
-        comps.motion_detection_sensor._motion_detected = 0
-        time.sleep(energy_saver.UPDATE_TIME * 2)
+    # another wake-up extends the time
+    with freeze_time("2019-01-01 13:00:15"):
+        energy_saver._on_motion()
+        assert energy_saver._update_state() == pytest.approx(10)
+    # switch to standby
+    with freeze_time("2019-01-01 13:00:25"):
+        energy_saver._update_state()
         assert disp.get_brightness() == STANDBY_BRIGHTNESS
+
+    # settings are applied without a restart
+    settings.set(DAY_STANDBY_TIMEOUT, 20)
+    comps.apply_setting_changes([DAY_STANDBY_TIMEOUT])
+    assert comps.energy_saver is energy_saver
+    with freeze_time("2019-01-01 13:01:00"):
+        energy_saver._on_motion()
+        assert energy_saver._update_state() == pytest.approx(20)
+
+    # being awake does not delay the begin of the night
+    with freeze_time("2019-01-01 21:59:50"):
+        energy_saver._on_motion()
+        assert energy_saver._update_state() == pytest.approx(10)
+    with freeze_time("2019-01-01 22:00:00"):
+        assert energy_saver._update_state() == pytest.approx(10)
+        assert energy_saver.night_mode_active
+        assert disp.get_brightness() == 70 - NIGHTMODE_WAKEUP_DELTA_BRIGHTNESS
+    energy_saver.stop()
+
+
+def test_wake_up_signal_on_motion(base_fixture):
+    settings = Settings(base_fixture.testdata_path / "integration")
+    settings.set(NIGHT_MODE_BEGIN, 23)
+    settings.set(NIGHT_MODE_END, 5)
+    comps = ComponentRegistry(settings)
+    wake_ups = []
+    with freeze_time("2019-01-01 12:00:00"):
+        energy_saver = ESaver(comps, settings)
+        # subscribes to the sensor in the update loop
+        time.sleep(energy_saver.INIT_WAIT_TIME + 1)
+        energy_saver.wake_up_signal.subscribe_once(lambda: wake_ups.append(True))
+        comps.motion_detection_sensor.motion_signal.emit()
+        assert wake_ups == [True]
+        # no wake-up is published at night
+        energy_saver.wake_up_signal.subscribe_once(lambda: wake_ups.append(True))
+        energy_saver._night_mode_active = True
+        comps.motion_detection_sensor.motion_signal.emit()
+        assert wake_ups == [True]
     energy_saver.stop()
+    assert not comps.motion_detection_sensor.motion_signal.unsubscribe(energy_saver._on_motion)
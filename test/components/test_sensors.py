@@ -1,4 +1,5 @@
 import pint
+import struct
 import time
 from threading import Thread
 
@@ -145,3 +146,56 @@ def test_bmp280(base_fixture, target_mockup_fixture):
     time.sleep(sensor.UPDATE_TIME * (measure_points + 1))
     assert sensor.get_temperature().magnitude == 28.4
     assert sensor.get_pressure().magnitude >= PRESSURE  # adjusted for location
+
+
+def test_sensor_snapshot():
+    from waqd.components.sensor_worker import SensorSnapshot
+    snapshot = SensorSnapshot()
+    reader = SensorSnapshot(snapshot.name)
+    try:
+        assert reader.read() is None  # nothing written yet
+        snapshot.write({"temp_degC": 21.5, "co2_ppm": 600, "time": 1.0})
+        values = reader.read()
+        assert values
+        assert values["temp_degC"] == 21.5
+        assert values["co2_ppm"] == 600
+        assert values["hum_percent"] is None
+        # writer is in the middle of an update - no torn values are returned
+        struct.pack_into("<Q", snapshot._shm.buf, 0, snapshot._seq + 1)
+        assert reader.read() is None
+    finally:
+        reader.close()
+        snapshot.close()
+        snapshot.unlink()
+
+
+def test_sensor_worker_restart(base_fixture, target_mockup_fixture, monkeypatch):
+    from waqd.components.sensor_worker import SensorWorker
+    app.setup_unit_reg()
+    settings = Settings(base_fixture.testdata_path / "integration", auto_save=False)
+    settings.set(LOG_SENSOR_DATA, False)
+    comps = ComponentRegistry(settings)
+    monkeypatch.setattr(SensorWorker, "BACKOFF_BASE_S", 0)
+    monkeypatch.setattr(SensorWorker, "UPDATE_TIME", 0.5)
+    monkeypatch.setattr(SensorWorker, "WORKER_UPDATE_TIME", 0.5)
+    sensor = SensorWorker(comps, settings)
+    try:
+        # spawning a new interpreter takes a while
+        for _ in range(60):
+            if sensor._snapshot.read():
+                break
+            time.sleep(0.5)
+        assert sensor._snapshot.read()
+        first_process = sensor._process
+        assert first_process and first_process.is_alive()
+
+        first_process.kill()
+        for _ in range(20):
+            if sensor._process not in (None, first_process) and sensor._process.is_alive():
+                break
+            time.sleep(0.5)
+        assert sensor._process is not first_process
+        assert sensor._process and sensor._process.is_alive()
+    finally:
+        sensor.stop()
+    assert sensor._process is None
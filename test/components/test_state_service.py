@@ -0,0 +1,43 @@
+import os
+import stat
+from pathlib import Path
+from tempfile import gettempdir
+
+import pytest
+
+import waqd.app as base_app
+from waqd.settings import LANG, Settings
+from waqd.web.state_service import StateClient, StateService
+
+
+def test_snapshot_and_settings_forwarding(base_fixture, mocker):
+    settings = Settings(base_fixture.testdata_path / "integration", auto_save=False)
+    mocker.patch.object(base_app, "settings", settings)
+    comp_ctrl = mocker.patch.object(base_app, "comp_ctrl")
+    snapshot = {"interior": {False: "values"}, "settings": {LANG: "English"}}
+    mocker.patch.object(StateService, "_build_snapshot", side_effect=lambda: dict(snapshot))
+
+    service = StateService(Path(gettempdir()) / "waqd_test_state.sock")
+    service.start()
+    try:
+        assert stat.S_IMODE(service.socket_path.stat().st_mode) == 0o600
+        client = StateClient(service.socket_path)
+        assert client.get_snapshot()["interior"][False] == "values"
+        # cached - a new snapshot in the core is not fetched immediately
+        snapshot["interior"] = {False: "new values"}
+        service._publish()
+        assert client.get_snapshot()["interior"][False] == "values"
+
+        client.set_settings({LANG: "Magyar"})
+        assert settings.get(LANG) == "Magyar"
+        comp_ctrl.apply_setting_changes.assert_called_once()
+        # the change invalidates the cache
+        assert client.get_snapshot()["interior"][False] == "new values"
+
+        # messages of other users are not unpickled
+        mocker.patch("waqd.web.state_service.os.getuid", return_value=os.getuid() + 1)
+        with pytest.raises(ConnectionError):
+            client.call("snapshot")
+    finally:
+        service.stop()
+    assert not service.socket_path.exists()
@@ -7,8 +7,10 @@ import shutil
 import pytest
 import waqd
 waqd.DEBUG_LEVEL = 1
+import waqd.assets.assets  # noqa: E402
 import waqd.base.file_logger
 import waqd.base.system
+import waqd.base.http_client  # noqa: E402
 import waqd.base.network
 # from PyQt5 import QtCore, QtWidgets
 import waqd
@@ -55,6 +57,22 @@ def base_fixture(request):
         waqd.base.file_logger.Logger._instance = None
         waqd.base.system.RuntimeSystem._instance = None
         waqd.base.network.Network._instance = None
+        if waqd.base.network.ConnectivityMonitor._instance:
+            waqd.base.network.ConnectivityMonitor._instance.stop()
+        waqd.base.network.ConnectivityMonitor._instance = None
+        if waqd.base.network.NetworkStateCache._instance:
+            waqd.base.network.NetworkStateCache._instance.stop()
+        waqd.base.network.NetworkStateCache._instance = None
+        if waqd.base.network.AddressResolver._instance:
+            waqd.base.network.AddressResolver._instance.stop()
+        waqd.base.network.AddressResolver._instance = None
+        if waqd.base.http_client.HttpClient._instance:
+            waqd.base.http_client.HttpClient._instance.close()
+        waqd.base.http_client.HttpClient._instance = None
+        waqd.assets.assets.AssetCatalog._instance = None
+        geocoding = sys.modules.get("waqd.components.weather.geocoding")
+        if geocoding:  # don't import the components just for the reset
+            geocoding.GeocodingService._instance = None
         os.environ["PYTHONPATH"] = ""
 
     request.addfinalizer(teardown)
@@ -173,7 +173,7 @@ class DeviceMgr():
         ),
     ]
 
-    def wifi(self):
+    def wifi(self, ifname=None, rescan=None):
         if radio.wifi():
             return self._wifi_list
         else:
@@ -216,6 +216,9 @@ class DeviceMgr():
             ),)
         return status
 
+    def wifi_rescan(self, ifname=None, ssid=None):
+        pass
+
     def wifi_connect(self, ssid, password):
         for wconn in self._wifi_list:
             if wconn.ssid == ssid: